@@ -13,6 +13,88 @@ use_relative_weights = False
 damage_calc_type = 'average'
 search_depth = 2
 
+# when greater than 0, search deeper and deeper until this many milliseconds have passed instead of using `search_depth`
+search_time_ms = 0
+iterative_deepening_max_depth = 10
+
+# when greater than 1, the root of each search is split across this many processes
+search_processes = 0
+
+# when greater than 1, the battles from `prepare_battles` are searched at the same time in this many processes
+# the processes cannot share a transposition table, so `run.py` does not start when `transposition_table_size` is also greater than 0
+battle_search_processes = 0
+
+# when greater than 0, a battle's search to `search_depth` that takes longer than this falls back to a depth of 1
+battle_search_timeout_ms = 0
+
+# the least likely outcomes of a move combination whose percentages add up to no more than this
+# are valued with `evaluate` instead of being searched any deeper
+chance_branch_cutoff = 0
+
+# simulations per turn for the decoupled_mcts decision method, split between the battles from `prepare_battles`
+# the search also stops when `search_time_ms` runs out if it is greater than 0
+mcts_iterations = 2000
+mcts_max_depth = 5
+mcts_exploration_constant = 1.4
+
+# the number of searched states kept so that a state reached by more than one path is only searched once. 0 turns it off
+# only the `safest` and `nash` decision methods use a transposition table
+transposition_table_size = 0
+transposition_table_replacement = constants.TRANSPOSITION_TABLE_LRU
+
+# re-use a state that was searched deeper than a search asks for, e.g. on the previous turn or by pondering.
+# The deeper scores are not always the same as the ones a shallower search would give, so results can change
+transposition_table_use_deeper_entries = False
+
+# keep each battle's transposition table between turns while nothing new is revealed about the opponent
+reuse_search_between_turns = False
+
+# the number of `get_all_state_instructions` results kept in a cache keyed on the state's hash. 0 turns the cache off
+state_instructions_cache_size = 0
+
+# raise an error when two different states are given the same key by the transposition table or the state instructions cache.
+# This keeps a copy of every state's features so it is only for debugging
+check_hash_collisions = False
+
+# the number of `calculate_damage` results kept in a cache keyed on everything the damage depends on. 0 turns the cache off
+damage_calculation_cache_size = 0
+
+# combine the outcomes of a move combination that lead to the same state, even when their instructions are different
+merge_instructions_with_the_same_state = False
+
+# evaluate the last turn of a search that does not prune in one NumPy pass
+batch_evaluation = False
+
+# read leaf scores from the score kept up to date by the StateMutator instead of calling evaluate
+# the check compares every incremental score with evaluate and raises a ValueError if they are different
+incremental_evaluation = False
+check_incremental_evaluation = False
+
+# search the likely next states while the opponent decides, for at most `ponder_time_ms` each turn.
+# Only used by a bot that starts a `Ponderer` after `find_best_move`, and needs `reuse_search_between_turns`
+ponder = False
+ponder_time_ms = 30000
+
+# `linear_program` finds the equilibrium of a payoff matrix in this process, and needs numpy and scipy
+# `regret_matching` approximates it in this process in at most `regret_matching_iterations` iterations,
+# stopping early once it can be exploited by no more than `regret_matching_exploitability`
+# `gambit` finds every equilibrium with the gambit executable at `gambit_exe_path`
+equilibrium_solver = constants.EQUILIBRIUM_SOLVER_GAMBIT
+regret_matching_iterations = 1000
+regret_matching_exploitability = 0
+
+# remove moves that are dominated by another move before finding an equilibrium
+# strictly dominated moves are never part of an equilibrium, weakly dominated moves can be but the value stays the same
+remove_dominated_moves = False
+remove_weakly_dominated_moves = False
+
+# when greater than 1, the equilibria of the battles from `prepare_battles` are found at the same time
+# by this many worker processes that are kept alive between turns. This is ignored by the `gambit` solver
+equilibrium_solver_processes = 0
+
+# when greater than 0, the longest the equilibria of one turn are waited for before falling back to the safest move
+equilibrium_solver_time_ms = 0
+
 save_replay = False
 log_to_file = False
 logging_directory = "{}/{}".format(os.getcwd(), "logs/")
@@ -9,6 +9,17 @@ RANDOM_BATTLE = "random_battle"
 
 PICK_SAFEST = "safest"
 PICK_NASH_EQUILIBRIUM = "nash"
+PICK_SMAB_NASH_EQUILIBRIUM = "smab"
+DECOUPLED_MCTS = "decoupled_mcts"
+
+# transposition table replacement schemes
+TRANSPOSITION_TABLE_LRU = "lru"
+TRANSPOSITION_TABLE_DEPTH_PREFERRED = "depth"
+
+# ways of finding the nash equilibrium of a payoff matrix
+EQUILIBRIUM_SOLVER_GAMBIT = "gambit"
+EQUILIBRIUM_SOLVER_LINEAR_PROGRAM = "linear_program"
+EQUILIBRIUM_SOLVER_REGRET_MATCHING = "regret_matching"
 
 SCORING_MULTIPLIER = "scoring_multiplier"
 
@@ -8,6 +8,9 @@ from data import pokedex
 CURRENT_GEN = 7
 PWD = os.path.dirname(os.path.abspath(__file__))
 
+# the game mode that the mods were last applied for, so that worker processes can apply the same ones
+applied_game_mode = None
+
 
 def apply_move_mods(gen_number):
     for gen_number in reversed(range(gen_number, CURRENT_GEN)):
@@ -50,9 +53,13 @@ def apply_gen_6_mods():
 
 
 def apply_mods(game_mode):
+    global applied_game_mode
+    from showdown.engine.find_state_instructions import clear_state_instructions_cache
+    applied_game_mode = game_mode
     if "gen4" in game_mode:
         apply_gen_4_mods()
     elif "gen5" in game_mode:
         apply_gen_5_mods()
     elif "gen6" in game_mode:
         apply_gen_6_mods()
+    clear_state_instructions_cache()
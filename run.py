@@ -24,10 +24,43 @@ async def showdown():
     config.decision_method = env("DECISION_METHOD", config.decision_method)
     config.use_relative_weights = env.bool("USE_RELATIVE_WEIGHTS", config.use_relative_weights)
     config.gambit_exe_path = env("GAMBIT_PATH", config.gambit_exe_path)
+    config.equilibrium_solver = env("EQUILIBRIUM_SOLVER", config.equilibrium_solver)
+    config.regret_matching_iterations = int(env("REGRET_MATCHING_ITERATIONS", config.regret_matching_iterations))
+    config.regret_matching_exploitability = float(env("REGRET_MATCHING_EXPLOITABILITY", config.regret_matching_exploitability))
+    config.remove_dominated_moves = env.bool("REMOVE_DOMINATED_MOVES", config.remove_dominated_moves)
+    config.remove_weakly_dominated_moves = env.bool("REMOVE_WEAKLY_DOMINATED_MOVES", config.remove_weakly_dominated_moves)
+    config.equilibrium_solver_processes = int(env("EQUILIBRIUM_SOLVER_PROCESSES", config.equilibrium_solver_processes))
+    config.equilibrium_solver_time_ms = int(env("EQUILIBRIUM_SOLVER_TIME_MS", config.equilibrium_solver_time_ms))
     config.search_depth = int(env("MAX_SEARCH_DEPTH", config.search_depth))
+    config.search_time_ms = int(env("SEARCH_TIME_MS", config.search_time_ms))
+    config.iterative_deepening_max_depth = int(env("ITERATIVE_DEEPENING_MAX_DEPTH", config.iterative_deepening_max_depth))
+    config.search_processes = int(env("SEARCH_PROCESSES", config.search_processes))
+    config.battle_search_processes = int(env("BATTLE_SEARCH_PROCESSES", config.battle_search_processes))
+    config.battle_search_timeout_ms = int(env("BATTLE_SEARCH_TIMEOUT_MS", config.battle_search_timeout_ms))
+    config.chance_branch_cutoff = float(env("CHANCE_BRANCH_CUTOFF", config.chance_branch_cutoff))
+    config.mcts_iterations = int(env("MCTS_ITERATIONS", config.mcts_iterations))
+    config.mcts_max_depth = int(env("MCTS_MAX_DEPTH", config.mcts_max_depth))
+    config.mcts_exploration_constant = float(env("MCTS_EXPLORATION_CONSTANT", config.mcts_exploration_constant))
+    config.transposition_table_size = int(env("TRANSPOSITION_TABLE_SIZE", config.transposition_table_size))
+    config.transposition_table_replacement = env("TRANSPOSITION_TABLE_REPLACEMENT", config.transposition_table_replacement)
+    config.transposition_table_use_deeper_entries = env.bool("TRANSPOSITION_TABLE_USE_DEEPER_ENTRIES", config.transposition_table_use_deeper_entries)
+    config.reuse_search_between_turns = env.bool("REUSE_SEARCH_BETWEEN_TURNS", config.reuse_search_between_turns)
+    config.state_instructions_cache_size = int(env("STATE_INSTRUCTIONS_CACHE_SIZE", config.state_instructions_cache_size))
+    config.damage_calculation_cache_size = int(env("DAMAGE_CALCULATION_CACHE_SIZE", config.damage_calculation_cache_size))
+    config.check_hash_collisions = env.bool("CHECK_HASH_COLLISIONS", config.check_hash_collisions)
+    config.merge_instructions_with_the_same_state = env.bool("MERGE_INSTRUCTIONS_WITH_THE_SAME_STATE", config.merge_instructions_with_the_same_state)
+    config.batch_evaluation = env.bool("BATCH_EVALUATION", config.batch_evaluation)
+    config.incremental_evaluation = env.bool("INCREMENTAL_EVALUATION", config.incremental_evaluation)
+    config.check_incremental_evaluation = env.bool("CHECK_INCREMENTAL_EVALUATION", config.check_incremental_evaluation)
     config.greeting_message = env("GREETING_MESSAGE", config.greeting_message)
     config.battle_ending_message = env("BATTLE_OVER_MESSAGE", config.battle_ending_message)
     logger.setLevel(env("LOG_LEVEL", "DEBUG"))
+
+    if config.battle_search_processes > 1 and config.transposition_table_size > 0:
+        raise ValueError("Battles searched in separate processes cannot share a transposition table - set only one of BATTLE_SEARCH_PROCESSES and TRANSPOSITION_TABLE_SIZE")
+    if config.decision_method in [constants.PICK_SMAB_NASH_EQUILIBRIUM, constants.DECOUPLED_MCTS] and (config.transposition_table_size > 0 or config.reuse_search_between_turns):
+        raise ValueError("The {} decision method does not use a transposition table - TRANSPOSITION_TABLE_SIZE and REUSE_SEARCH_BETWEEN_TURNS cannot be set with it".format(config.decision_method))
+
     websocket_uri = env("WEBSOCKET_URI", "sim.smogon.com:8000")
     username = env("PS_USERNAME")
     password = env("PS_PASSWORD", "")
@@ -0,0 +1,150 @@
+"""
+Evaluates many states in one NumPy pass
+
+Each state added to a `LeafBatch` is reduced to one row per living pokemon holding the fields that `evaluate_pokemon`
+scores, plus the integer score of its side-conditions and matchup. The pokemon rows of every state are then scored
+together with the same operations, in the same order, as `evaluate_pokemon` so that the scores are identical to
+`evaluate`.
+"""
+from operator import attrgetter
+
+import numpy as np
+
+import constants
+from showdown.helpers import normalize_name
+
+from .evaluate import Scoring
+from .evaluate import evaluate_side_conditions
+from .evaluate import evaluate_type_matchup
+
+
+_BOOST_ATTRIBUTES = (
+    'attack_boost',
+    'defense_boost',
+    'special_attack_boost',
+    'special_defense_boost',
+    'speed_boost',
+    'accuracy_boost',
+    'evasion_boost',
+)
+_get_pokemon_fields = attrgetter('hp', 'maxhp', *_BOOST_ATTRIBUTES)
+
+_BOOST_WEIGHTS = [
+    Scoring.POKEMON_BOOSTS[constants.ATTACK],
+    Scoring.POKEMON_BOOSTS[constants.DEFENSE],
+    Scoring.POKEMON_BOOSTS[constants.SPECIAL_ATTACK],
+    Scoring.POKEMON_BOOSTS[constants.SPECIAL_DEFENSE],
+    Scoring.POKEMON_BOOSTS[constants.SPEED],
+    Scoring.POKEMON_BOOSTS[constants.ACCURACY],
+    Scoring.POKEMON_BOOSTS[constants.EVASION],
+]
+
+# the diminishing returns of a boost, indexed by the boost + 6
+_BOOST_DIMINISHING_RETURNS = np.array([Scoring.POKEMON_BOOST_DIMINISHING_RETURNS[b] for b in range(-6, 7)])
+
+# a volatile-status can only be on a pokemon once, so a pokemon has at most this many scored volatile-statuses
+_MAX_SCORED_VOLATILE_STATUSES = len(Scoring.POKEMON_VOLATILE_STATUSES)
+
+_HP = 0
+_MAXHP = 1
+_BOOSTS = slice(2, 9)
+_STATUS = 9
+_VOLATILE_STATUSES = slice(10, 10 + _MAX_SCORED_VOLATILE_STATUSES)
+_MULTIPLIER = 10 + _MAX_SCORED_VOLATILE_STATUSES
+_SIGN = _MULTIPLIER + 1
+
+_NO_VOLATILE_STATUSES = (0,) * _MAX_SCORED_VOLATILE_STATUSES
+
+
+def _pokemon_row(pkmn, sign):
+    if not pkmn.volatile_status:
+        return (
+            *_get_pokemon_fields(pkmn),
+            Scoring.POKEMON_STATUSES[pkmn.status],
+            *_NO_VOLATILE_STATUSES,
+            pkmn.scoring_multiplier,
+            sign
+        )
+
+    volatile_statuses = [
+        Scoring.POKEMON_VOLATILE_STATUSES[v] for v in map(normalize_name, pkmn.volatile_status)
+        if v in Scoring.POKEMON_VOLATILE_STATUSES
+    ]
+    volatile_statuses += [0] * (_MAX_SCORED_VOLATILE_STATUSES - len(volatile_statuses))
+    return (
+        *_get_pokemon_fields(pkmn),
+        Scoring.POKEMON_STATUSES[pkmn.status],
+        *volatile_statuses,
+        pkmn.scoring_multiplier,
+        sign
+    )
+
+
+class LeafBatch:
+    """The features of states that are waiting to be evaluated together"""
+
+    def __init__(self):
+        self.pokemon_rows = list()
+        self.pokemon_leaves = list()
+        self.other_scores = list()
+
+        # the type matchup of the active pokemon rarely changes between the states of one search
+        self.type_matchups = dict()
+
+    def __len__(self):
+        return len(self.other_scores)
+
+    def add(self, state):
+        """Adds the features of `state`. The state can be changed afterwards without affecting its score"""
+        leaf = len(self.other_scores)
+        for pkmn in [state.self.active, *state.self.reserve.values()]:
+            if pkmn.hp > 0:
+                self.pokemon_rows.append(_pokemon_row(pkmn, 1))
+                self.pokemon_leaves.append(leaf)
+        for pkmn in [state.opponent.active, *state.opponent.reserve.values()]:
+            if pkmn.hp > 0:
+                self.pokemon_rows.append(_pokemon_row(pkmn, -1))
+                self.pokemon_leaves.append(leaf)
+
+        self.other_scores.append(evaluate_side_conditions(state) + self._evaluate_matchup(state.self.active, state.opponent.active))
+
+    def _evaluate_matchup(self, user_pkmn, opponent_pkmn):
+        """The same score as `evaluate_matchup`"""
+        if user_pkmn.hp <= 0 or opponent_pkmn.hp <= 0:
+            return 0
+
+        score = 0
+        if user_pkmn.speed > opponent_pkmn.speed:
+            score += Scoring.FASTER_POKEMON_IN_MATCHUP
+        elif user_pkmn.speed < opponent_pkmn.speed:
+            score -= Scoring.FASTER_POKEMON_IN_MATCHUP
+
+        types = (tuple(user_pkmn.types), tuple(opponent_pkmn.types))
+        try:
+            score += self.type_matchups[types]
+        except KeyError:
+            self.type_matchups[types] = evaluate_type_matchup(*types)
+            score += self.type_matchups[types]
+
+        return score
+
+    def evaluate(self):
+        """:return: the score of every state that was added, in the order they were added"""
+        if not self.pokemon_rows:
+            return list(self.other_scores)
+
+        rows = np.array(self.pokemon_rows, dtype=np.float64)
+
+        # the same operations as `evaluate_pokemon` in the same order, so that the floating-point results match
+        scores = Scoring.POKEMON_ALIVE_STATIC + Scoring.POKEMON_HP * (rows[:, _HP] / rows[:, _MAXHP])
+        boosts = _BOOST_DIMINISHING_RETURNS[rows[:, _BOOSTS].astype(np.intp) + 6]
+        for i, weight in enumerate(_BOOST_WEIGHTS):
+            scores += boosts[:, i] * weight
+        scores += rows[:, _STATUS]
+        for column in range(_VOLATILE_STATUSES.start, _VOLATILE_STATUSES.stop):
+            scores += rows[:, column]
+        scores *= rows[:, _MULTIPLIER]
+        scores = np.rint(scores) * rows[:, _SIGN]
+
+        pokemon_scores = np.bincount(self.pokemon_leaves, weights=scores, minlength=len(self.other_scores))
+        return [int(p) + o for p, o in zip(pokemon_scores.tolist(), self.other_scores)]
@@ -1,9 +1,11 @@
-from copy import copy
+from collections import OrderedDict
 
+import config
 import constants
 from data import all_move_json
 
 from .helpers import normalize_name
+from .helpers import boost_multiplier_lookup
 
 
 pokemon_type_indicies = {
@@ -48,6 +50,15 @@ damage_multipication_array = [[1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1/2, 0, 1, 1,
                               [1, 1/2, 1, 1, 1, 1, 2, 1/2, 1, 1, 1, 1, 1, 1, 2, 2, 1/2, 1, 1],
                               [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]]
 
+# damage_multipication_array looked up by the names of the attacking and the defending type
+type_effectiveness = {
+    attacking_type: {
+        defending_type: damage_multipication_array[attacking_type_index][defending_type_index]
+        for defending_type, defending_type_index in pokemon_type_indicies.items()
+    }
+    for attacking_type, attacking_type_index in pokemon_type_indicies.items()
+}
+
 
 SPECIAL_LOGIC_MOVES = {
     "seismictoss": lambda attacker, defender: [int(attacker.level)] if "ghost" not in defender.types else None,
@@ -60,228 +71,277 @@ SPECIAL_LOGIC_MOVES = {
 }
 
 
-def calculate_damage(attacker, defender, attacking_move, conditions=None, calc_type='average'):
-    acceptable_calc_types = ['average', 'max', 'min_max', 'min_max_average', 'all']
-    if calc_type not in acceptable_calc_types:
-        raise ValueError("{} is not one of {}".format(calc_type, acceptable_calc_types))
+# the multipliers of the damage rolls that each calc type gives
+DAMAGE_ROLL_MULTIPLIERS = {
+    'average': (0.925,),
+    'max': (1,),
+    'min_max': (0.85, 1),
+    'min_max_average': (0.85, 0.925, 1),
+    'all': (0.85, 0.86, 0.87, 0.88, 0.89, 0.90, 0.91, 0.92, 0.93, 0.94, 0.95, 0.96, 0.97, 0.98, 0.99, 1),
+}
+ACCEPTABLE_CALC_TYPES = list(DAMAGE_ROLL_MULTIPLIERS)
 
-    attacking_move = get_move(attacking_move)
-    if attacking_move is None:
-        raise TypeError("Invalid move")
 
-    attacking_type = normalize_name(attacking_move.get(constants.CATEGORY))
-    if attacking_type == constants.PHYSICAL:
-        attack = constants.ATTACK
-        defense = constants.DEFENSE
-    elif attacking_type == constants.SPECIAL:
-        attack = constants.SPECIAL_ATTACK
-        defense = constants.SPECIAL_DEFENSE
-    else:
-        return None
+class DamageCalculationCache:
+    """A bounded LRU cache of the results of `calculate_damage`, keyed on `damage_calculation_key`
+    Results are kept as tuples so that nothing a caller does to the list it gets back can change them"""
 
-    try:
-        return SPECIAL_LOGIC_MOVES[attacking_move[constants.ID]](attacker, defender)
-    except KeyError:
-        pass
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
 
-    if attacking_move[constants.BASE_POWER] == 0:
-        return [0]
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
 
-    if conditions is None:
-        conditions = {}
-
-    attacking_stats = attacker.calculate_boosted_stats()
-    defending_stats = defender.calculate_boosted_stats()
-
-    if attacker.ability == 'unaware':
-        if defense == constants.DEFENSE:
-            defending_stats[defense] = defender.defense
-        elif defense == constants.SPECIAL_DEFENSE:
-            defending_stats[defense] = defender.special_defense
-    if defender.ability == 'unaware':
-        if attack == constants.ATTACK:
-            attacking_stats[attack] = attacker.attack
-        elif defense == constants.SPECIAL_ATTACK:
-            attacking_stats[attack] = attacker.special_attack
-
-    defending_types = defender.types
-    if attacking_move[constants.ID] == 'thousandarrows' and 'flying' in defending_types:
-        defending_types = copy(defender.types)
-        defending_types.remove('flying')
-    if attacking_move[constants.TYPE] == 'ground' and constants.ROOST in defender.volatile_status:
-        defending_types = copy(defender.types)
-        try:
-            defending_types.remove('flying')
-        except ValueError:
-            pass
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return list(entry)
 
-    # rock types get 1.5x SPDEF in sand
-    try:
-        if conditions[constants.WEATHER] == constants.SAND and 'rock' in defender.types:
-            defending_stats[constants.SPECIAL_DEFENSE] = int(defending_stats[constants.SPECIAL_DEFENSE] * 1.5)
-    except KeyError:
-        pass
+    def store(self, key, damage_rolls):
+        if key not in self.entries and len(self.entries) >= self.max_size:
+            self.entries.popitem(last=False)
+        self.entries[key] = tuple(damage_rolls)
 
-    damage = int(int((2 * attacker.level) / 5) + 2) * attacking_move[constants.BASE_POWER]
-    damage = int(damage * attacking_stats[attack] / defending_stats[defense])
-    damage = int(damage / 50) + 2
-    damage *= calculate_modifier(attacker, defender, defending_types, attacking_move, conditions)
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
 
-    damage_rolls = get_damage_rolls(damage, calc_type)
+    def __len__(self):
+        return len(self.entries)
 
-    return list(set(damage_rolls))
+    def __repr__(self):
+        return "DamageCalculationCache(size={}/{}, hits={}, misses={})".format(len(self.entries), self.max_size, self.hits, self.misses)
 
 
-def is_super_effective(move_type, defending_pokemon_types):
-    multiplier = type_effectiveness_modifier(move_type, defending_pokemon_types)
-    return multiplier > 1
+_damage_calculation_cache = None
 
 
-def is_not_very_effective(move_type, defending_pokemon_types):
-    multiplier = type_effectiveness_modifier(move_type, defending_pokemon_types)
-    return multiplier < 1
+def get_damage_calculation_cache():
+    global _damage_calculation_cache
+    if config.damage_calculation_cache_size <= 0:
+        return None
 
+    if _damage_calculation_cache is None or _damage_calculation_cache.max_size != config.damage_calculation_cache_size:
+        _damage_calculation_cache = DamageCalculationCache(config.damage_calculation_cache_size)
+
+    return _damage_calculation_cache
+
+
+def damage_calculation_key(attacker, defender, attacking_move, weather, terrain, reflect, light_screen, aurora_veil, calc_type):
+    """Everything that `get_damage` reads, except for the hit points that only the SPECIAL_LOGIC_MOVES read.
+    Only the volatile statuses that the modifiers look at are part of the key"""
+    return (
+        attacking_move[constants.ID],
+        attacking_move[constants.TYPE],
+        attacking_move.get(constants.CATEGORY),
+        attacking_move[constants.BASE_POWER],
+        attacking_move.get(constants.PRIORITY),
+        attacker.level,
+        attacker.ability,
+        attacker.item,
+        attacker.status,
+        tuple(attacker.types),
+        attacker.attack,
+        attacker.special_attack,
+        attacker.attack_boost,
+        attacker.special_attack_boost,
+        'flashfire' in attacker.volatile_status,
+        defender.ability,
+        defender.item,
+        tuple(defender.types),
+        defender.defense,
+        defender.special_defense,
+        defender.defense_boost,
+        defender.special_defense_boost,
+        constants.ROOST in defender.volatile_status,
+        'magnetrise' in defender.volatile_status,
+        weather,
+        terrain,
+        reflect,
+        light_screen,
+        aurora_veil,
+        calc_type,
+    )
 
-def calculate_modifier(attacker, defender, defending_types, attacking_move, conditions):
 
-    modifier = 1
-    modifier *= type_effectiveness_modifier(attacking_move[constants.TYPE], defending_types)
-    modifier *= weather_modifier(attacking_move, conditions.get(constants.WEATHER))
-    modifier *= stab_modifier(attacker, attacking_move)
-    modifier *= burn_modifier(attacker, attacking_move)
-    modifier *= terrain_modifier(attacker, defender, attacking_move, conditions.get(constants.TERRAIN))
-    modifier *= volatile_status_modifier(attacking_move, attacker, defender)
+def calculate_damage(attacker, defender, attacking_move, conditions=None, calc_type='average'):
+    """`conditions` can have the weather, the terrain and the screens on the defender's side"""
+    if conditions is None:
+        return calculate_damage_in_conditions(attacker, defender, attacking_move, None, None, None, None, None, calc_type)
 
-    if attacker.ability != 'infiltrator':
-        modifier *= light_screen_modifier(attacking_move, conditions.get(constants.LIGHT_SCREEN))
-        modifier *= reflect_modifier(attacking_move, conditions.get(constants.REFLECT))
-        modifier *= aurora_veil_modifier(conditions.get(constants.AURORA_VEIL))
+    return calculate_damage_in_conditions(
+        attacker,
+        defender,
+        attacking_move,
+        conditions.get(constants.WEATHER),
+        conditions.get(constants.TERRAIN),
+        conditions.get(constants.REFLECT),
+        conditions.get(constants.LIGHT_SCREEN),
+        conditions.get(constants.AURORA_VEIL),
+        calc_type
+    )
 
-    return modifier
 
+def calculate_damage_in_conditions(attacker, defender, attacking_move, weather, terrain, reflect, light_screen, aurora_veil, calc_type):
+    """The same as `calculate_damage` with each of the conditions given on its own"""
+    cache = get_damage_calculation_cache()
+    move = get_move(attacking_move)
 
-def get_move(move):
-    if isinstance(move, dict):
-        return move
-    if isinstance(move, str):
-        move = normalize_name(move)
-        return all_move_json.get(move, None)
-    else:
+    # the damage of the SPECIAL_LOGIC_MOVES depends on hit points, which would make the key far less likely to repeat
+    if cache is None or move is None or move.get(constants.ID) in SPECIAL_LOGIC_MOVES or calc_type not in DAMAGE_ROLL_MULTIPLIERS:
+        return get_damage(attacker, defender, attacking_move, weather, terrain, reflect, light_screen, aurora_veil, calc_type)
+
+    key = damage_calculation_key(attacker, defender, move, weather, terrain, reflect, light_screen, aurora_veil, calc_type)
+    damage_rolls = cache.get(key)
+    if damage_rolls is None:
+        damage_rolls = get_damage(attacker, defender, move, weather, terrain, reflect, light_screen, aurora_veil, calc_type)
+
+        # moves that do no damage, such as status moves, return None and are cheap enough to not be kept
+        if damage_rolls is not None:
+            cache.store(key, damage_rolls)
+
+    return damage_rolls
+
+
+def get_damage(attacker, defender, attacking_move, weather=None, terrain=None, reflect=None, light_screen=None, aurora_veil=None, calc_type='average'):
+    try:
+        roll_multipliers = DAMAGE_ROLL_MULTIPLIERS[calc_type]
+    except KeyError:
+        raise ValueError("{} is not one of {}".format(calc_type, ACCEPTABLE_CALC_TYPES))
+
+    attacking_move = get_move(attacking_move)
+    if attacking_move is None:
+        raise TypeError("Invalid move")
+
+    category = attacking_move.get(constants.CATEGORY)
+    if category != constants.PHYSICAL and category != constants.SPECIAL:
         return None
 
+    move_id = attacking_move[constants.ID]
+    try:
+        return SPECIAL_LOGIC_MOVES[move_id](attacker, defender)
+    except KeyError:
+        pass
 
-def get_damage_rolls(damage, calc_type):
-    if calc_type == 'average':
-        damage *= 0.925
-        return [int(damage)]
-    elif calc_type == 'max':
-        return [int(damage)]
-    elif calc_type == 'min_max':
-        return [
-            int(damage * 0.85),
-            int(damage)
-        ]
-    elif calc_type == 'min_max_average':
-        return [
-            int(damage * 0.85),
-            int(damage * 0.925),
-            int(damage)
-        ]
-    elif calc_type == 'all':
-        return [
-            int(damage * 0.85),
-            int(damage * 0.86),
-            int(damage * 0.87),
-            int(damage * 0.88),
-            int(damage * 0.89),
-            int(damage * 0.90),
-            int(damage * 0.91),
-            int(damage * 0.92),
-            int(damage * 0.93),
-            int(damage * 0.94),
-            int(damage * 0.95),
-            int(damage * 0.96),
-            int(damage * 0.97),
-            int(damage * 0.98),
-            int(damage * 0.99),
-            int(damage)
-        ]
-
-
-def type_effectiveness_modifier(attacking_move_type, defending_types):
-    modifier = 1
-    attacking_type_index = pokemon_type_indicies[normalize_name(attacking_move_type)]
-    for pkmn_type in defending_types:
-        defending_type_index = pokemon_type_indicies[normalize_name(pkmn_type)]
-        modifier *= damage_multipication_array[attacking_type_index][defending_type_index]
+    base_power = attacking_move[constants.BASE_POWER]
+    if base_power == 0:
+        return [0]
 
-    return modifier
+    if category == constants.PHYSICAL:
+        attack = boost_multiplier_lookup[attacker.attack_boost] * attacker.attack
+        defense = boost_multiplier_lookup[defender.defense_boost] * defender.defense
+        if attacker.ability == 'unaware':
+            defense = defender.defense
+        if defender.ability == 'unaware':
+            attack = attacker.attack
+    else:
+        attack = boost_multiplier_lookup[attacker.special_attack_boost] * attacker.special_attack
+        defense = boost_multiplier_lookup[defender.special_defense_boost] * defender.special_defense
+        if attacker.ability == 'unaware':
+            defense = defender.special_defense
+
+        # known bug kept from the original calculation: an unaware defender should also ignore special attack boosts,
+        # but the branch that did so compared the defense stat with SPECIAL_ATTACK and could never run
+
+        # rock types get 1.5x SPDEF in sand
+        if weather == constants.SAND and 'rock' in defender.types:
+            defense = int(defense * 1.5)
 
+    move_type = attacking_move[constants.TYPE]
 
-def weather_modifier(attacking_move, weather):
-    if not isinstance(weather, str):
-        return 1
+    # the defender's flying type is ignored by thousandarrows and by ground moves while it is roosting
+    if move_id == 'thousandarrows' or (move_type == 'ground' and constants.ROOST in defender.volatile_status):
+        modifier = type_effectiveness_modifier(move_type, defender.types, ignored_type='flying')
+    else:
+        modifier = type_effectiveness_modifier(move_type, defender.types)
 
-    if weather == constants.SUN and attacking_move[constants.TYPE] == 'fire':
-        return 1.5
-    elif weather == constants.RAIN and attacking_move[constants.TYPE] == 'water':
-        return 1.5
-    elif weather == constants.DESOLATE_LAND and attacking_move[constants.TYPE] == 'water':
-        return 0
-    return 1
+    if weather == constants.SUN and move_type == 'fire':
+        modifier *= 1.5
+    elif weather == constants.RAIN and move_type == 'water':
+        modifier *= 1.5
+    elif weather == constants.DESOLATE_LAND and move_type == 'water':
+        modifier *= 0
 
+    if move_type in attacker.types:
+        modifier *= 1.5
 
-def stab_modifier(attacking_pokemon, attacking_move):
-    if normalize_name(attacking_move[constants.TYPE]) in [normalize_name(t) for t in attacking_pokemon.types]:
-        return 1.5
+    if attacker.status == constants.BURN and category == constants.PHYSICAL:
+        modifier *= 0.5
 
-    return 1
+    if terrain == constants.ELECTRIC_TERRAIN and move_type == 'electric' and attacker.is_grounded():
+        modifier *= 1.5
+    elif terrain == constants.GRASSY_TERRAIN and move_type == 'grass' and attacker.is_grounded():
+        modifier *= 1.5
+    elif terrain == constants.GRASSY_TERRAIN and move_id == 'earthquake':
+        modifier *= 0.5
+    elif terrain == constants.MISTY_TERRAIN and move_type == 'dragon' and defender.is_grounded():
+        modifier *= 0.5
+    elif terrain == constants.PSYCHIC_TERRAIN and move_type == 'psychic' and attacker.is_grounded():
+        modifier *= 1.5
+    elif terrain == constants.PSYCHIC_TERRAIN and attacking_move[constants.PRIORITY] > 0:
+        modifier *= 0
 
+    if move_type == 'ground' and 'magnetrise' in defender.volatile_status:
+        modifier *= 0
+    if move_type == 'fire' and 'flashfire' in attacker.volatile_status:
+        modifier *= 1.5
 
-def burn_modifier(attacking_pokemon, attacking_move):
-    if constants.BURN == attacking_pokemon.status and normalize_name(attacking_move[constants.CATEGORY]) == constants.PHYSICAL:
-        return 0.5
-    return 1
+    if attacker.ability != 'infiltrator':
+        if light_screen and category == constants.SPECIAL:
+            modifier *= 0.5
+        if reflect and category == constants.PHYSICAL:
+            modifier *= 0.5
+        if aurora_veil:
+            modifier *= 0.5
+
+    damage = int(int((2 * attacker.level) / 5) + 2) * base_power
+    damage = int(damage * attack / defense)
+    damage = int(damage / 50) + 2
+    damage *= modifier
 
+    return list({int(damage * multiplier) for multiplier in roll_multipliers})
 
-def light_screen_modifier(attacking_move, light_screen):
-    if light_screen and normalize_name(attacking_move[constants.CATEGORY]) == constants.SPECIAL:
-        return 0.5
-    return 1
 
+def is_super_effective(move_type, defending_pokemon_types):
+    multiplier = type_effectiveness_modifier(move_type, defending_pokemon_types)
+    return multiplier > 1
 
-def reflect_modifier(attacking_move, reflect):
-    if reflect and normalize_name(attacking_move[constants.CATEGORY]) == constants.PHYSICAL:
-        return 0.5
-    return 1
 
+def is_not_very_effective(move_type, defending_pokemon_types):
+    multiplier = type_effectiveness_modifier(move_type, defending_pokemon_types)
+    return multiplier < 1
 
-def aurora_veil_modifier(aurora_veil):
-    if aurora_veil:
-        return 0.5
-    return 1
 
+def get_move(move):
+    if isinstance(move, dict):
+        return move
+    if isinstance(move, str):
+        move = normalize_name(move)
+        return all_move_json.get(move, None)
+    else:
+        return None
 
-def terrain_modifier(attacker, defender, attacking_move, terrain):
-    if terrain == constants.ELECTRIC_TERRAIN and attacking_move[constants.TYPE] == 'electric' and attacker.is_grounded():
-        return 1.5
-    elif terrain == constants.GRASSY_TERRAIN and attacking_move[constants.TYPE] == 'grass' and attacker.is_grounded():
-        return 1.5
-    elif terrain == constants.GRASSY_TERRAIN and attacking_move[constants.ID] == 'earthquake':
-        return 0.5
-    elif terrain == constants.MISTY_TERRAIN and attacking_move[constants.TYPE] == 'dragon' and defender.is_grounded():
-        return 0.5
-    elif terrain == constants.PSYCHIC_TERRAIN and attacking_move[constants.TYPE] == 'psychic' and attacker.is_grounded():
-        return 1.5
-    elif terrain == constants.PSYCHIC_TERRAIN and attacking_move[constants.PRIORITY] > 0:
-        return 0
-    return 1
 
+def type_effectiveness_modifier(attacking_move_type, defending_types, ignored_type=None):
+    # types from the data files are already normalized, so a name is only normalized if it is not in the table
+    try:
+        multipliers = type_effectiveness[attacking_move_type]
+    except KeyError:
+        multipliers = type_effectiveness[normalize_name(attacking_move_type)]
 
-def volatile_status_modifier(attacking_move, attacker, defender):
     modifier = 1
-    if 'magnetrise' in defender.volatile_status and attacking_move[constants.TYPE] == 'ground':
-        modifier *= 0
-    if 'flashfire' in attacker.volatile_status and attacking_move[constants.TYPE] == 'fire':
-        modifier *= 1.5
+    for pkmn_type in defending_types:
+        if pkmn_type == ignored_type:
+            continue
+        try:
+            modifier *= multipliers[pkmn_type]
+        except KeyError:
+            modifier *= multipliers[normalize_name(pkmn_type)]
+
     return modifier
@@ -3,6 +3,7 @@ import random
 import subprocess
 from collections import defaultdict
 
+import constants
 import config
 from config import logger
 
@@ -11,6 +12,9 @@ NFG_FORMAT_BASE = """NFG 1 R ""
 
 """
 
+# the number of times gambit is run for one matrix before giving up
+GAMBIT_ATTEMPTS = 6
+
 
 class CouldNotFindEquilibriumError(Exception):
     pass
@@ -36,7 +40,10 @@ def convert_from_list(l, num_rows):
     return [l[:num_rows], l[num_rows:]]
 
 
-def find_all_equilibria(matrix):
+def find_all_equilibria(matrix, deadline=None):
+    """
+    :param deadline: a Deadline that gambit is killed at if it has not finished
+    """
     import numpy as np
     matrix = matrix.round(0)
 
@@ -57,11 +64,16 @@ def find_all_equilibria(matrix):
     while not stdout:
         # for unknown and seemingly random reasons this subprocess communication sometimes fails
         # retrying with the exact same input value does not fail
-        # if an STDOUT value is not obtained in 5 tries, raise an error
-        if attempted > 5:
+        # if an STDOUT value is not obtained in GAMBIT_ATTEMPTS tries, raise an error
+        if attempted >= GAMBIT_ATTEMPTS:
             raise CouldNotFindEquilibriumError(stderr)
         sp = subprocess.Popen(cmd, stdout=subprocess.PIPE, stdin=subprocess.PIPE)
-        stdout, stderr = sp.communicate(string)
+        try:
+            stdout, stderr = sp.communicate(string, timeout=deadline.remaining() if deadline is not None else None)
+        except subprocess.TimeoutExpired:
+            sp.kill()
+            sp.communicate()
+            raise CouldNotFindEquilibriumError("gambit did not finish in time")
         stdout = stdout.decode('utf-8').replace('\r', '')
         attempted += 1
 
@@ -77,12 +89,127 @@ def find_all_equilibria(matrix):
     return np.array(equilibria)
 
 
+def _remove_rounding_errors(percentages):
+    percentages = [p if p > 1e-9 else 0.0 for p in percentages]
+    total = sum(percentages)
+    return [p / total for p in percentages]
+
+
+def find_equilibrium_with_linear_program(matrix):
+    """
+    Finds an equilibrium of a zero-sum game in this process, with a linear program for each player
+    The scores are rounded the same way as they are for gambit
+    :return: an equilibrium in the same format as the ones from `find_all_equilibria`
+    """
+    import numpy as np
+    matrix = np.array(matrix, dtype=float).round(0)
+
+    bot_percentages, _ = find_game_value(matrix.tolist())
+    opponent_percentages, _ = find_game_value((-matrix.T).tolist())
+
+    return [_remove_rounding_errors(bot_percentages), _remove_rounding_errors(opponent_percentages)]
+
+
+def get_exploitability(matrix, bot_percentages, opponent_percentages):
+    """How much the two players could gain together by switching to their best response to the other's strategy"""
+    return max(matrix @ opponent_percentages) - min(bot_percentages @ matrix)
+
+
+def regret_matching(matrix, iterations, exploitability_target=0):
+    """
+    Approximates an equilibrium of a zero-sum game with regret matching+
+    Later iterations count for more in the average strategies, which are checked against `exploitability_target`
+    every 10 iterations
+
+    :param matrix: a numpy array of the row player's payoffs
+    :return: the average strategy of each player, their exploitability, and the number of iterations that were run
+    """
+    import numpy as np
+    num_rows, num_cols = matrix.shape
+    bot_regrets = np.zeros(num_rows)
+    opponent_regrets = np.zeros(num_cols)
+    bot_strategy_sum = np.zeros(num_rows)
+    opponent_strategy_sum = np.zeros(num_cols)
+
+    iteration = 0
+    while iteration < iterations:
+        iteration += 1
+        bot_strategy = _regret_matching_strategy(bot_regrets)
+        opponent_strategy = _regret_matching_strategy(opponent_regrets)
+
+        row_values = matrix @ opponent_strategy
+        column_values = bot_strategy @ matrix
+        value = bot_strategy @ row_values
+
+        bot_regrets = np.maximum(bot_regrets + row_values - value, 0)
+        opponent_regrets = np.maximum(opponent_regrets + value - column_values, 0)
+        bot_strategy_sum += iteration * bot_strategy
+        opponent_strategy_sum += iteration * opponent_strategy
+
+        if exploitability_target > 0 and iteration % 10 == 0:
+            exploitability = get_exploitability(matrix, bot_strategy_sum / bot_strategy_sum.sum(), opponent_strategy_sum / opponent_strategy_sum.sum())
+            if exploitability <= exploitability_target:
+                break
+
+    bot_percentages = bot_strategy_sum / bot_strategy_sum.sum()
+    opponent_percentages = opponent_strategy_sum / opponent_strategy_sum.sum()
+    return bot_percentages, opponent_percentages, get_exploitability(matrix, bot_percentages, opponent_percentages), iteration
+
+
+def _regret_matching_strategy(regrets):
+    total = regrets.sum()
+    if total > 0:
+        return regrets / total
+    return regrets * 0 + 1 / len(regrets)
+
+
+def find_equilibrium_with_regret_matching(matrix):
+    """
+    Approximates an equilibrium of a zero-sum game in this process with regret matching
+    The scores are rounded the same way as they are for gambit
+    :return: an equilibrium in the same format as the ones from `find_all_equilibria`
+    """
+    import numpy as np
+    matrix = np.array(matrix, dtype=float).round(0)
+
+    bot_percentages, opponent_percentages, exploitability, iterations = regret_matching(
+        matrix,
+        config.regret_matching_iterations,
+        config.regret_matching_exploitability
+    )
+    logger.debug("Regret matching reached an exploitability of {} in {} iterations".format(round(exploitability, 3), iterations))
+
+    return [_remove_rounding_errors(bot_percentages.tolist()), _remove_rounding_errors(opponent_percentages.tolist())]
+
+
+def find_equilibria(matrix, deadline=None):
+    if config.equilibrium_solver == constants.EQUILIBRIUM_SOLVER_LINEAR_PROGRAM:
+        return [find_equilibrium_with_linear_program(matrix)]
+    elif config.equilibrium_solver == constants.EQUILIBRIUM_SOLVER_REGRET_MATCHING:
+        return [find_equilibrium_with_regret_matching(matrix)]
+    elif config.equilibrium_solver == constants.EQUILIBRIUM_SOLVER_GAMBIT:
+        return find_all_equilibria(matrix, deadline)
+    else:
+        raise ValueError("Invalid equilibrium solver: {}".format(config.equilibrium_solver))
+
+
+def _is_payoff_matrix(score_lookup):
+    # PayoffMatrix needs numpy, so it is only imported when the score lookup is not a dict
+    if isinstance(score_lookup, dict):
+        return False
+    from showdown.payoff_matrix import PayoffMatrix
+    return isinstance(score_lookup, PayoffMatrix)
+
+
 def remove_guaranteed_opponent_moves(score_lookup):
     """This method removes enemy moves from the score-lookup that do not give the bot a choice.
        For example - if the bot has 1 pokemon left, the opponent is faster, and can kill your active pokemon with move X
        then move X for the opponent will be removed from the score_lookup
 
        The bot behaves much better when it cannot see these types of decisions"""
+    if _is_payoff_matrix(score_lookup):
+        return score_lookup.remove_guaranteed_opponent_moves()
+
     move_combinations = list(score_lookup.keys())
     if len(set(k[0] for k in move_combinations)) == 1:
         return score_lookup
@@ -109,6 +236,9 @@ def remove_guaranteed_opponent_moves(score_lookup):
 
 
 def pick_safest(score_lookup):
+    if _is_payoff_matrix(score_lookup):
+        return score_lookup.safest()
+
     modified_score_lookup = remove_guaranteed_opponent_moves(score_lookup)
     if not modified_score_lookup:
         modified_score_lookup = score_lookup
@@ -121,35 +251,92 @@ def pick_safest(score_lookup):
     return worst_case[safest]
 
 
-def _find_best_nash_equilibrium(equilibria, df):
-    from nashpy import Game
-    game = Game(df)
+def find_game_value(matrix):
+    """
+    Finds the value of a zero-sum game and the row player's equilibrium strategy.
+    Games with a saddle point and 2x2 games are solved directly. Anything else needs a linear program
+    :param matrix: a list of rows of the row player's payoffs
+    :return: the row player's probability of choosing each row, and the value of the game
+    """
+    maximin = max(min(row) for row in matrix)
+    minimax = min(max(column) for column in zip(*matrix))
+    if maximin == minimax:
+        # a saddle point means there is a pure strategy equilibrium
+        best_row = [min(row) for row in matrix].index(maximin)
+        return [1.0 if i == best_row else 0.0 for i in range(len(matrix))], maximin
+
+    if len(matrix) == 2 and len(matrix[0]) == 2:
+        # without a saddle point both players mix, and each makes the other indifferent between their moves
+        (a, b), (c, d) = matrix
+        denominator = a - b - c + d
+        first_row = (d - c) / denominator
+        value = (a * d - b * c) / denominator
+        return [first_row, 1 - first_row], min(max(value, maximin), minimax)
+
+    from scipy.optimize import linprog
+
+    # variables are the probability of each row followed by the value of the game, which is maximized
+    num_rows = len(matrix)
+    objective = [0] * num_rows + [-1]
+    inequalities = [[-row[j] for row in matrix] + [1] for j in range(len(matrix[0]))]
+    result = linprog(
+        objective,
+        A_ub=inequalities,
+        b_ub=[0] * len(inequalities),
+        A_eq=[[1] * num_rows + [0]],
+        b_eq=[1],
+        bounds=[(0, 1)] * num_rows + [(None, None)],
+        method='highs'
+    )
+    if not result.success:
+        raise CouldNotFindEquilibriumError(result.message)
+
+    strategy = [float(x) for x in result.x[:num_rows]]
+    value = min(sum(strategy[i] * matrix[i][j] for i in range(num_rows)) for j in range(len(matrix[0])))
+    return strategy, min(max(value, maximin), minimax)
+
+
+def _find_best_nash_equilibrium(equilibria, matrix):
+    import numpy as np
 
     score = float('-inf')
     best_eq = None
     for eq in equilibria:
-        outcome = game[eq][0]
+        outcome = np.asarray(eq[0]) @ matrix @ np.asarray(eq[1])
         if outcome > score:
             score = outcome
             best_eq = eq
     return best_eq, score
 
 
-def find_nash_equilibrium(score_lookup):
-    import pandas as pd
-    modified_score_lookup = remove_guaranteed_opponent_moves(score_lookup)
-    if not modified_score_lookup:
-        modified_score_lookup = score_lookup
+def _expand_percentages(percentages, moves, all_moves):
+    move_percentages = dict(zip(moves, percentages))
+    return [move_percentages.get(m, 0) for m in all_moves]
+
+
+def find_nash_equilibrium(score_lookup, deadline=None):
+    from showdown.payoff_matrix import PayoffMatrix
+    payoff_matrix = PayoffMatrix.from_score_lookup(score_lookup)
+    modified_payoff_matrix = payoff_matrix.remove_guaranteed_opponent_moves()
+    if not len(modified_payoff_matrix):
+        modified_payoff_matrix = payoff_matrix
 
-    df = pd.Series(modified_score_lookup).unstack()
+    reduced_payoff_matrix = modified_payoff_matrix
+    if config.remove_dominated_moves:
+        reduced_payoff_matrix = modified_payoff_matrix.remove_dominated_moves(weakly=config.remove_weakly_dominated_moves)
+        logger.debug("Removed dominated moves: {}x{} -> {}x{}".format(
+            len(modified_payoff_matrix.bot_moves), len(modified_payoff_matrix.opponent_moves),
+            len(reduced_payoff_matrix.bot_moves), len(reduced_payoff_matrix.opponent_moves)
+        ))
 
-    equilibria = find_all_equilibria(df)
-    best_eq, score = _find_best_nash_equilibrium(equilibria, df)
-    bot_percentages = best_eq[0]
-    opponent_percentages = best_eq[1]
+    equilibria = find_equilibria(reduced_payoff_matrix.scores, deadline)
+    best_eq, score = _find_best_nash_equilibrium(equilibria, reduced_payoff_matrix.scores)
 
-    bot_choices = df.index
-    opponent_choices = df.columns
+    # moves that were removed are never chosen
+    bot_choices = modified_payoff_matrix.bot_moves
+    opponent_choices = modified_payoff_matrix.opponent_moves
+    bot_percentages = _expand_percentages(best_eq[0], reduced_payoff_matrix.bot_moves, bot_choices)
+    opponent_percentages = _expand_percentages(best_eq[1], reduced_payoff_matrix.opponent_moves, opponent_choices)
 
     return bot_choices, opponent_choices, bot_percentages, opponent_percentages, score
 
@@ -170,11 +357,25 @@ def _log_nash_equilibria(bot_choices, opponent_choices, bot_percentages, opponen
     logger.debug("Payoff: {}".format(payoff))
 
 
+def get_equilibrium_solver_deadline():
+    from showdown.engine.select_best_move import Deadline
+    if config.equilibrium_solver_time_ms <= 0:
+        return None
+    return Deadline(config.equilibrium_solver_time_ms / 1000)
+
+
 def get_weighted_choices_from_multiple_score_lookups(score_lookups):
+    from showdown.equilibrium_solver_pool import get_equilibrium_solver_pool
+    pool = get_equilibrium_solver_pool()
+    deadline = get_equilibrium_solver_deadline()
+    if pool is not None and len(score_lookups) > 1:
+        equilibria = pool.find_nash_equilibria(score_lookups, deadline)
+    else:
+        equilibria = [find_nash_equilibrium(sl, deadline) for sl in score_lookups]
+
     bot_choice_percentages = defaultdict(lambda: 0)
     number_of_score_lookups = len(score_lookups)
-    for sl in score_lookups:
-        eq = find_nash_equilibrium(sl)
+    for eq in equilibria:
         _log_nash_equilibria(*eq)
         for i, bot_choice in enumerate(eq[0]):
             bot_choice_percentages[bot_choice] += eq[2][i]/number_of_score_lookups
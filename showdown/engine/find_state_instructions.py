@@ -1,12 +1,14 @@
 from copy import copy
+from collections import OrderedDict
 
 import config
 import constants
 from data import all_move_json
-from showdown.damage_calculator import calculate_damage
+from showdown.damage_calculator import calculate_damage_in_conditions
 from showdown.helpers import boost_multiplier_lookup
 
 from . import instruction_generator
+from . import zobrist
 from .objects import TransposeInstruction
 from .special_effects.abilities.modify_attack_against import ability_modify_attack_against
 from .special_effects.abilities.modify_attack_being_used import ability_modify_attack_being_used
@@ -189,7 +191,7 @@ def get_state_instructions_from_move(mutator, attacking_move, defending_move, at
     if constants.SWITCH_STRING in attacking_move:
         return instruction_generator.get_instructions_from_switch(mutator, attacker, attacking_move[constants.SWITCH_STRING], instructions)
 
-    mutator.apply(instructions.instructions)
+    mutator.move_to(instructions.instructions)
     attacking_side = instruction_generator.get_side_from_state(mutator.state, attacker)
     defending_side = instruction_generator.get_side_from_state(mutator.state, defender)
     attacking_pokemon = attacking_side.active
@@ -199,18 +201,9 @@ def get_state_instructions_from_move(mutator, attacking_move, defending_move, at
     if cannot_use_move(attacking_pokemon, attacking_move):
         attacking_move = lookup_move(constants.DO_NOTHING_MOVE)
 
-    conditions = {
-        constants.REFLECT: defending_side.side_conditions[constants.REFLECT],
-        constants.LIGHT_SCREEN: defending_side.side_conditions[constants.LIGHT_SCREEN],
-        constants.AURORA_VEIL: defending_side.side_conditions[constants.AURORA_VEIL],
-        constants.WEATHER: active_weather,
-        constants.TERRAIN: mutator.state.field
-    }
-
     if attacking_pokemon.hp == 0:
         # if the attacker is dead, remove the 'flinched' volatile-status if it has it and exit early
         # this triggers if the pokemon moves second but the first attack knocked it out
-        mutator.reverse(instructions.instructions)
         all_instructions = instruction_generator.get_instructions_from_flinched(mutator, attacker, instructions)
         return all_instructions
 
@@ -247,7 +240,17 @@ def get_state_instructions_from_move(mutator, attacking_move, defending_move, at
 
     # move is a damaging move
     if attacking_move[constants.CATEGORY] in constants.DAMAGING_CATEGORIES:
-        damage_amounts = calculate_damage(attacking_pokemon, defending_pokemon, attacking_move, conditions=conditions, calc_type=config.damage_calc_type)
+        damage_amounts = calculate_damage_in_conditions(
+            attacking_pokemon,
+            defending_pokemon,
+            attacking_move,
+            active_weather,
+            mutator.state.field,
+            defending_side.side_conditions[constants.REFLECT],
+            defending_side.side_conditions[constants.LIGHT_SCREEN],
+            defending_side.side_conditions[constants.AURORA_VEIL],
+            config.damage_calc_type
+        )
 
         attacking_move_secondary = attacking_move[constants.SECONDARY]
         attacking_move_self = attacking_move.get(constants.SELF)
@@ -298,8 +301,6 @@ def get_state_instructions_from_move(mutator, attacking_move, defending_move, at
             boosts_target = attacker if attacking_move[constants.TARGET] == constants.SELF else defender
             boosts_chance = attacking_move[constants.ACCURACY]
 
-    mutator.reverse(instructions.instructions)
-
     all_instructions = instruction_generator.get_instructions_from_flinched(mutator, attacker, instructions)
 
     temp_instructions = []
@@ -373,6 +374,8 @@ def get_state_instructions_from_move(mutator, attacking_move, defending_move, at
     if switch_out_move_triggered(attacking_move, damage_amounts):
         temp_instructions = []
         for i in all_instructions:
+            # the best switch is found from the state before any of this turn's instructions
+            mutator.move_to([])
             best_switch = get_best_switch_pokemon(mutator, i, attacker, attacking_side, defending_move, first_move)
             if best_switch is not None:
                 temp_instructions += instruction_generator.get_instructions_from_switch(mutator, attacker, best_switch, i)
@@ -384,17 +387,29 @@ def get_state_instructions_from_move(mutator, attacking_move, defending_move, at
     return all_instructions
 
 
-def remove_duplicate_instructions(list_of_instructions):
-    new_instructions = [list_of_instructions[0]]
-    for instruction_1 in list_of_instructions[1:]:
-        for instruction_2 in new_instructions:
-            if instruction_1.has_same_instructions_as(instruction_2):
-                instruction_2.percentage += instruction_1.percentage
-                break
+def remove_duplicate_instructions(list_of_instructions, mutator=None):
+    """
+    Combines the TransposeInstructions that have the same instructions, adding their percentages to the first one
+    When `mutator` is given, TransposeInstructions whose instructions lead to the same state are also combined
+    """
+    unique_instructions = dict()
+    for instruction in list_of_instructions:
+        if mutator is None:
+            key = tuple(instruction.instructions)
+        else:
+            mutator.move_to(instruction.instructions)
+            key = mutator.hash
+
+        existing_instruction = unique_instructions.get(key)
+        if existing_instruction is None:
+            unique_instructions[key] = instruction
         else:
-            new_instructions.append(instruction_1)
+            existing_instruction.percentage += instruction.percentage
 
-    return new_instructions
+    if mutator is not None:
+        mutator.move_to([])
+
+    return list(unique_instructions.values())
 
 
 def end_of_turn_triggered(user_move, opponent_move):
@@ -406,7 +421,89 @@ def end_of_turn_triggered(user_move, opponent_move):
     return True
 
 
+class StateInstructionsCache:
+    """A bounded LRU cache of the results of `get_all_state_instructions`
+
+    Results are keyed on the hash of the state and the two move strings, along with the damage calculation type.
+    They are kept as tuples so that nothing a caller does to the TransposeInstructions it gets back can change them"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        # the fingerprint of the first state given each key, when config.check_hash_collisions is set
+        self.fingerprints = dict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return [TransposeInstruction(percentage, list(instructions), frozen) for percentage, instructions, frozen in entry]
+
+    def store(self, key, list_of_instructions):
+        if key not in self.entries and len(self.entries) >= self.max_size:
+            self.entries.popitem(last=False)
+        self.entries[key] = tuple((i.percentage, tuple(i.instructions), i.frozen) for i in list_of_instructions)
+
+    def check_collision(self, key, state_fingerprint):
+        zobrist.check_collision(self.fingerprints, key, state_fingerprint)
+
+    def clear(self):
+        self.entries.clear()
+        self.fingerprints.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return "StateInstructionsCache(size={}/{}, hits={}, misses={})".format(len(self.entries), self.max_size, self.hits, self.misses)
+
+
+_state_instructions_cache = None
+
+
+def get_state_instructions_cache():
+    global _state_instructions_cache
+    if config.state_instructions_cache_size <= 0:
+        return None
+
+    if _state_instructions_cache is None or _state_instructions_cache.max_size != config.state_instructions_cache_size:
+        _state_instructions_cache = StateInstructionsCache(config.state_instructions_cache_size)
+
+    return _state_instructions_cache
+
+
+def clear_state_instructions_cache():
+    """Must be called when the move or pokedex data changes, since cached instructions were generated from the old data"""
+    if _state_instructions_cache is not None:
+        _state_instructions_cache.clear()
+
+
 def get_all_state_instructions(mutator, user_move_string, opponent_move_string):
+    cache = get_state_instructions_cache()
+    if cache is None:
+        return generate_all_state_instructions(mutator, user_move_string, opponent_move_string)
+
+    key = (mutator.hash, user_move_string, opponent_move_string, config.damage_calc_type, config.merge_instructions_with_the_same_state)
+    if config.check_hash_collisions:
+        cache.check_collision(key, zobrist.fingerprint(mutator.state))
+    all_instructions = cache.get(key)
+    if all_instructions is None:
+        all_instructions = generate_all_state_instructions(mutator, user_move_string, opponent_move_string)
+        cache.store(key, all_instructions)
+
+    return all_instructions
+
+
+def generate_all_state_instructions(mutator, user_move_string, opponent_move_string):
     user_move = lookup_move(user_move_string)
     opponent_move = lookup_move(opponent_move_string)
 
@@ -430,6 +527,10 @@ def get_all_state_instructions(mutator, user_move_string, opponent_move_string):
             temp_instructions += instruction_generator.get_end_of_turn_instructions(mutator, instruction_set, user_move, opponent_move, bot_moves_first)
         all_instructions = temp_instructions
 
-    all_instructions = remove_duplicate_instructions(all_instructions)
+    mutator.move_to([])
+    if config.merge_instructions_with_the_same_state:
+        all_instructions = remove_duplicate_instructions(all_instructions, mutator)
+    else:
+        all_instructions = remove_duplicate_instructions(all_instructions)
 
     return all_instructions
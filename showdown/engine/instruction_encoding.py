@@ -0,0 +1,65 @@
+"""
+A compact encoding of the instructions that a StateMutator applies
+
+Instructions are generated as tuples of strings, e.g. `(constants.MUTATOR_DAMAGE, constants.SELF, 42)`.
+An encoded instruction has the index of its opcode in OPCODES in place of the opcode and, for the instructions
+that affect one side, the index of the side in SIDES in place of the side, e.g. `(3, 0, 42)`.
+`StateMutator.apply_encoded` dispatches an encoded instruction by indexing a list instead of hashing a string.
+The rest of an instruction is unchanged, so instructions can be converted back to tuples for tests and logs.
+"""
+import constants
+
+
+OPCODES = (
+    constants.MUTATOR_SWITCH,
+    constants.MUTATOR_APPLY_VOLATILE_STATUS,
+    constants.MUTATOR_REMOVE_VOLATILE_STATUS,
+    constants.MUTATOR_DAMAGE,
+    constants.MUTATOR_HEAL,
+    constants.MUTATOR_BOOST,
+    constants.MUTATOR_UNBOOST,
+    constants.MUTATOR_APPLY_STATUS,
+    constants.MUTATOR_REMOVE_STATUS,
+    constants.MUTATOR_SIDE_START,
+    constants.MUTATOR_SIDE_END,
+    constants.MUTATOR_DISABLE_MOVE,
+    constants.MUTATOR_ENABLE_MOVE,
+    constants.MUTATOR_WEATHER_START,
+    constants.MUTATOR_FIELD_START,
+    constants.MUTATOR_TOGGLE_TRICKROOM,
+)
+OPCODE_INDICES = {opcode: i for i, opcode in enumerate(OPCODES)}
+
+SIDES = (constants.SELF, constants.OPPONENT)
+SIDE_INDICES = {side: i for i, side in enumerate(SIDES)}
+
+# instructions whose second element is not a side
+NO_SIDE_OPCODES = frozenset(
+    OPCODE_INDICES[opcode] for opcode in (
+        constants.MUTATOR_WEATHER_START,
+        constants.MUTATOR_FIELD_START,
+        constants.MUTATOR_TOGGLE_TRICKROOM,
+    )
+)
+
+
+def encode_instruction(instruction):
+    opcode = OPCODE_INDICES[instruction[0]]
+    if opcode in NO_SIDE_OPCODES:
+        return (opcode, *instruction[1:])
+    return (opcode, SIDE_INDICES[instruction[1]], *instruction[2:])
+
+
+def decode_instruction(encoded_instruction):
+    opcode = encoded_instruction[0]
+    if opcode in NO_SIDE_OPCODES:
+        return (OPCODES[opcode], *encoded_instruction[1:])
+    return (OPCODES[opcode], SIDES[encoded_instruction[1]], *encoded_instruction[2:])
+
+
+def encode_instructions(instructions):
+    return [encode_instruction(i) for i in instructions]
+
+
+def decode_instructions(encoded_instructions):
+    return [decode_instruction(i) for i in encoded_instructions]
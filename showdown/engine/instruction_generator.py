@@ -54,7 +54,7 @@ def get_instructions_from_special_logic_move(mutator, move_name, instructions):
         return [instructions]
 
     new_instructions = list()
-    mutator.apply(instructions.instructions)
+    mutator.move_to(instructions.instructions)
     if move_name in weather_instructions and mutator.state.weather != move_name and mutator.state.weather not in constants.IRREVERSIBLE_WEATHER:
         new_instructions.append(
             (constants.MUTATOR_WEATHER_START, move_name, mutator.state.weather)
@@ -64,8 +64,6 @@ def get_instructions_from_special_logic_move(mutator, move_name, instructions):
             (constants.MUTATOR_TOGGLE_TRICKROOM,)
         )
 
-    mutator.reverse(instructions.instructions)
-
     for i in new_instructions:
         instructions.add_instruction(i)
 
@@ -85,9 +83,8 @@ def get_state_from_volatile_status(mutator, volatile_status, attacker, affected_
         return [instruction]
 
     side = get_side_from_state(mutator.state, affected_side)
-    mutator.apply(instruction.instructions)
+    mutator.move_to(instruction.instructions)
     if volatile_status in side.active.volatile_status:
-        mutator.reverse(instruction.instructions)
         return [instruction]
 
     if _can_be_volatile_statused(side, volatile_status, first_move) and volatile_status not in side.active.volatile_status:
@@ -96,9 +93,10 @@ def get_state_from_volatile_status(mutator, volatile_status, attacker, affected_
             affected_side,
             volatile_status
         )
-        mutator.reverse(instruction.instructions)
         instruction.add_instruction(apply_status_instruction)
         if volatile_status == constants.SUBSTITUTE:
+            # the substitute's hp comes from the pokemon that was active before any of this turn's instructions
+            mutator.move_to([])
             instruction.add_instruction(
                 (
                     constants.MUTATOR_DAMAGE,
@@ -106,8 +104,6 @@ def get_state_from_volatile_status(mutator, volatile_status, attacker, affected_
                     side.active.maxhp * 0.25
                 )
             )
-    else:
-        mutator.reverse(instruction.instructions)
 
     return [instruction]
 
@@ -118,7 +114,7 @@ def get_instructions_from_switch(mutator, attacker, switch_pokemon_name, instruc
 
     attacking_side = get_side_from_state(mutator.state, attacker)
     defending_side = get_side_from_state(mutator.state, possible_affected_strings[attacker])
-    mutator.apply(instructions.instructions)
+    mutator.move_to(instructions.instructions)
     instruction_additions = remove_volatile_status_and_boosts_instructions(attacking_side, attacker)
 
     for move in filter(lambda x: x[constants.DISABLED] is True and x[constants.CURRENT_PP], attacking_side.active.moves):
@@ -239,7 +235,6 @@ def get_instructions_from_switch(mutator, attacker, switch_pokemon_name, instruc
             ability_switch_in_instruction
         )
 
-    mutator.reverse(instructions.instructions)
     for i in instruction_additions:
         instructions.add_instruction(i)
 
@@ -251,7 +246,7 @@ def get_instructions_from_flinched(mutator, attacker, instruction):
     if attacker not in possible_affected_strings:
         raise ValueError("attacker parameter must be one of: {}".format(', '.join(possible_affected_strings)))
 
-    mutator.apply(instruction.instructions)
+    mutator.move_to(instruction.instructions)
 
     side = get_side_from_state(mutator.state, attacker)
     if constants.FLINCH in side.active.volatile_status:
@@ -260,13 +255,10 @@ def get_instructions_from_flinched(mutator, attacker, instruction):
             attacker,
             constants.FLINCH
         )
-        mutator.reverse(instruction.instructions)
         instruction.add_instruction(remove_flinch_instruction)
         instruction.frozen = True
-        return [instruction]
-    else:
-        mutator.reverse(instruction.instructions)
-        return [instruction]
+
+    return [instruction]
 
 
 def get_instructions_from_statuses_that_freeze_the_state(mutator, attacker, defender, move, opponent_move, instruction):
@@ -274,7 +266,7 @@ def get_instructions_from_statuses_that_freeze_the_state(mutator, attacker, defe
     attacker_side = get_side_from_state(mutator.state, attacker)
     defender_side = get_side_from_state(mutator.state, defender)
 
-    mutator.apply(instruction.instructions)
+    mutator.move_to(instruction.instructions)
 
     if constants.PARALYZED == attacker_side.active.status:
         fully_paralyzed_instruction = copy(instruction)
@@ -315,8 +307,6 @@ def get_instructions_from_statuses_that_freeze_the_state(mutator, attacker, defe
     if constants.POWDER in move[constants.FLAGS] and ('grass' in defender_side.active.types or defender_side.active.ability == 'overcoat'):
         instruction.frozen = True
 
-    mutator.reverse(instruction.instructions)
-
     return instructions
 
 
@@ -342,7 +332,7 @@ def get_states_from_damage(mutator, defender, damage, accuracy, attacking_move,
     drain = attacking_move.get(constants.DRAIN)
     move_flags = attacking_move.get(constants.FLAGS, {})
 
-    mutator.apply(instruction.instructions)
+    mutator.move_to(instruction.instructions)
 
     if accuracy is True:
         accuracy = 100
@@ -361,10 +351,7 @@ def get_states_from_damage(mutator, defender, damage, accuracy, attacking_move,
                 attacker,
                 min(int(crash_percent * attacker_side.active.maxhp), attacker_side.active.hp)
             )
-            mutator.reverse(instruction.instructions)
             instruction.add_instruction(crash_instruction)
-        else:
-            mutator.reverse(instruction.instructions)
         instruction.frozen = True
         return [instruction]
 
@@ -439,7 +426,6 @@ def get_states_from_damage(mutator, defender, damage, accuracy, attacking_move,
 
         instructions.append(move_missed_instruction)
 
-    mutator.reverse(instruction.instructions)
     for i in instruction_additions:
         instruction.add_instruction(i)
 
@@ -462,7 +448,7 @@ def get_instructions_from_side_conditions(mutator, attacker_string, side_string,
 
     instruction_additions = []
     side = get_side_from_state(mutator.state, side_string)
-    mutator.apply(instruction.instructions)
+    mutator.move_to(instruction.instructions)
     if condition == constants.SPIKES:
         max_layers = 3
     elif condition == constants.TOXIC_SPIKES:
@@ -479,7 +465,6 @@ def get_instructions_from_side_conditions(mutator, attacker_string, side_string,
                 1
             )
         )
-    mutator.reverse(instruction.instructions)
     for i in instruction_additions:
         instruction.add_instruction(i)
 
@@ -496,7 +481,7 @@ def get_instructions_from_hazard_clearing_moves(mutator, attacker_string, move,
     defender_string = possible_affected_strings[attacker_string]
 
     instruction_additions = []
-    mutator.apply(instruction.instructions)
+    mutator.move_to(instruction.instructions)
 
     attacker_side = get_side_from_state(mutator.state, attacker_string)
     defender_side = get_side_from_state(mutator.state, defender_string)
@@ -539,7 +524,6 @@ def get_instructions_from_hazard_clearing_moves(mutator, attacker_string, move,
     else:
         raise ValueError("{} is not a hazard clearing move".format(move[constants.ID]))
 
-    mutator.reverse(instruction.instructions)
     for i in instruction_additions:
         instruction.add_instruction(i)
 
@@ -559,17 +543,15 @@ def get_states_from_status_effects(mutator, defender, status, accuracy, instruct
         accuracy = 100
     percent_hit = accuracy / 100
 
-    mutator.apply(instruction.instructions)
+    mutator.move_to(instruction.instructions)
     instruction_additions = []
     defending_side = get_side_from_state(mutator.state, defender)
     attacking_side = get_side_from_state(mutator.state, possible_affected_strings[defender])
 
     if _sleep_clause_activated(defending_side, status):
-        mutator.reverse(instruction.instructions)
         return [instruction]
 
     if _immune_to_status(mutator.state, defending_side.active, attacking_side.active, status):
-        mutator.reverse(instruction.instructions)
         return [instruction]
 
     move_missed_instruction = copy(instruction)
@@ -589,7 +571,6 @@ def get_states_from_status_effects(mutator, defender, status, accuracy, instruct
         move_missed_instruction.update_percentage(1 - percent_hit)
         instructions.append(move_missed_instruction)
 
-    mutator.reverse(instruction.instructions)
     for i in instruction_additions:
         instruction.add_instruction(i)
 
@@ -612,7 +593,7 @@ def get_states_from_boosts(mutator, side_string, boosts, accuracy, instruction):
         accuracy = 100
     percent_hit = accuracy / 100
 
-    mutator.apply(instruction.instructions)
+    mutator.move_to(instruction.instructions)
     instruction_additions = []
 
     move_missed_instruction = copy(instruction)
@@ -649,7 +630,6 @@ def get_states_from_boosts(mutator, side_string, boosts, accuracy, instruction):
         move_missed_instruction.update_percentage(1 - percent_hit)
         instructions.append(move_missed_instruction)
 
-    mutator.reverse(instruction.instructions)
     for i in instruction_additions:
         instruction.add_instruction(i)
 
@@ -690,7 +670,7 @@ def get_state_from_attacker_recovery(mutator, attacker_string, move, instruction
     if instruction.frozen:
         return [instruction]
 
-    mutator.apply(instruction.instructions)
+    mutator.move_to(instruction.instructions)
 
     target = move[constants.HEAL_TARGET]
     if target in opposing_side_strings:
@@ -705,7 +685,6 @@ def get_state_from_attacker_recovery(mutator, attacker_string, move, instruction
         health_recovered = 0
 
     if health_recovered == 0:
-        mutator.reverse(instruction.instructions)
         return [instruction]
 
     final_health = pkmn.hp + health_recovered
@@ -720,8 +699,6 @@ def get_state_from_attacker_recovery(mutator, attacker_string, move, instruction
         health_recovered
     )
 
-    mutator.reverse(instruction.instructions)
-
     if health_recovered:
         instruction.add_instruction(heal_instruction)
 
@@ -735,7 +712,7 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
     else:
         sides = [constants.OPPONENT, constants.SELF]
 
-    mutator.apply(instruction.instructions)
+    mutator.move_to(instruction.instructions)
 
     # weather damage - sand and hail
     for attacker in sides:
@@ -751,7 +728,7 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
                 attacker,
                 max(0, int(min(pkmn.maxhp * 0.0625, pkmn.hp)))
             )
-            mutator.apply_one(sand_damage_instruction)
+            mutator.extend_branch(sand_damage_instruction)
             instruction.add_instruction(sand_damage_instruction)
 
         elif mutator.state.weather == constants.HAIL and 'ice' not in pkmn.types:
@@ -760,7 +737,7 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
                 attacker,
                 max(0, int(min(pkmn.maxhp * 0.0625, pkmn.hp)))
             )
-            mutator.apply_one(ice_damage_instruction)
+            mutator.extend_branch(ice_damage_instruction)
             instruction.add_instruction(ice_damage_instruction)
 
     # item and ability - they can add one instruction each
@@ -773,12 +750,12 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
 
         item_instruction = item_end_of_turn(side.active.item, mutator.state, attacker, pkmn, defender, defending_pkmn)
         if item_instruction is not None:
-            mutator.apply_one(item_instruction)
+            mutator.extend_branch(item_instruction)
             instruction.add_instruction(item_instruction)
 
         ability_instruction = ability_end_of_turn(side.active.ability, mutator.state, attacker, pkmn, defender, defending_pkmn)
         if ability_instruction is not None:
-            mutator.apply_one(ability_instruction)
+            mutator.extend_branch(ability_instruction)
             instruction.add_instruction(ability_instruction)
 
     # poison, toxic, and burn damage
@@ -805,8 +782,8 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
                 constants.TOXIC_COUNT,
                 1
             )
-            mutator.apply_one(toxic_damage_instruction)
-            mutator.apply_one(toxic_count_instruction)
+            mutator.extend_branch(toxic_damage_instruction)
+            mutator.extend_branch(toxic_count_instruction)
 
             instruction.add_instruction(toxic_damage_instruction)
             instruction.add_instruction(toxic_count_instruction)
@@ -817,7 +794,7 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
                 attacker,
                 max(0, int(min(pkmn.maxhp * 0.0625, pkmn.hp)))
             )
-            mutator.apply_one(burn_damage_instruction)
+            mutator.extend_branch(burn_damage_instruction)
             instruction.add_instruction(burn_damage_instruction)
 
         elif constants.POISON == pkmn.status and pkmn.ability != 'poisonheal':
@@ -826,7 +803,7 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
                 attacker,
                 max(0, int(min(pkmn.maxhp * 0.125, pkmn.hp)))
             )
-            mutator.apply_one(poison_damage_instruction)
+            mutator.extend_branch(poison_damage_instruction)
             instruction.add_instruction(poison_damage_instruction)
 
     # leechseed sap damage
@@ -857,8 +834,8 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
                 min(damage_sapped, damage_from_full)
             )
 
-            mutator.apply_one(sap_instruction)
-            mutator.apply_one(heal_instruction)
+            mutator.extend_branch(sap_instruction)
+            mutator.extend_branch(heal_instruction)
             instruction.add_instruction(sap_instruction)
             instruction.add_instruction(heal_instruction)
 
@@ -889,8 +866,8 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
                     constants.PROTECT,
                     1
             )
-            mutator.apply_one(remove_protect_volatile_status_instruction)
-            mutator.apply_one(start_protect_side_condition_instruction)
+            mutator.extend_branch(remove_protect_volatile_status_instruction)
+            mutator.extend_branch(start_protect_side_condition_instruction)
             instruction.add_instruction(remove_protect_volatile_status_instruction)
             instruction.add_instruction(start_protect_side_condition_instruction)
 
@@ -901,7 +878,7 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
                 constants.PROTECT,
                 side.side_conditions[constants.PROTECT]
             )
-            mutator.apply_one(end_protect_side_condition_instruction)
+            mutator.extend_branch(end_protect_side_condition_instruction)
             instruction.add_instruction(end_protect_side_condition_instruction)
 
         if constants.ROOST in pkmn.volatile_status:
@@ -910,7 +887,7 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
                 attacker,
                 constants.ROOST,
             )
-            mutator.apply_one(remove_roost_instruction)
+            mutator.extend_branch(remove_roost_instruction)
             instruction.add_instruction(remove_roost_instruction)
 
     # disable other moves if choice-item is held (bot only)
@@ -927,11 +904,9 @@ def get_end_of_turn_instructions(mutator, instruction, bot_move, opponent_move,
                 constants.SELF,
                 m[constants.ID]
             )
-            mutator.apply_one(disable_instruction)
+            mutator.extend_branch(disable_instruction)
             instruction.add_instruction(disable_instruction)
 
-    mutator.reverse(instruction.instructions)
-
     return [instruction]
 
 
@@ -948,9 +923,8 @@ def get_state_from_drag(mutator, attacking_move, attacking_side_string, move_tar
     else:
         raise ValueError("Invalid value for move_target: {}".format(move_target))
 
-    mutator.apply(instruction.instructions)
+    mutator.move_to(instruction.instructions)
     new_instructions = remove_volatile_status_and_boosts_instructions(affected_side, affected_side_string)
-    mutator.reverse(instruction.instructions)
 
     for i in new_instructions:
         instruction.add_instruction(i)
@@ -0,0 +1,160 @@
+"""
+Decoupled UCT Monte Carlo tree search
+
+Both sides choose their move at each state independently with UCB1, using statistics that are kept per side
+and per move rather than per move combination.
+The outcome of a move combination is sampled from `get_all_state_instructions` with the probability of each outcome,
+and a state that has just been added to the tree, or that is `max_depth` turns deep, is valued with `evaluate`.
+"""
+import math
+import random
+
+import constants
+
+from showdown.evaluate import evaluate
+from showdown.helpers import battle_is_over
+
+from .find_state_instructions import get_all_state_instructions
+from .instruction_encoding import encode_instructions
+
+
+WON_BATTLE = 100
+
+
+class MCTSNode:
+    __slots__ = ('user_stats', 'opponent_stats', 'visits', 'outcomes', 'children', 'value')
+
+    def __init__(self, user_options=None, opponent_options=None, value=None):
+        # visits and total score of each option
+        self.user_stats = {o: [0, 0] for o in user_options or []}
+        self.opponent_stats = {o: [0, 0] for o in opponent_options or []}
+        self.visits = 0
+
+        # the percentages and encoded instructions of the outcomes of each move combination, which are applied
+        # again every time the move combination is simulated, and the state each outcome leads to
+        self.outcomes = dict()
+        self.children = dict()
+
+        # states where the battle is over are not searched any further
+        self.value = value
+
+    def update(self, user_move, opponent_move, score):
+        self.visits += 1
+        self.user_stats[user_move][0] += 1
+        self.user_stats[user_move][1] += score
+        self.opponent_stats[opponent_move][0] += 1
+        self.opponent_stats[opponent_move][1] += score
+
+
+class DecoupledMCTS:
+    """
+    :param mutator: a StateMutator object representing the state of the battle
+    :param max_depth: the number of turns that are simulated before a state is evaluated
+    :param exploration_constant: the weight of the exploration term of UCB1
+    """
+
+    def __init__(self, mutator, max_depth, exploration_constant=math.sqrt(2)):
+        self.mutator = mutator
+        self.max_depth = max_depth
+        self.exploration_constant = exploration_constant
+        self.iterations = 0
+
+        # scores are scaled to between 0 and 1 with the lowest and highest scores seen so far
+        self.lowest_score = float('inf')
+        self.highest_score = float('-inf')
+
+        self.root = self._create_node(max_depth)
+
+    def _create_node(self, depth):
+        from .select_best_move import get_all_options
+        winner = battle_is_over(self.mutator.state)
+        if winner:
+            return MCTSNode(value=evaluate(self.mutator.state) + WON_BATTLE*depth*winner)
+
+        user_options, opponent_options = get_all_options(self.mutator)
+
+        # the opponent's pokemon has fainted but they have unseen reserves to switch to
+        if opponent_options == [constants.DO_NOTHING_MOVE] and self.mutator.state.opponent.active.hp == 0:
+            return MCTSNode(user_options, opponent_options, value=evaluate(self.mutator.state))
+
+        return MCTSNode(user_options, opponent_options)
+
+    def _scale(self, score):
+        if self.highest_score <= self.lowest_score:
+            return 0.5
+        return (score - self.lowest_score) / (self.highest_score - self.lowest_score)
+
+    def _select(self, stats, visits, maximize):
+        unvisited = [o for o, s in stats.items() if not s[0]]
+        if unvisited:
+            return random.choice(unvisited)
+
+        log_visits = math.log(visits)
+        best_option = None
+        best_ucb = float('-inf')
+        for option, (option_visits, total_score) in stats.items():
+            exploitation = self._scale(total_score / option_visits)
+            if not maximize:
+                exploitation = 1 - exploitation
+            ucb = exploitation + self.exploration_constant * math.sqrt(log_visits / option_visits)
+            if ucb > best_ucb:
+                best_ucb = ucb
+                best_option = option
+
+        return best_option
+
+    def _simulate(self, node, depth):
+        if node.value is not None:
+            return node.value
+
+        user_move = self._select(node.user_stats, node.visits, maximize=True)
+        opponent_move = self._select(node.opponent_stats, node.visits, maximize=False)
+
+        move_combination = (user_move, opponent_move)
+        outcomes = node.outcomes.get(move_combination)
+        if outcomes is None:
+            state_instructions = get_all_state_instructions(self.mutator, user_move, opponent_move)
+            outcomes = (
+                [i.percentage for i in state_instructions],
+                [encode_instructions(i.instructions) for i in state_instructions]
+            )
+            node.outcomes[move_combination] = outcomes
+
+        percentages, encoded_instructions = outcomes
+        index = random.choices(range(len(percentages)), weights=percentages)[0]
+        instructions = encoded_instructions[index]
+
+        self.mutator.apply_encoded(instructions)
+        child_key = (user_move, opponent_move, index)
+        if depth == 1:
+            score = evaluate(self.mutator.state)
+        elif child_key not in node.children:
+            node.children[child_key] = self._create_node(depth - 1)
+            score = node.children[child_key].value
+            if score is None:
+                score = evaluate(self.mutator.state)
+        else:
+            score = self._simulate(node.children[child_key], depth - 1)
+        self.mutator.reverse_encoded(instructions)
+
+        self.lowest_score = min(self.lowest_score, score)
+        self.highest_score = max(self.highest_score, score)
+        node.update(user_move, opponent_move, score)
+
+        return score
+
+    def search(self, iterations, deadline=None):
+        """Runs `iterations` simulations from the root, stopping early if `deadline` expires"""
+        for _ in range(iterations):
+            if deadline is not None and deadline.expired():
+                break
+            self._simulate(self.root, self.max_depth)
+            self.iterations += 1
+
+    def get_user_visits(self):
+        """The number of times each of the user's options was simulated from the root"""
+        return {option: stats[0] for option, stats in self.root.user_stats.items()}
+
+    def get_user_scores(self):
+        """The average score of each of the user's options that was simulated from the root"""
+        return {option: stats[1] / stats[0] for option, stats in self.root.user_stats.items() if stats[0]}
@@ -3,6 +3,13 @@ from copy import copy
 
 import constants
 from showdown.helpers import boost_multiplier_lookup
+from showdown.evaluate import Scoring
+from showdown.evaluate import evaluate_pokemon
+from showdown.evaluate import evaluate_matchup
+
+from . import zobrist
+from .instruction_encoding import OPCODES
+from .instruction_encoding import SIDES
 
 
 class State(object):
@@ -362,7 +369,23 @@ class TransposeInstruction:
 class StateMutator:
 
     def __init__(self, state):
+        # the hash is calculated in full the first time it is read and then kept up to date by each instruction,
+        # so instructions applied before then do not pay for it
+        self._hash = 0
+        self._hash_is_calculated = False
+
+        # the score is calculated in full the first time it is read and then kept up to date by each instruction
+        self._score_is_calculated = False
+        self._pokemon_scores = dict()
+        self._pokemon_score = 0
+        self._changed_pokemon = dict()
+        self._alive_pokemon = dict()
+        self._static_side_condition_scores = dict()
+        self._pokemon_count_side_condition_scores = dict()
+        self._matchup_scores = dict()
+
         self.state = state
+
         self.apply_instructions = {
             constants.MUTATOR_SWITCH: self.switch,
             constants.MUTATOR_APPLY_VOLATILE_STATUS: self.apply_volatile_status,
@@ -400,6 +423,122 @@ class StateMutator:
             constants.MUTATOR_TOGGLE_TRICKROOM: self.toggle_trickroom
         }
 
+        # indexed by the opcodes of encoded instructions
+        self.apply_encoded_instructions = [self.apply_instructions[opcode] for opcode in OPCODES]
+        self.reverse_encoded_instructions = [self.reverse_instructions[opcode] for opcode in OPCODES]
+
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, state):
+        """The hash and the score of a state that is given to the mutator are calculated in full when they are next read"""
+        self._state = state
+        self._hash_is_calculated = False
+        self._score_is_calculated = False
+
+        # the instructions that `move_to` has left applied to the state
+        self.branch = list()
+
+        # a side is given to an instruction by its name or, when it is encoded, by its index in SIDES
+        self._sides = dict()
+        for i, side_string in enumerate(SIDES):
+            self._sides[side_string] = self._sides[i] = (side_string, getattr(state, side_string))
+
+    @property
+    def hash(self):
+        """Zobrist hash of the state. Maintained by every instruction that is applied or reversed
+           The flags that are not set by instructions are folded in when this is read"""
+        if not self._hash_is_calculated:
+            self.recalculate_hash()
+        return self._hash ^ zobrist.flags_hash(self.state)
+
+    def recalculate_hash(self):
+        """Must be called if the state is modified without using this mutator after the hash has been read"""
+        self._hash = zobrist.calculate_zobrist_hash(self.state)
+        self._hash_is_calculated = True
+
+    @property
+    def score(self):
+        """The same score as `evaluate(self.state)`. Maintained by every instruction that is applied or reversed
+           once it has been read, so reading it does not look at every pokemon"""
+        if not self._score_is_calculated:
+            self.recalculate_score()
+        elif self._changed_pokemon:
+            for key, pkmn in self._changed_pokemon.items():
+                self._update_pokemon_score(key, pkmn)
+            self._changed_pokemon.clear()
+
+        user = self.state.self
+        opponent = self.state.opponent
+        user_alive_reserve_count = self._alive_pokemon[constants.SELF] - (user.active.hp > 0)
+        opponent_alive_reserve_count = self._alive_pokemon[constants.OPPONENT] - (opponent.active.hp > 0) + (5 - len(opponent.reserve))
+
+        score = self._pokemon_score
+        score += self._static_side_condition_scores[constants.SELF]
+        score += self._pokemon_count_side_condition_scores[constants.SELF] * user_alive_reserve_count
+        score -= self._static_side_condition_scores[constants.OPPONENT]
+        score -= self._pokemon_count_side_condition_scores[constants.OPPONENT] * opponent_alive_reserve_count
+
+        # no instruction changes the speed or the types of a pokemon so the matchup of two pokemon never changes
+        if user.active.hp > 0 and opponent.active.hp > 0:
+            matchup = (user.active.id, opponent.active.id)
+            try:
+                score += self._matchup_scores[matchup]
+            except KeyError:
+                self._matchup_scores[matchup] = evaluate_matchup(user.active, opponent.active)
+                score += self._matchup_scores[matchup]
+
+        return score
+
+    def recalculate_score(self):
+        """Must be called if the state is modified without using this mutator after the score has been read"""
+        self._pokemon_scores = dict()
+        self._pokemon_score = 0
+        self._changed_pokemon = dict()
+        self._matchup_scores = dict()
+        for side_string, sign in ((constants.SELF, 1), (constants.OPPONENT, -1)):
+            side = self._get_side(side_string)
+
+            alive_pokemon = 0
+            for pkmn in [side.active] + list(side.reserve.values()):
+                self._pokemon_scores[(side_string, pkmn.id)] = (evaluate_pokemon(pkmn), pkmn.hp > 0)
+                self._pokemon_score += sign * self._pokemon_scores[(side_string, pkmn.id)][0]
+                alive_pokemon += pkmn.hp > 0
+            self._alive_pokemon[side_string] = alive_pokemon
+
+            self._static_side_condition_scores[side_string] = 0
+            self._pokemon_count_side_condition_scores[side_string] = 0
+            for condition, count in side.side_conditions.items():
+                self._update_side_condition_score(side_string, condition, count)
+
+        self._score_is_calculated = True
+
+    def _update_pokemon_score(self, key, pkmn):
+        pokemon_score = evaluate_pokemon(pkmn)
+        alive = pkmn.hp > 0
+        previous_score, was_alive = self._pokemon_scores[key]
+        self._pokemon_scores[key] = (pokemon_score, alive)
+
+        side_string = key[0]
+        if side_string == constants.SELF:
+            self._pokemon_score += pokemon_score - previous_score
+        else:
+            self._pokemon_score -= pokemon_score - previous_score
+        self._alive_pokemon[side_string] += alive - was_alive
+
+    def _pokemon_changed(self, side_string, pkmn):
+        # pokemon are scored again when the score is read so that instructions that are reversed before then are free
+        if self._score_is_calculated:
+            self._changed_pokemon[(side_string, pkmn.id)] = pkmn
+
+    def _update_side_condition_score(self, side_string, condition, change):
+        if condition in Scoring.STATIC_SCORED_SIDE_CONDITIONS:
+            self._static_side_condition_scores[side_string] += change * Scoring.STATIC_SCORED_SIDE_CONDITIONS[condition]
+        elif condition in Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS:
+            self._pokemon_count_side_condition_scores[side_string] += change * Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS[condition]
+
     def apply_one(self, instruction):
         method = self.apply_instructions[instruction[0]]
         method(*instruction[1:])
@@ -414,98 +553,148 @@ class StateMutator:
             method = self.reverse_instructions[instruction[0]]
             method(*instruction[1:])
 
+    def apply_encoded(self, encoded_instructions):
+        """The same as `apply` for instructions from `instruction_encoding.encode_instructions`"""
+        apply_encoded_instructions = self.apply_encoded_instructions
+        for instruction in encoded_instructions:
+            apply_encoded_instructions[instruction[0]](*instruction[1:])
+
+    def reverse_encoded(self, encoded_instructions):
+        """The same as `reverse` for instructions from `instruction_encoding.encode_instructions`"""
+        reverse_encoded_instructions = self.reverse_encoded_instructions
+        for instruction in reversed(encoded_instructions):
+            reverse_encoded_instructions[instruction[0]](*instruction[1:])
+
+    def move_to(self, instructions):
+        """
+        Changes the state from the branch of instructions that was last moved to into the branch `instructions`
+        Sibling branches share most of their instructions, so only the instructions after the ones that the two
+        branches start with are reversed and applied. `move_to([])` returns to the state before any branch was moved to
+        """
+        branch = self.branch
+        common = 0
+        end = min(len(branch), len(instructions))
+        while common < end and (branch[common] is instructions[common] or branch[common] == instructions[common]):
+            common += 1
+
+        if common < len(branch):
+            self.reverse(branch[common:])
+        if common < len(instructions):
+            self.apply(instructions[common:])
+        self.branch = list(instructions)
+
+    def extend_branch(self, instruction):
+        """Applies `instruction` and adds it to the end of the branch that was last moved to"""
+        self.apply_one(instruction)
+        self.branch.append(instruction)
+
     def _get_side(self, side):
-        return getattr(self.state, side)
+        return self._sides[side][1]
 
-    def disable_move(self, side, move_name):
-        side = self._get_side(side)
+    def _set_move_disabled(self, side_string, move_name, disabled):
+        side_string, side = self._sides[side_string]
         try:
             move = next(filter(lambda x: x[constants.ID] == move_name, side.active.moves))
         except StopIteration:
             raise ValueError("{} not in pokemon's moves: {}".format(move_name, side.active.moves))
 
-        move[constants.DISABLED] = True
+        if self._hash_is_calculated and bool(move[constants.DISABLED]) != disabled:
+            self._hash ^= zobrist.disabled_move_key(side_string, side.active.id, move_name)
+        move[constants.DISABLED] = disabled
 
-    def enable_move(self, side, move_name):
-        side = self._get_side(side)
-        try:
-            move = next(filter(lambda x: x[constants.ID] == move_name, side.active.moves))
-        except StopIteration:
-            raise ValueError("{} not in pokemon's moves: {}".format(move_name, side.active.moves))
+    def disable_move(self, side, move_name):
+        self._set_move_disabled(side, move_name, True)
 
-        move[constants.DISABLED] = False
+    def enable_move(self, side, move_name):
+        self._set_move_disabled(side, move_name, False)
 
-    def switch(self, side, _, switch_pokemon_name):
+    def switch(self, side_string, _, switch_pokemon_name):
         # the second parameter to this function is the current active pokemon
         # this value must be here for reversing purposes
-        side = self._get_side(side)
+        side_string, side = self._sides[side_string]
 
+        if self._hash_is_calculated:
+            self._hash ^= zobrist.active_key(side_string, side.active.id) ^ zobrist.active_key(side_string, switch_pokemon_name)
         side.reserve[side.active.id] = side.active
         side.active = side.reserve.pop(switch_pokemon_name)
 
     def reverse_switch(self, side, previous_active, current_active):
         self.switch(side, current_active, previous_active)
 
-    def apply_volatile_status(self, side, volatile_status):
-        side = self._get_side(side)
+    def apply_volatile_status(self, side_string, volatile_status):
+        side_string, side = self._sides[side_string]
+        if self._hash_is_calculated and volatile_status not in side.active.volatile_status:
+            self._hash ^= zobrist.volatile_status_key(side_string, side.active.id, volatile_status)
         side.active.volatile_status.add(volatile_status)
+        self._pokemon_changed(side_string, side.active)
 
-    def remove_volatile_status(self, side, volatile_status):
-        side = self._get_side(side)
+    def remove_volatile_status(self, side_string, volatile_status):
+        side_string, side = self._sides[side_string]
         side.active.volatile_status.remove(volatile_status)
+        if self._hash_is_calculated:
+            self._hash ^= zobrist.volatile_status_key(side_string, side.active.id, volatile_status)
+        self._pokemon_changed(side_string, side.active)
+
+    def _change_hp(self, side_string, amount):
+        side_string, side = self._sides[side_string]
+        pkmn = side.active
+        if self._hash_is_calculated:
+            self._hash ^= zobrist.hp_key(side_string, pkmn.id, pkmn.hp) ^ zobrist.hp_key(side_string, pkmn.id, pkmn.hp + amount)
+        pkmn.hp += amount
+        self._pokemon_changed(side_string, pkmn)
 
     def damage(self, side, amount):
-        side = self._get_side(side)
-        side.active.hp -= amount
+        self._change_hp(side, -1*amount)
 
     def heal(self, side, amount):
-        side = self._get_side(side)
-        side.active.hp += amount
-
-    def boost(self, side, stat, amount):
-        side = self._get_side(side)
-        if stat == constants.ATTACK:
-            side.active.attack_boost += amount
-        elif stat == constants.DEFENSE:
-            side.active.defense_boost += amount
-        elif stat == constants.SPECIAL_ATTACK:
-            side.active.special_attack_boost += amount
-        elif stat == constants.SPECIAL_DEFENSE:
-            side.active.special_defense_boost += amount
-        elif stat == constants.SPEED:
-            side.active.speed_boost += amount
-        elif stat == constants.ACCURACY:
-            side.active.accuracy_boost += amount
-        elif stat == constants.EVASION:
-            side.active.evasion_boost += amount
-        else:
+        self._change_hp(side, amount)
+
+    def boost(self, side_string, stat, amount):
+        side_string, side = self._sides[side_string]
+        try:
+            attribute = zobrist.BOOST_ATTRIBUTES[stat]
+        except KeyError:
             raise ValueError("Invalid stat: {}".format(stat))
 
+        current_boost = getattr(side.active, attribute)
+        if self._hash_is_calculated:
+            self._hash ^= zobrist.boost_key(side_string, side.active.id, stat, current_boost) ^ zobrist.boost_key(side_string, side.active.id, stat, current_boost + amount)
+        setattr(side.active, attribute, current_boost + amount)
+        self._pokemon_changed(side_string, side.active)
+
     def unboost(self, side, stat, amount):
         self.boost(side, stat, -1*amount)
 
-    def apply_status(self, side, status):
-        side = self._get_side(side)
+    def apply_status(self, side_string, status):
+        side_string, side = self._sides[side_string]
+        if self._hash_is_calculated:
+            self._hash ^= zobrist.status_key(side_string, side.active.id, side.active.status) ^ zobrist.status_key(side_string, side.active.id, status)
         side.active.status = status
+        self._pokemon_changed(side_string, side.active)
 
     def remove_status(self, side, _):
         # the second parameter of this function is the status being removed
         # this value must be here for reverse purposes
         self.apply_status(side, None)
 
+    def _set_side_condition(self, side_string, effect, amount):
+        side_string, side = self._sides[side_string]
+        if self._hash_is_calculated:
+            self._hash ^= zobrist.side_condition_key(side_string, effect, side.side_conditions[effect]) ^ zobrist.side_condition_key(side_string, effect, amount)
+        if self._score_is_calculated:
+            self._update_side_condition_score(side_string, effect, amount - side.side_conditions[effect])
+        side.side_conditions[effect] = amount
+
     def side_start(self, side, effect, amount):
-        side = self._get_side(side)
-        side.side_conditions[effect] += amount
+        self._set_side_condition(side, effect, self._get_side(side).side_conditions[effect] + amount)
 
     def reverse_side_start(self, side, effect, amount):
-        side = self._get_side(side)
-        side.side_conditions[effect] -= amount
+        self._set_side_condition(side, effect, self._get_side(side).side_conditions[effect] - amount)
 
     def side_end(self, side, effect, _):
         # the third parameter of this function is the amount being removed
         # this value must be here for reverse purposes
-        side = self._get_side(side)
-        side.side_conditions[effect] = 0
+        self._set_side_condition(side, effect, 0)
 
     def reverse_side_end(self, side, effect, amount):
         self.side_start(side, effect, amount)
@@ -513,21 +702,33 @@ class StateMutator:
     def start_weather(self, weather, _):
         # the second parameter is the current weather
         # the value is here for reversing purposes
-        self.state.weather = weather
+        self._set_weather(weather)
 
     def reverse_start_weather(self, _, old_weather):
-        self.state.weather = old_weather
+        self._set_weather(old_weather)
+
+    def _set_weather(self, weather):
+        if self._hash_is_calculated:
+            self._hash ^= zobrist.weather_key(self.state.weather) ^ zobrist.weather_key(weather)
+        self.state.weather = weather
 
     def start_field(self, field, _):
         # the second parameter is the current field
         # the value is here for reversing purposes
-        self.state.field = field
+        self._set_field(field)
 
     def reverse_start_field(self, _, old_field):
-        self.state.field = old_field
+        self._set_field(old_field)
+
+    def _set_field(self, field):
+        if self._hash_is_calculated:
+            self._hash ^= zobrist.field_key(self.state.field) ^ zobrist.field_key(field)
+        self.state.field = field
 
     def toggle_trickroom(self):
         self.state.trick_room ^= True
+        if self._hash_is_calculated:
+            self._hash ^= zobrist.TRICK_ROOM_KEY
 
     def __key(self):
         return self.state
@@ -0,0 +1,260 @@
+"""
+Root parallelism for `get_payoff_matrix`
+
+The cells of the root payoff matrix are searched in worker processes and gathered back into one score lookup.
+When pruning, each worker searches a whole row and the best worst-case score of the finished rows is shared
+between the workers so that they prune against the same bound a serial search would have.
+
+The battles from `prepare_battles` can also be searched at the same time, one battle per worker.
+Those workers cannot share a transposition table, so battles are only searched at the same time when transposition
+tables are turned off.
+
+Workers are started from a fork server, or spawned where there is none, instead of being forked from the process
+that uses the pool, because that process may have other threads running. Each worker is given the config and the
+data mods of the process that created the pool when it starts, and the pool is started again when either of them
+changes, e.g. when `apply_mods` is called for a battle in a different generation.
+"""
+import math
+import multiprocessing
+import concurrent.futures
+from copy import copy
+from collections import defaultdict
+
+import config
+from config import logger
+
+from .objects import StateMutator
+
+
+_search_pool = None
+_battle_pool = None
+
+# seconds past its deadline that a worker has to return what it found before the search stops waiting for it
+RESULT_GRACE_SECONDS = 1
+
+# the best worst-case score of the rows finished so far, set in each worker by `_initialize_worker`
+_best_score = None
+
+
+def get_context():
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def get_worker_settings():
+    """The config values and the game mode of the data mods that a worker needs to search the same way as this process"""
+    from data.mods import apply_mods
+    config_values = {
+        name: value for name, value in vars(config).items()
+        if not name.startswith('_') and isinstance(value, (bool, int, float, str))
+    }
+    return config_values, apply_mods.applied_game_mode
+
+
+def apply_worker_settings(settings):
+    from data.mods.apply_mods import apply_mods
+    config_values, game_mode = settings
+    for name, value in config_values.items():
+        setattr(config, name, value)
+    if game_mode is not None:
+        apply_mods(game_mode)
+
+
+def _initialize_worker(settings, best_score=None):
+    global _best_score
+    apply_worker_settings(settings)
+    _best_score = best_score
+
+
+def _get_result(future, deadline):
+    """The result of `future`, raising concurrent.futures.TimeoutError once `deadline` and the grace period have passed"""
+    if deadline is None:
+        return future.result()
+    return future.result(timeout=deadline.remaining() + RESULT_GRACE_SECONDS)
+
+
+def _picklable_copy(state):
+    """A copy of `state` whose side-conditions can be pickled. The battle uses defaultdicts with a lambda factory"""
+    state = copy(state)
+    state.self = copy(state.self)
+    state.self.side_conditions = defaultdict(int, state.self.side_conditions)
+    state.opponent = copy(state.opponent)
+    state.opponent.side_conditions = defaultdict(int, state.opponent.side_conditions)
+    return state
+
+
+def _search_cell(state, user_move, opponent_move, depth, prune, deadline):
+    from .select_best_move import get_score
+    from .select_best_move import get_new_transposition_table
+    mutator = StateMutator(state)
+    score = get_score(mutator, user_move, opponent_move, depth, prune, get_new_transposition_table(), deadline)
+    return {(user_move, opponent_move): score}
+
+
+def _search_row(state, user_move, opponent_options, depth, deadline):
+    from .select_best_move import get_score
+    from .select_best_move import get_new_transposition_table
+    mutator = StateMutator(state)
+    transposition_table = get_new_transposition_table()
+
+    row_scores = dict()
+    worst_score_for_this_row = float('inf')
+    skip = False
+    for opponent_move in opponent_options:
+        if skip:
+            row_scores[(user_move, opponent_move)] = float('nan')
+            continue
+
+        score = get_score(mutator, user_move, opponent_move, depth, True, transposition_table, deadline)
+        row_scores[(user_move, opponent_move)] = score
+
+        if score < worst_score_for_this_row:
+            worst_score_for_this_row = score
+
+        # this row cannot be the safest once it scores lower than a row that has already finished
+        if score < _best_score.value:
+            skip = True
+
+    with _best_score.get_lock():
+        if worst_score_for_this_row > _best_score.value:
+            _best_score.value = worst_score_for_this_row
+
+    return row_scores
+
+
+def _search_battle(state, prune, deadline):
+    from .select_best_move import search_state
+    return search_state(state, prune=prune, deadline=deadline)
+
+
+class SearchPool:
+    """A pool of processes that search the cells of a payoff matrix. Only one search can use the pool at a time"""
+
+    def __init__(self, processes):
+        context = get_context()
+        self.settings = get_worker_settings()
+        self.best_score = context.Value('d', float('-inf'))
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=context,
+            initializer=_initialize_worker,
+            initargs=(self.settings, self.best_score)
+        )
+
+    def get_payoff_matrix(self, state, user_options, opponent_options, depth, prune, deadline=None):
+        """
+        :param state: the state after `get_all_options` has been called on it
+        :param depth: the remaining depth of each cell
+        :return: a score lookup in the same format as `get_payoff_matrix`
+        """
+        state = _picklable_copy(state)
+        if prune:
+            with self.best_score.get_lock():
+                self.best_score.value = float('-inf')
+            futures = [
+                self.executor.submit(_search_row, state, user_move, opponent_options, depth, deadline)
+                for user_move in user_options
+            ]
+        else:
+            futures = [
+                self.executor.submit(_search_cell, state, user_move, opponent_move, depth, prune, deadline)
+                for user_move in user_options
+                for opponent_move in opponent_options
+            ]
+
+        from .select_best_move import SearchTimeout
+        state_scores = dict()
+        try:
+            for future in futures:
+                state_scores.update(_get_result(future, deadline))
+        except concurrent.futures.TimeoutError:
+            raise SearchTimeout()
+        finally:
+            for future in futures:
+                future.cancel()
+
+        return state_scores
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+
+class BattlePool:
+    """A pool of processes that each search one of the battles from `prepare_battles`"""
+
+    def __init__(self, processes):
+        self.processes = processes
+        self.settings = get_worker_settings()
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=get_context(),
+            initializer=_initialize_worker,
+            initargs=(self.settings,)
+        )
+
+    def search_states(self, states, prune=None, turn_deadline=None):
+        """
+        :param turn_deadline: a Deadline for all of the searches.
+                              Battles that wait for a free process get a later share of it than the ones that start first
+        :return: the score lookup of each state in the same order as `states`
+        """
+        from .select_best_move import Deadline
+        from .select_best_move import get_payoff_matrix
+        rounds = math.ceil(len(states) / self.processes)
+        futures = list()
+        for i, state in enumerate(states):
+            deadline = None
+            if turn_deadline is not None:
+                deadline = Deadline(turn_deadline.remaining() * (i // self.processes + 1) / rounds)
+            futures.append(self.executor.submit(_search_battle, _picklable_copy(state), prune, deadline))
+
+        list_of_scores = list()
+        for state, future in zip(states, futures):
+            try:
+                list_of_scores.append(_get_result(future, turn_deadline))
+            except concurrent.futures.TimeoutError:
+                logger.warning("A battle's search did not finish in time - falling back to a depth of 1")
+                future.cancel()
+                list_of_scores.append(get_payoff_matrix(StateMutator(state), depth=1, prune=prune))
+
+        return list_of_scores
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+
+def is_stale(pool):
+    """The workers of `pool` were given a different config or different data mods from the ones this process has now"""
+    return pool.settings != get_worker_settings()
+
+
+def get_search_pool():
+    global _search_pool
+    if _search_pool is not None and is_stale(_search_pool):
+        _search_pool.shutdown()
+        _search_pool = None
+
+    if config.search_processes <= 1:
+        return None
+
+    if _search_pool is None:
+        _search_pool = SearchPool(config.search_processes)
+
+    return _search_pool
+
+
+def get_battle_pool():
+    global _battle_pool
+    if _battle_pool is not None and is_stale(_battle_pool):
+        _battle_pool.shutdown()
+        _battle_pool = None
+
+    # `run.py` does not start with both turned on. When they are both set anyway, the battles are searched one after the other
+    if config.battle_search_processes <= 1 or config.transposition_table_size > 0:
+        return None
+
+    if _battle_pool is None:
+        _battle_pool = BattlePool(config.battle_search_processes)
+
+    return _battle_pool
@@ -0,0 +1,129 @@
+"""
+Pondering: searching on the opponent's time
+
+After a bot that uses `find_best_move` has chosen its move, `Ponderer.start` searches the states the battle is likely
+to be in next turn in a background thread into the battle's transposition table, and `Ponderer.stop` is called when
+the next request comes in. If the real state next turn is one of them, `find_best_move` finds the result already in
+the table. Predicted states only match when the turn plays out exactly as the engine expects, so moves with damage
+rolls that differ from the engine's damage calculation will not be found.
+The table is only kept between turns when `reuse_search_between_turns` is set.
+`run_battle` does not start a Ponderer because it does not choose its moves with a search, so pondering has no
+settings in `run.py`.
+"""
+import concurrent.futures
+from copy import deepcopy
+
+import constants
+import config
+from config import logger
+
+from .objects import StateMutator
+from .find_state_instructions import get_all_state_instructions
+from .select_best_move import Deadline
+from .select_best_move import SearchTimeout
+from .select_best_move import get_all_options
+from .select_best_move import get_payoff_matrix
+from .select_best_move import get_battle_transposition_table
+from .select_best_move import get_battles_to_search
+
+
+def get_likely_next_states(battles, user_move, transposition_table=None):
+    """
+    The states `battles` could be in after the bot uses `user_move`
+    The opponent's best replies come first, using this turn's scores from `transposition_table` when they are in it,
+    and the outcomes of each reply come in order of how likely they are
+
+    :param transposition_table: the TranspositionTable that this turn was searched with
+    """
+    next_states = list()
+    for b in battles:
+        state = b.to_object()
+        mutator = StateMutator(state)
+
+        score_lookup = None
+        if transposition_table is not None:
+            score_lookup = transposition_table.peek(transposition_table.key(mutator, True)) or transposition_table.peek(transposition_table.key(mutator, False))
+
+        user_options, opponent_options = get_all_options(mutator)
+        if user_move not in user_options:
+            continue
+
+        if score_lookup:
+            opponent_options = sorted(opponent_options, key=lambda o: score_lookup.get((user_move, o), float('inf')))
+
+        for reply_number, opponent_move in enumerate(opponent_options):
+            for instructions in get_all_state_instructions(mutator, user_move, opponent_move):
+                mutator.apply(instructions.instructions)
+                next_state = deepcopy(state)
+                mutator.reverse(instructions.instructions)
+
+                # a pokemon that fainted this turn has to be replaced at the start of the next one
+                next_state.force_switch = next_state.self.active.hp <= 0
+                next_state.wait = next_state.opponent.active.hp <= 0 and not next_state.force_switch
+                next_states.append((reply_number, -instructions.percentage, next_state))
+
+    next_states.sort(key=lambda s: (s[0], s[1]))
+    return [s[2] for s in next_states]
+
+
+def ponder(battle, user_move, deadline):
+    """
+    Searches the likely next states of `battle` into its transposition table until `deadline` expires
+    Only the `safest` and `nash` decision methods keep a battle's transposition table between turns
+    :return: the number of states that were searched
+    """
+    if config.decision_method not in [constants.PICK_SAFEST, constants.PICK_NASH_EQUILIBRIUM]:
+        return 0
+
+    transposition_table = get_battle_transposition_table(battle)
+    if transposition_table is None:
+        return 0
+
+    # the states are prepared, searched and stored the same way as `find_best_move` will look them up
+    battles, prune = get_battles_to_search(battle)
+
+    searched = 0
+    for state in get_likely_next_states(battles, user_move, transposition_table):
+        try:
+            get_payoff_matrix(StateMutator(state), depth=config.search_depth, prune=prune, transposition_table=transposition_table, deadline=deadline)
+        except SearchTimeout:
+            break
+        searched += 1
+
+    logger.debug("Pondered {} states: {}".format(searched, transposition_table))
+    return searched
+
+
+class Ponderer:
+    """Runs `ponder` in a background thread that is stopped when it is the bot's turn to move again"""
+
+    def __init__(self):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.deadline = None
+        self.future = None
+
+    def start(self, battle, user_move):
+        if not config.ponder:
+            return
+
+        self.stop()
+        self.deadline = Deadline(config.ponder_time_ms / 1000)
+        self.future = self.executor.submit(ponder, deepcopy(battle), user_move, self.deadline)
+
+    def stop(self):
+        """Cancels the search and waits for it to unwind so that the transposition table is not used by two searches"""
+        if self.future is None:
+            return
+
+        self.deadline.cancel()
+        try:
+            self.future.result()
+        except Exception as e:
+            logger.warning("Pondering failed: {}".format(e))
+
+        self.future = None
+        self.deadline = None
+
+    def shutdown(self):
+        self.stop()
+        self.executor.shutdown()
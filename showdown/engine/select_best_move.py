@@ -1,3 +1,9 @@
+import math
+import time
+from copy import deepcopy
+from collections import defaultdict
+from collections import OrderedDict
+
 import constants
 
 import config
@@ -7,13 +13,45 @@ from showdown.evaluate import evaluate
 from showdown.decide import pick_safest
 from showdown.decide import pick_move_in_equilibrium_from_multiple_score_lookups
 from showdown.helpers import battle_is_over
+from showdown.damage_calculator import get_damage_calculation_cache
 
 from .objects import StateMutator
 from .find_state_instructions import get_all_state_instructions
+from .find_state_instructions import get_state_instructions_cache
+from .transposition_table import TranspositionTable
+from .smab import SimultaneousAlphaBeta
+from .mcts import DecoupledMCTS
 
 
 WON_BATTLE = 100
 
+# the number of battles whose transposition tables are kept between turns
+MAX_REMEMBERED_BATTLES = 4
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Deadline:
+    """A wall-clock time after which a search is abandoned"""
+
+    def __init__(self, seconds):
+        self.end = time.time() + seconds
+
+    def expired(self):
+        return time.time() >= self.end
+
+    def remaining(self):
+        return max(self.end - time.time(), 0)
+
+    def cancel(self):
+        self.end = float('-inf')
+
+    def share(self, number_of_searches):
+        """A deadline for one of `number_of_searches` searches that split the remaining time evenly"""
+        return Deadline(self.remaining() / number_of_searches)
+
 
 def get_possible_switches(side):
     switches = []
@@ -91,20 +129,180 @@ def move_item_to_front_of_list(l, item):
     return [l[i] for i in all_indicies]
 
 
-def get_payoff_matrix(mutator, depth=2, forced_options=None, prune=None):
+def order_options(user_options, opponent_options, score_lookup):
+    """Orders the options so that the ones that were best for each side in `score_lookup` are searched first
+    Searching the strongest user option first gives safest-mode pruning the highest bound to prune against"""
+    def worst_score_for_row(user_option):
+        row = [s for (u, _), s in score_lookup.items() if u == user_option and not math.isnan(s)]
+        return min(row) if row else float('-inf')
+
+    user_options = sorted(user_options, key=worst_score_for_row, reverse=True)
+
+    def score_against_best_user_option(opponent_option):
+        score = score_lookup.get((user_options[0], opponent_option), float('nan'))
+        return float('inf') if math.isnan(score) else score
+
+    opponent_options = sorted(opponent_options, key=score_against_best_user_option)
+
+    return user_options, opponent_options
+
+
+class ChanceCutoffStatistics:
+    """Counts the outcomes that were evaluated instead of being searched because they were unlikely"""
+
+    def __init__(self):
+        self.cells = 0
+        self.approximated_cells = 0
+        self.approximated_outcomes = 0
+        self.approximated_percentage = 0
+
+    def record(self, approximated_instructions):
+        self.cells += 1
+        if approximated_instructions:
+            self.approximated_cells += 1
+            self.approximated_outcomes += len(approximated_instructions)
+            self.approximated_percentage += sum(i.percentage for i in approximated_instructions)
+
+    def reset(self):
+        self.__init__()
+
+    def __repr__(self):
+        average_percentage = self.approximated_percentage / self.cells if self.cells else 0
+        return "ChanceCutoffStatistics(approximated {} outcomes in {}/{} cells, average percentage approximated per cell={:.4f})".format(
+            self.approximated_outcomes, self.approximated_cells, self.cells, average_percentage
+        )
+
+
+chance_cutoff_statistics = ChanceCutoffStatistics()
+
+
+def split_unlikely_instructions(state_instructions, cutoff):
+    """
+    Splits `state_instructions` into the ones that should be searched and the least likely ones
+    whose percentages add up to no more than `cutoff`. The most likely instructions are always searched
+    :return: the instructions to search in their original order, and the instructions to approximate
+    """
+    approximated_instructions = list()
+    approximated_percentage = 0
+    for instructions in sorted(state_instructions, key=lambda i: i.percentage)[:-1]:
+        if approximated_percentage + instructions.percentage > cutoff:
+            break
+        approximated_percentage += instructions.percentage
+        approximated_instructions.append(instructions)
+
+    if not approximated_instructions:
+        return state_instructions, approximated_instructions
+
+    approximated_ids = set(id(i) for i in approximated_instructions)
+    searched_instructions = [i for i in state_instructions if id(i) not in approximated_ids]
+    return searched_instructions, approximated_instructions
+
+
+def get_new_transposition_table():
+    if config.transposition_table_size <= 0:
+        return None
+    return TranspositionTable(config.transposition_table_size, config.transposition_table_replacement, config.transposition_table_use_deeper_entries)
+
+
+def evaluate_state(mutator):
+    """The score of the state of `mutator`. Uses the score kept up to date by the mutator when that is turned on"""
+    if not config.incremental_evaluation:
+        return evaluate(mutator.state)
+
+    score = mutator.score
+    if config.check_incremental_evaluation:
+        expected_score = evaluate(mutator.state)
+        if score != expected_score:
+            raise ValueError("Incremental score {} is not the same as evaluate: {}".format(score, expected_score))
+
+    return score
+
+
+def get_score(mutator, user_move, opponent_move, depth, prune, transposition_table=None, deadline=None):
+    """The expected score of `user_move` and `opponent_move` being chosen from the state of `mutator`"""
+    score = 0
+    state_instructions = get_all_state_instructions(mutator, user_move, opponent_move)
+    if depth == 0:
+        for instructions in state_instructions:
+            mutator.apply(instructions.instructions)
+            t_score = evaluate_state(mutator)
+            score += (t_score * instructions.percentage)
+            mutator.reverse(instructions.instructions)
+
+    else:
+        if config.chance_branch_cutoff > 0:
+            state_instructions, approximated_instructions = split_unlikely_instructions(state_instructions, config.chance_branch_cutoff)
+            for instructions in approximated_instructions:
+                mutator.apply(instructions.instructions)
+                score += evaluate_state(mutator) * instructions.percentage
+                mutator.reverse(instructions.instructions)
+            chance_cutoff_statistics.record(approximated_instructions)
+
+        for instructions in state_instructions:
+            this_percentage = instructions.percentage
+            mutator.apply(instructions.instructions)
+            safest = pick_safest(get_payoff_matrix(mutator, depth, prune=prune, transposition_table=transposition_table, deadline=deadline))
+            score += safest[1] * this_percentage
+            mutator.reverse(instructions.instructions)
+
+    return score
+
+
+def get_leaf_payoff_matrix(mutator, user_options, opponent_options):
+    """
+    The same scores as `get_score` gives every move combination at a depth of 0,
+    with all of the states that the move combinations lead to evaluated together in a LeafBatch
+    """
+    from showdown.batch_evaluate import LeafBatch
+    batch = LeafBatch()
+    cells = list()
+    for user_move in user_options:
+        for opponent_move in opponent_options:
+            state_instructions = get_all_state_instructions(mutator, user_move, opponent_move)
+            for instructions in state_instructions:
+                mutator.apply(instructions.instructions)
+                batch.add(mutator.state)
+                mutator.reverse(instructions.instructions)
+            cells.append(((user_move, opponent_move), [i.percentage for i in state_instructions]))
+
+    leaf_scores = iter(batch.evaluate())
+    state_scores = dict()
+    for move_combination, percentages in cells:
+        score = 0
+        for percentage in percentages:
+            score += next(leaf_scores) * percentage
+        state_scores[move_combination] = score
+
+    return state_scores
+
+
+def get_payoff_matrix(mutator, depth=2, forced_options=None, prune=None, transposition_table=None, deadline=None, move_order=None, pool=None):
     """
     :param mutator: a StateMutator object representing the state of the battle
     :param depth: the remaining depth before the state is evaluated
     :param forced_options: options that can be forced instead of using `get_all_options`
     :param prune: specify whether or not to prune the tree
+    :param transposition_table: a TranspositionTable used to re-use the results of states that were already searched
+    :param deadline: a Deadline after which SearchTimeout is raised. The mutator is left part-way through the search
+    :param move_order: a score lookup from a previous search used to order the options of this state
+    :param pool: a SearchPool that searches the cells of this state in other processes
     :return: a dictionary representing the potential move combinations and their associated scores
     """
     if prune is None:
         prune = config.decision_method == constants.PICK_SAFEST
 
+    if deadline is not None and deadline.expired():
+        raise SearchTimeout()
+
     winner = battle_is_over(mutator.state)
     if winner:
-        return {(constants.DO_NOTHING_MOVE, constants.DO_NOTHING_MOVE): evaluate(mutator.state) + WON_BATTLE*depth*winner}
+        return {(constants.DO_NOTHING_MOVE, constants.DO_NOTHING_MOVE): evaluate_state(mutator) + WON_BATTLE*depth*winner}
+
+    # the key must be taken before `get_all_options` because that function modifies the state
+    use_transposition_table = transposition_table is not None and not forced_options
+    if use_transposition_table:
+        transposition_key = transposition_table.key(mutator, prune)
+        transposition_depth = depth
 
     depth -= 1
     if forced_options:
@@ -116,7 +314,28 @@ def get_payoff_matrix(mutator, depth=2, forced_options=None, prune=None):
     # this is a special case in a random battle where the opponent's pokemon has fainted, but the opponent still
     # has reserves left that are unseen
     if opponent_options == [constants.DO_NOTHING_MOVE] and mutator.state.opponent.active.hp == 0:
-        return {(user_option, constants.DO_NOTHING_MOVE): evaluate(mutator.state) for user_option in user_options}
+        score = evaluate_state(mutator)
+        return {(user_option, constants.DO_NOTHING_MOVE): score for user_option in user_options}
+
+    if move_order:
+        user_options, opponent_options = order_options(user_options, opponent_options, move_order)
+
+    if use_transposition_table:
+        state_scores = transposition_table.get(transposition_key, transposition_depth)
+        if state_scores is not None:
+            return state_scores
+
+    if pool is not None and depth > 0:
+        state_scores = pool.get_payoff_matrix(mutator.state, user_options, opponent_options, depth, prune, deadline)
+        if use_transposition_table:
+            transposition_table.store(transposition_key, transposition_depth, state_scores)
+        return state_scores
+
+    if depth == 0 and not prune and config.batch_evaluation:
+        state_scores = get_leaf_payoff_matrix(mutator, user_options, opponent_options)
+        if use_transposition_table:
+            transposition_table.store(transposition_key, transposition_depth, state_scores)
+        return state_scores
 
     state_scores = dict()
 
@@ -132,23 +351,7 @@ def get_payoff_matrix(mutator, depth=2, forced_options=None, prune=None):
                 state_scores[(user_move, opponent_move)] = float('nan')
                 continue
 
-            score = 0
-            state_instructions = get_all_state_instructions(mutator, user_move, opponent_move)
-            if depth == 0:
-                for instructions in state_instructions:
-                    mutator.apply(instructions.instructions)
-                    t_score = evaluate(mutator.state)
-                    score += (t_score * instructions.percentage)
-                    mutator.reverse(instructions.instructions)
-
-            else:
-                for instructions in state_instructions:
-                    this_percentage = instructions.percentage
-                    mutator.apply(instructions.instructions)
-                    safest = pick_safest(get_payoff_matrix(mutator, depth, prune=prune))
-                    score += safest[1] * this_percentage
-                    mutator.reverse(instructions.instructions)
-
+            score = get_score(mutator, user_move, opponent_move, depth, prune, transposition_table, deadline)
             state_scores[(user_move, opponent_move)] = score
 
             if score < worst_score_for_this_row:
@@ -164,10 +367,166 @@ def get_payoff_matrix(mutator, depth=2, forced_options=None, prune=None):
         if worst_score_for_this_row > best_score:
             best_score = worst_score_for_this_row
 
+    if use_transposition_table:
+        transposition_table.store(transposition_key, transposition_depth, state_scores)
+
     return state_scores
 
 
+def get_payoff_matrix_with_iterative_deepening(state, deadline, max_depth, prune=None, transposition_table=None, pool=None, move_order=None):
+    """
+    Searches `state` to depth 1, 2, 3, etc. until `deadline` expires or `max_depth` has been searched
+    The scores of each search are used to order the options of the next one. `move_order` orders the first search
+
+    :return: the scores of the deepest search that finished and the depth it was searched to
+    """
+    scores = None
+    depth = 0
+    while depth < max_depth:
+        if scores is not None:
+            move_order = scores
+        # `get_all_options` modifies the state so each search starts from a fresh copy
+        mutator = StateMutator(deepcopy(state))
+        try:
+            # the first search is always allowed to finish so that there is a result to return
+            scores = get_payoff_matrix(
+                mutator,
+                depth=depth + 1,
+                prune=prune,
+                transposition_table=transposition_table,
+                deadline=deadline if scores is not None else None,
+                move_order=move_order,
+                pool=pool
+            )
+        except SearchTimeout:
+            break
+
+        depth += 1
+        if deadline.expired():
+            break
+
+    return scores, depth
+
+
+def get_battle_deadline(deadline=None):
+    """The earlier of `deadline` and the per-battle timeout, starting now"""
+    if config.battle_search_timeout_ms > 0:
+        timeout = Deadline(config.battle_search_timeout_ms / 1000)
+        if deadline is None or timeout.end < deadline.end:
+            return timeout
+    return deadline
+
+
+def search_state(state, prune=None, deadline=None, pool=None, transposition_table=None):
+    """
+    Searches `state` to `config.search_depth`, or with iterative deepening until `deadline` when there is a time budget
+    A search to `config.search_depth` that is still running at the per-battle timeout falls back to a depth of 1
+
+    :param transposition_table: a table from the previous turn's search. A new one is used if this is None
+    """
+    logger.debug("Attempting to find best move from: {}".format(state))
+    move_order = None
+    if transposition_table is None:
+        transposition_table = get_new_transposition_table()
+    else:
+        # the previous turn may have searched this state to a shallower depth, which gives an order for its options
+        transposition_prune = prune if prune is not None else config.decision_method == constants.PICK_SAFEST
+        move_order = transposition_table.peek(transposition_table.key(StateMutator(state), transposition_prune))
+
+    chance_cutoff_statistics.reset()
+    if deadline is None:
+        # a state that is searched on its own has the whole turn's time budget
+        deadline = get_turn_deadline()
+    deadline = get_battle_deadline(deadline)
+    if config.search_time_ms > 0:
+        scores, depth = get_payoff_matrix_with_iterative_deepening(state, deadline, config.iterative_deepening_max_depth, prune=prune, transposition_table=transposition_table, pool=pool, move_order=move_order)
+        logger.debug("Searched to a depth of {}".format(depth))
+    elif deadline is None:
+        scores = get_payoff_matrix(StateMutator(state), depth=config.search_depth, prune=prune, transposition_table=transposition_table, move_order=move_order, pool=pool)
+    else:
+        try:
+            # a search that times out leaves its state part-way through the search so a copy is searched
+            scores = get_payoff_matrix(StateMutator(deepcopy(state)), depth=config.search_depth, prune=prune, transposition_table=transposition_table, deadline=deadline, move_order=move_order, pool=pool)
+        except SearchTimeout:
+            logger.debug("Search timed out - falling back to a depth of 1")
+            scores = get_payoff_matrix(StateMutator(state), depth=1, prune=prune)
+
+    logger.debug("Transposition table: {}".format(transposition_table))
+    logger.debug("State instructions cache: {}".format(get_state_instructions_cache()))
+    logger.debug("Damage calculation cache: {}".format(get_damage_calculation_cache()))
+    if config.chance_branch_cutoff > 0:
+        logger.debug(chance_cutoff_statistics)
+    return scores
+
+
+def get_turn_deadline():
+    if config.search_time_ms <= 0:
+        return None
+    return Deadline(config.search_time_ms / 1000)
+
+
+def search_states(states, prune=None, transposition_table=None):
+    """
+    Searches each of `states` one after the other, or all at once when there is a pool of processes for battles
+    `transposition_table` is shared by the searches
+    There is no pool of processes for battles when transposition tables are turned on
+    """
+    from .parallel import get_battle_pool
+    from .parallel import get_search_pool
+    turn_deadline = get_turn_deadline()
+
+    battle_pool = get_battle_pool()
+    if battle_pool is not None:
+        return battle_pool.search_states(states, prune, turn_deadline)
+
+    pool = get_search_pool()
+    list_of_scores = list()
+    for i, state in enumerate(states):
+        deadline = turn_deadline.share(len(states) - i) if turn_deadline is not None else None
+        list_of_scores.append(search_state(state, prune=prune, deadline=deadline, pool=pool, transposition_table=transposition_table))
+
+    return list_of_scores
+
+
+def get_known_opponent_information(battle):
+    """Everything that has been revealed about the opponent's pokemon"""
+    return tuple(sorted(
+        (pkmn.name, pkmn.ability, pkmn.item, tuple(sorted(m.name for m in pkmn.moves)))
+        for pkmn in [battle.opponent.active] + battle.opponent.reserve
+    ))
+
+
+_battle_transposition_tables = OrderedDict()
+
+
+def get_battle_transposition_table(battle):
+    """
+    The transposition table that was used for `battle` last turn so that its states can be re-used
+    A new table is used when something new has been revealed about the opponent's pokemon,
+    because the states searched last turn gave the opponent's pokemon different sets
+    """
+    if not config.reuse_search_between_turns:
+        return None
+
+    information = get_known_opponent_information(battle)
+    remembered = _battle_transposition_tables.pop(battle.battle_tag, None)
+    if remembered is None or remembered[0] != information:
+        if remembered is not None:
+            logger.debug("Something new was revealed about the opponent - not re-using the previous search")
+        remembered = (information, get_new_transposition_table())
+
+    _battle_transposition_tables[battle.battle_tag] = remembered
+    while len(_battle_transposition_tables) > MAX_REMEMBERED_BATTLES:
+        _battle_transposition_tables.popitem(last=False)
+
+    return remembered[1]
+
+
 def prefix_opponent_move(score_lookup, prefix):
+    # a PayoffMatrix is the only score lookup that is not a dict, and importing it would need numpy
+    if not isinstance(score_lookup, dict):
+        return score_lookup.prefix_opponent_moves(prefix)
+
     new_score_lookup = dict()
     for k, v in score_lookup.items():
         bot_move, opponent_move = k
@@ -177,15 +536,12 @@ def prefix_opponent_move(score_lookup, prefix):
     return new_score_lookup
 
 
-def find_best_move_safest(battles):
-    all_scores = dict()
-    for i, b in enumerate(battles):
-        state = b.to_object()
-        mutator = StateMutator(state)
-        logger.debug("Attempting to find best move from: {}".format(mutator.state))
-        scores = get_payoff_matrix(mutator, depth=config.search_depth, prune=True)
-        prefixed_scores = prefix_opponent_move(scores, str(i))
-        all_scores = {**all_scores, **prefixed_scores}
+def find_best_move_safest(battles, transposition_table=None):
+    from showdown.payoff_matrix import PayoffMatrix
+    list_of_scores = search_states([b.to_object() for b in battles], prune=True, transposition_table=transposition_table)
+    all_scores = PayoffMatrix.merge([
+        prefix_opponent_move(PayoffMatrix.from_score_lookup(scores), str(i)) for i, scores in enumerate(list_of_scores)
+    ])
 
     decision, payoff = pick_safest(all_scores)
     bot_choice = decision[0]
@@ -193,29 +549,76 @@ def find_best_move_safest(battles):
     return bot_choice
 
 
-def find_best_move_nash(battles):
+def find_best_move_nash(battles, transposition_table=None):
+    list_of_payoffs = search_states([b.to_object() for b in battles], transposition_table=transposition_table)
+    return pick_move_in_equilibrium_from_multiple_score_lookups(list_of_payoffs)
+
+
+def find_best_move_smab(battles):
     list_of_payoffs = list()
     for b in battles:
         state = b.to_object()
-        mutator = StateMutator(state)
-        logger.debug("Attempting to find best move from: {}".format(mutator.state))
-        scores = get_payoff_matrix(mutator, depth=config.search_depth)
-        list_of_payoffs.append(scores)
+        logger.debug("Attempting to find best move from: {}".format(state))
+        search = SimultaneousAlphaBeta(StateMutator(state), config.search_depth)
+        list_of_payoffs.append(search.get_payoff_matrix())
+        logger.debug("States searched: {}".format(search.nodes))
 
     return pick_move_in_equilibrium_from_multiple_score_lookups(list_of_payoffs)
 
 
+def find_best_move_mcts(battles):
+    turn_deadline = get_turn_deadline()
+    iterations = max(1, config.mcts_iterations // len(battles))
+    user_visits = defaultdict(lambda: 0)
+    for i, b in enumerate(battles):
+        state = b.to_object()
+        logger.debug("Attempting to find best move from: {}".format(state))
+        deadline = turn_deadline.share(len(battles) - i) if turn_deadline is not None else None
+        search = DecoupledMCTS(StateMutator(state), config.mcts_max_depth, config.mcts_exploration_constant)
+        search.search(iterations, deadline)
+        logger.debug("Simulations: {}, Scores: {}".format(search.iterations, search.get_user_scores()))
+        for option, visits in search.get_user_visits().items():
+            user_visits[option] += visits
+
+    if not user_visits:
+        return constants.DO_NOTHING_MOVE
+
+    bot_choice = max(user_visits, key=lambda o: user_visits[o])
+    logger.debug("Visits: {}".format(dict(user_visits)))
+    logger.debug("Most visited: {}".format(bot_choice))
+    return bot_choice
+
+
+def get_battles_to_search(battle):
+    """
+    The battles from `prepare_battles` that the `safest` and `nash` decision methods search,
+    and whether the safest move is picked from them
+    """
+    if config.decision_method == constants.PICK_NASH_EQUILIBRIUM:
+        battles = battle.prepare_battles()
+        if len(battles) <= 7:
+            return battles, False
+        logger.debug("Not enough is known about the opponent's active pokemon - falling back to safest decision making")
+    return battle.prepare_battles(join_moves_together=True), True
+
+
 def find_best_move(battle):
-    if config.decision_method == constants.PICK_SAFEST:
-        battles = battle.prepare_battles(join_moves_together=True)
-        return find_best_move_safest(battles)
-    elif config.decision_method == constants.PICK_NASH_EQUILIBRIUM:
+    if config.decision_method in [constants.PICK_SAFEST, constants.PICK_NASH_EQUILIBRIUM]:
+        battles, safest = get_battles_to_search(battle)
+        if safest:
+            return find_best_move_safest(battles, get_battle_transposition_table(battle))
+        else:
+            return find_best_move_nash(battles, get_battle_transposition_table(battle))
+    elif config.decision_method == constants.PICK_SMAB_NASH_EQUILIBRIUM:
         battles = battle.prepare_battles()
         if len(battles) > 7:
             logger.debug("Not enough is known about the opponent's active pokemon - falling back to safest decision making")
             battles = battle.prepare_battles(join_moves_together=True)
             return find_best_move_safest(battles)
         else:
-            return find_best_move_nash(battles)
+            return find_best_move_smab(battles)
+    elif config.decision_method == constants.DECOUPLED_MCTS:
+        battles = battle.prepare_battles(join_moves_together=True)
+        return find_best_move_mcts(battles)
     else:
         raise ValueError("Invalid decision method: {}".format(config.decision_method))
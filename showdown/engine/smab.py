@@ -0,0 +1,260 @@
+"""
+Simultaneous move alpha-beta (SMAB) search
+
+The root state is treated as a zero-sum matrix game whose equilibrium is found from the scores that are returned.
+Every state below it is worth its best pure strategy, as it is in `get_score`, so no equilibrium has to be found
+during the search and the scores of the cells that are kept are the same as the `nash` decision method gives them.
+Every cell keeps a pessimistic and an optimistic bound on its score and a cell is only searched with a window
+that could change the result: a row (or column) is dropped as soon as its score shows that another row
+(or column) is at least as good against everything that is left. The window of a state is treated as a row that
+scores alpha and a column that scores beta against everything, so rows and columns outside of it are dropped too.
+Below the root a row is also dropped as soon as one of its cells is no better than what another row is sure to
+score, and a state fails high as soon as one of its rows is sure to score at least beta.
+The windows are passed down through the chance outcomes of each cell so that the states below can be cut off too.
+
+The bounds on the score of a cell start as bounds on what `evaluate` could return from anywhere in the search.
+Rows are only compared with pure strategies, which is weaker than the mixed comparison in the literature
+but avoids solving a linear program for every cell.
+"""
+import constants
+
+from showdown.evaluate import evaluate
+from showdown.evaluate import Scoring
+from showdown.helpers import battle_is_over
+
+from .find_state_instructions import get_all_state_instructions
+
+
+WON_BATTLE = 100
+
+# the width of the window that a cell is searched with when it only needs to show which side of a score it is on
+PROBE_WINDOW = 1e-6
+
+# the most layers of a side-condition that can be on one side of the field
+MAX_SIDE_CONDITION_LAYERS = {
+    constants.SPIKES: 3,
+    constants.TOXIC_SPIKES: 2,
+}
+
+
+def _pokemon_score_bounds(pkmn):
+    if pkmn.hp <= 0:
+        return 0, 0
+
+    boosts = max(Scoring.POKEMON_BOOST_DIMINISHING_RETURNS.values()) * sum(Scoring.POKEMON_BOOSTS.values())
+    least_boosts = min(Scoring.POKEMON_BOOST_DIMINISHING_RETURNS.values()) * sum(Scoring.POKEMON_BOOSTS.values())
+    best_volatile_statuses = sum(s for s in Scoring.POKEMON_VOLATILE_STATUSES.values() if s > 0)
+    worst_volatile_statuses = sum(s for s in Scoring.POKEMON_VOLATILE_STATUSES.values() if s < 0)
+
+    highest = Scoring.POKEMON_ALIVE_STATIC + Scoring.POKEMON_HP + boosts + best_volatile_statuses
+    lowest = Scoring.POKEMON_ALIVE_STATIC + least_boosts + min(Scoring.POKEMON_STATUSES.values()) + worst_volatile_statuses
+
+    # a pokemon that faints scores 0
+    return min(0, lowest * pkmn.scoring_multiplier) - 1, highest * pkmn.scoring_multiplier + 1
+
+
+def _side_condition_score_bounds(side, number_of_pokemon):
+    highest = 0
+    lowest = 0
+    for condition, score in Scoring.STATIC_SCORED_SIDE_CONDITIONS.items():
+        layers = max(side.side_conditions.get(condition, 0), MAX_SIDE_CONDITION_LAYERS.get(condition, 1))
+        highest += max(0, score * layers)
+        lowest += min(0, score * layers)
+    for condition, score in Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS.items():
+        layers = max(side.side_conditions.get(condition, 0), MAX_SIDE_CONDITION_LAYERS.get(condition, 1))
+        highest += max(0, score * layers * number_of_pokemon)
+        lowest += min(0, score * layers * number_of_pokemon)
+    return lowest, highest
+
+
+def get_score_bounds(state, depth):
+    """The lowest and highest score that a search of `state` to `depth` can give"""
+    lowest = 0
+    highest = 0
+    for pkmn in [state.self.active] + list(state.self.reserve.values()):
+        pkmn_lowest, pkmn_highest = _pokemon_score_bounds(pkmn)
+        lowest += pkmn_lowest
+        highest += pkmn_highest
+    for pkmn in [state.opponent.active] + list(state.opponent.reserve.values()):
+        pkmn_lowest, pkmn_highest = _pokemon_score_bounds(pkmn)
+        lowest -= pkmn_highest
+        highest -= pkmn_lowest
+
+    self_lowest, self_highest = _side_condition_score_bounds(state.self, len(state.self.reserve))
+    opponent_lowest, opponent_highest = _side_condition_score_bounds(state.opponent, 5)
+    lowest += self_lowest - opponent_highest
+    highest += self_highest - opponent_lowest
+
+    matchup = Scoring.FASTER_POKEMON_IN_MATCHUP + 2 * Scoring.WEAK_TO_OPPONENT_TYPE
+    lowest -= matchup + WON_BATTLE * depth
+    highest += matchup + WON_BATTLE * depth
+
+    return lowest, highest
+
+
+class SimultaneousAlphaBeta:
+    """
+    :param mutator: a StateMutator object representing the state of the battle
+    :param depth: the depth that the state is searched to
+    """
+
+    def __init__(self, mutator, depth):
+        self.mutator = mutator
+        self.depth = depth
+        self.lowest_score, self.highest_score = get_score_bounds(mutator.state, depth)
+        self.nodes = 0
+
+    def get_payoff_matrix(self):
+        """
+        :return: a dictionary of the score of every move combination that is not dominated by another.
+                 The equilibrium of this matrix is the equilibrium of the whole game
+        """
+        scores, _ = self._search_state(self.depth, self.lowest_score, self.highest_score, root=True)
+        return scores
+
+    def _search_cell(self, user_move, opponent_move, depth, alpha, beta):
+        """The expected score of a move combination, bounded by `alpha` and `beta` in the same way as `_search_state`"""
+        state_instructions = get_all_state_instructions(self.mutator, user_move, opponent_move)
+        state_instructions = sorted(state_instructions, key=lambda i: i.percentage, reverse=True)
+
+        score = 0
+        remaining_percentage = 1
+        for instructions in state_instructions:
+            percentage = instructions.percentage
+            remaining_percentage -= percentage
+            if remaining_percentage < 1e-9:
+                remaining_percentage = 0
+
+            # the window this outcome must score outside of for the whole cell to be outside of alpha and beta,
+            # assuming the remaining outcomes all score as well (or badly) as they possibly can
+            outcome_alpha = (alpha - score - self.highest_score * remaining_percentage) / percentage
+            outcome_beta = (beta - score - self.lowest_score * remaining_percentage) / percentage
+
+            self.mutator.apply(instructions.instructions)
+            if depth == 0:
+                outcome_score = evaluate(self.mutator.state)
+            else:
+                _, outcome_score = self._search_state(
+                    depth,
+                    max(outcome_alpha, self.lowest_score),
+                    min(outcome_beta, self.highest_score)
+                )
+            self.mutator.reverse(instructions.instructions)
+
+            if outcome_score <= outcome_alpha:
+                return alpha
+            if outcome_score >= outcome_beta:
+                return beta
+
+            score += outcome_score * percentage
+
+        return score
+
+    def _search_state(self, depth, alpha, beta, root=False):
+        """
+        :return: the scores of the move combinations that were not dominated, and the value of the state's best
+                 pure strategy, which is None at the root. A value at or below `alpha` means the value is
+                 no more than `alpha`, and a value at or above `beta` means the value is no less than `beta`
+        """
+        self.nodes += 1
+        winner = battle_is_over(self.mutator.state)
+        if winner:
+            score = evaluate(self.mutator.state) + WON_BATTLE*depth*winner
+            return {(constants.DO_NOTHING_MOVE, constants.DO_NOTHING_MOVE): score}, score
+
+        from .select_best_move import get_all_options
+        depth -= 1
+        user_options, opponent_options = get_all_options(self.mutator)
+
+        if opponent_options == [constants.DO_NOTHING_MOVE] and self.mutator.state.opponent.active.hp == 0:
+            score = evaluate(self.mutator.state)
+            return {(user_option, constants.DO_NOTHING_MOVE): score for user_option in user_options}, score
+
+        return self._search_matrix(user_options, opponent_options, depth, alpha, beta, root)
+
+    def _search_matrix(self, user_options, opponent_options, depth, alpha, beta, root=False):
+        """
+        Searches the cells of the matrix game of the current state, dropping the rows and columns that are dominated.
+        `alpha` is a virtual row that scores `alpha` against every column, and `beta` a virtual column that scores
+        `beta` against every row, so that the rows (or columns) that are no better than the window are dropped too.
+        Only the root keeps every row that could be part of an equilibrium
+        :return: the scores of the move combinations that were not dominated, and the value of the state,
+                 bounded by `alpha` and `beta` in the same way as `_search_state`
+        """
+        pessimistic = {(u, o): self.lowest_score for u in user_options for o in opponent_options}
+        optimistic = {(u, o): self.highest_score for u in user_options for o in opponent_options}
+        rows = list(user_options)
+        columns = list(opponent_options)
+
+        for user_move in user_options:
+            for opponent_move in opponent_options:
+                if user_move not in rows:
+                    break
+                if opponent_move not in columns:
+                    continue
+
+                cell = (user_move, opponent_move)
+                other_columns = [c for c in columns if c != opponent_move]
+                other_rows = [r for r in rows if r != user_move]
+
+                # the score this cell must beat for `user_move` to not be dominated by another row
+                row_bound = float('-inf')
+                if all(alpha >= optimistic[(user_move, c)] for c in other_columns):
+                    row_bound = alpha
+                for other_row in other_rows:
+                    if all(pessimistic[(other_row, c)] >= optimistic[(user_move, c)] for c in other_columns):
+                        row_bound = max(row_bound, pessimistic[(other_row, opponent_move)])
+
+                # the score this cell must be below for `opponent_move` to not be dominated by another column
+                column_bound = float('inf')
+                if all(beta <= pessimistic[(r, opponent_move)] for r in other_rows):
+                    column_bound = beta
+                for other_column in other_columns:
+                    if all(optimistic[(r, other_column)] <= pessimistic[(r, opponent_move)] for r in other_rows):
+                        column_bound = min(column_bound, optimistic[(user_move, other_column)])
+
+                if not root:
+                    # a row that has a cell no better than what another row is sure to score is not the best pure strategy
+                    for other_row in other_rows:
+                        row_bound = max(row_bound, min(pessimistic[(other_row, c)] for c in columns))
+
+                if row_bound >= column_bound:
+                    # whatever the cell scores, one of the row or the column is dominated.
+                    # A window just above `row_bound` is enough to tell which
+                    score = self._search_cell(user_move, opponent_move, depth, row_bound, row_bound + PROBE_WINDOW)
+                    if score <= row_bound:
+                        rows.remove(user_move)
+                    else:
+                        columns.remove(opponent_move)
+                    continue
+
+                score = self._search_cell(user_move, opponent_move, depth, row_bound, column_bound)
+                if score <= row_bound:
+                    rows.remove(user_move)
+                elif score >= column_bound:
+                    columns.remove(opponent_move)
+                else:
+                    pessimistic[cell] = score
+                    optimistic[cell] = score
+                    if not root and min(pessimistic[(user_move, c)] for c in columns) >= beta:
+                        return {}, beta
+
+        if not rows:
+            return {}, alpha
+        if not columns:
+            return {}, beta
+
+        scores = {(r, c): pessimistic[(r, c)] for r in rows for c in columns}
+        if root:
+            return scores, None
+
+        return scores, max(min(scores[(r, c)] for c in columns) for r in rows)
+
+
+def get_payoff_matrix(mutator, depth=2):
+    """
+    :param mutator: a StateMutator object representing the state of the battle
+    :param depth: the remaining depth before the state is evaluated
+    :return: a dictionary of the scores of the move combinations that are not dominated
+    """
+    return SimultaneousAlphaBeta(mutator, depth).get_payoff_matrix()
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+
+import config
+import constants
+
+from . import zobrist
+
+
+class TranspositionTable:
+    """A bounded cache of `get_payoff_matrix` results keyed on the hash of the state they were searched from
+
+    Every entry remembers the depth that was remaining when it was searched.
+    A lookup only succeeds when the remaining depth matches exactly so that using the table never changes a result.
+    With `use_deeper_entries` it also succeeds when the entry was searched deeper, so a state searched on an earlier
+    turn or by the ponderer is re-used by a shallower search of it. The deeper scores can be different from the ones
+    a search to the depth that was asked for would give, so the result can depend on which search filled the table"""
+
+    REPLACEMENT_SCHEMES = [constants.TRANSPOSITION_TABLE_LRU, constants.TRANSPOSITION_TABLE_DEPTH_PREFERRED]
+
+    def __init__(self, max_size, replacement=constants.TRANSPOSITION_TABLE_LRU, use_deeper_entries=False):
+        if replacement not in self.REPLACEMENT_SCHEMES:
+            raise ValueError("{} is not one of {}".format(replacement, self.REPLACEMENT_SCHEMES))
+
+        self.max_size = max_size
+        self.replacement = replacement
+        self.use_deeper_entries = use_deeper_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        # the fingerprint of the first state given each key, when config.check_hash_collisions is set
+        self.fingerprints = dict()
+
+    def key(self, mutator, prune):
+        """The key that the results of searching `mutator`'s state are stored under"""
+        key = mutator.hash, prune
+        if config.check_hash_collisions:
+            self.check_collision(key, zobrist.fingerprint(mutator.state))
+        return key
+
+    def check_collision(self, key, state_fingerprint):
+        """The state is changed by the search before `get` is called, so this is done when the key is taken"""
+        zobrist.check_collision(self.fingerprints, key, state_fingerprint)
+
+    def get(self, key, depth):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < depth or (entry[0] > depth and not self.use_deeper_entries):
+            self.misses += 1
+            return None
+
+        if self.replacement == constants.TRANSPOSITION_TABLE_LRU:
+            self.entries.move_to_end(key)
+
+        self.hits += 1
+        return entry[1]
+
+    def peek(self, key):
+        """The score lookup stored for `key` at whatever depth it was searched to, without counting a hit or a miss"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        return entry[1]
+
+    def store(self, key, depth, score_lookup):
+        existing_entry = self.entries.get(key)
+        if existing_entry is not None:
+            # a depth-preferred table never overwrites a deeper search with a shallower one
+            if self.replacement == constants.TRANSPOSITION_TABLE_DEPTH_PREFERRED and existing_entry[0] > depth:
+                return
+            self.entries[key] = (depth, score_lookup)
+            self.entries.move_to_end(key)
+            return
+
+        if len(self.entries) >= self.max_size:
+            oldest_key = next(iter(self.entries))
+            if self.replacement == constants.TRANSPOSITION_TABLE_DEPTH_PREFERRED and self.entries[oldest_key][0] > depth:
+                return
+            self.entries.popitem(last=False)
+
+        self.entries[key] = (depth, score_lookup)
+
+    def clear(self):
+        self.entries.clear()
+        self.fingerprints.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return "TranspositionTable(size={}/{}, hits={}, misses={})".format(len(self.entries), self.max_size, self.hits, self.misses)
@@ -0,0 +1,238 @@
+"""
+Zobrist-style hashing of a State
+
+Every feature of a state (a pokemon's hp, a boost, a side-condition, the weather, etc.) gets its own 64-bit key
+and the hash of a state is all of its keys XOR'd together.
+Because XOR is its own inverse, a StateMutator can keep the hash up to date by XOR-ing the old value
+of a feature out and the new value in every time an instruction is applied or reversed.
+
+A feature is a tuple describing it, and its key is 64 bits from a random.Random seeded with the feature.
+The builtin hash is salted for strings, so it would give each process different keys. These keys are the
+same in every process and every run, so hashes can be compared between the workers of a search.
+`fingerprint` is the set of features themselves, which `check_collision` compares to find two states with the same hash.
+
+Features that have a default value (a boost of 0, no status, a side-condition count of 0, etc.) have no key
+so that a state does not hash differently depending on whether a default was ever written to it
+"""
+import random
+
+import constants
+
+ZOBRIST_SEED = 'zobrist'
+
+# the keys of the features that have been seen. Keys never change, so this is emptied when it gets too big
+_keys = dict()
+_MAX_KEYS = 1000000
+
+
+BOOST_ATTRIBUTES = {
+    constants.ATTACK: 'attack_boost',
+    constants.DEFENSE: 'defense_boost',
+    constants.SPECIAL_ATTACK: 'special_attack_boost',
+    constants.SPECIAL_DEFENSE: 'special_defense_boost',
+    constants.SPEED: 'speed_boost',
+    constants.ACCURACY: 'accuracy_boost',
+    constants.EVASION: 'evasion_boost',
+}
+
+
+def _new_key(feature):
+    if len(_keys) >= _MAX_KEYS:
+        _keys.clear()
+
+    # 100 and 100.0 are the same feature, so whole floats are seeded as ints to give them the same key in every process
+    seed = repr(tuple(int(x) if isinstance(x, float) and x.is_integer() else x for x in feature))
+    key = _keys[feature] = random.Random(ZOBRIST_SEED + seed).getrandbits(64)
+    return key
+
+
+def feature_key(feature):
+    try:
+        return _keys[feature]
+    except KeyError:
+        return _new_key(feature)
+
+
+FORCE_SWITCH_FEATURE = ('force_switch',)
+WAIT_FEATURE = ('wait',)
+TRICK_ROOM_FEATURE = ('trick_room',)
+TRAPPED_FEATURES = {
+    constants.SELF: ('trapped', constants.SELF),
+    constants.OPPONENT: ('trapped', constants.OPPONENT),
+}
+FORCE_SWITCH_KEY = feature_key(FORCE_SWITCH_FEATURE)
+WAIT_KEY = feature_key(WAIT_FEATURE)
+TRICK_ROOM_KEY = feature_key(TRICK_ROOM_FEATURE)
+TRAPPED_KEYS = {side: feature_key(feature) for side, feature in TRAPPED_FEATURES.items()}
+
+
+def active_key(side_string, pkmn_id):
+    return feature_key(('active', side_string, pkmn_id))
+
+
+def static_key(side_string, pkmn):
+    """Key for the attributes of a pokemon that no instruction can change"""
+    return feature_key(static_feature(side_string, pkmn))
+
+
+def static_feature(side_string, pkmn):
+    # instructions never change pp, but the battle takes one away every time a move is used.
+    # The search only reads whether a move has pp left, so that is all that is in the key
+    # and the state after a turn can be found in the table from the turn before
+    return (
+        'static',
+        side_string,
+        pkmn.id,
+        pkmn.level,
+        pkmn.maxhp,
+        pkmn.ability,
+        pkmn.item,
+        pkmn.attack,
+        pkmn.defense,
+        pkmn.special_attack,
+        pkmn.special_defense,
+        pkmn.speed,
+        tuple(pkmn.types),
+        tuple((m[constants.ID], bool(m.get(constants.CURRENT_PP))) for m in pkmn.moves),
+        pkmn.can_mega_evo,
+        pkmn.scoring_multiplier
+    )
+
+
+def hp_key(side_string, pkmn_id, hp):
+    return feature_key(('hp', side_string, pkmn_id, hp))
+
+
+def status_key(side_string, pkmn_id, status):
+    if status is None:
+        return 0
+    return feature_key(('status', side_string, pkmn_id, status))
+
+
+def boost_key(side_string, pkmn_id, stat, amount):
+    if not amount:
+        return 0
+    return feature_key(('boost', side_string, pkmn_id, stat, amount))
+
+
+def volatile_status_key(side_string, pkmn_id, volatile_status):
+    return feature_key(('volatile_status', side_string, pkmn_id, volatile_status))
+
+
+def disabled_move_key(side_string, pkmn_id, move_name):
+    return feature_key(('disabled', side_string, pkmn_id, move_name))
+
+
+def side_condition_key(side_string, condition, amount):
+    if not amount:
+        return 0
+    return feature_key(('side_condition', side_string, condition, amount))
+
+
+def weather_key(weather):
+    if weather is None:
+        return 0
+    return feature_key(('weather', weather))
+
+
+def field_key(field):
+    if field is None:
+        return 0
+    return feature_key(('field', field))
+
+
+def pokemon_hash(side_string, pkmn):
+    h = static_key(side_string, pkmn)
+    h ^= hp_key(side_string, pkmn.id, pkmn.hp)
+    h ^= status_key(side_string, pkmn.id, pkmn.status)
+    for stat, attribute in BOOST_ATTRIBUTES.items():
+        h ^= boost_key(side_string, pkmn.id, stat, getattr(pkmn, attribute))
+    for volatile_status in pkmn.volatile_status:
+        h ^= volatile_status_key(side_string, pkmn.id, volatile_status)
+    for move in pkmn.moves:
+        if move.get(constants.DISABLED):
+            h ^= disabled_move_key(side_string, pkmn.id, move[constants.ID])
+    return h
+
+
+def side_hash(side_string, side):
+    h = active_key(side_string, side.active.id)
+    h ^= pokemon_hash(side_string, side.active)
+    for pkmn in side.reserve.values():
+        h ^= pokemon_hash(side_string, pkmn)
+    for condition, amount in side.side_conditions.items():
+        h ^= side_condition_key(side_string, condition, amount)
+    return h
+
+
+def calculate_zobrist_hash(state):
+    """The hash of `state` without the flags that instructions never change (force_switch, wait, trapped)"""
+    h = side_hash(constants.SELF, state.self)
+    h ^= side_hash(constants.OPPONENT, state.opponent)
+    h ^= weather_key(state.weather)
+    h ^= field_key(state.field)
+    if state.trick_room:
+        h ^= TRICK_ROOM_KEY
+    return h
+
+
+def flags_hash(state):
+    h = 0
+    if state.force_switch:
+        h ^= FORCE_SWITCH_KEY
+    if state.wait:
+        h ^= WAIT_KEY
+    if state.self.trapped:
+        h ^= TRAPPED_KEYS[constants.SELF]
+    if state.opponent.trapped:
+        h ^= TRAPPED_KEYS[constants.OPPONENT]
+    return h
+
+
+def full_hash(state):
+    """Recomputes from scratch what `StateMutator.hash` maintains incrementally"""
+    return calculate_zobrist_hash(state) ^ flags_hash(state)
+
+
+def fingerprint(state):
+    """Every feature of `state` that has a key, so two states have the same fingerprint only if they are the same"""
+    features = set()
+    for side_string in (constants.SELF, constants.OPPONENT):
+        side = getattr(state, side_string)
+        features.add(('active', side_string, side.active.id))
+        for pkmn in [side.active] + list(side.reserve.values()):
+            features.add(static_feature(side_string, pkmn))
+            features.add(('hp', side_string, pkmn.id, pkmn.hp))
+            if pkmn.status is not None:
+                features.add(('status', side_string, pkmn.id, pkmn.status))
+            for stat, attribute in BOOST_ATTRIBUTES.items():
+                if getattr(pkmn, attribute):
+                    features.add(('boost', side_string, pkmn.id, stat, getattr(pkmn, attribute)))
+            for volatile_status in pkmn.volatile_status:
+                features.add(('volatile_status', side_string, pkmn.id, volatile_status))
+            for move in pkmn.moves:
+                if move.get(constants.DISABLED):
+                    features.add(('disabled', side_string, pkmn.id, move[constants.ID]))
+        for condition, amount in side.side_conditions.items():
+            if amount:
+                features.add(('side_condition', side_string, condition, amount))
+        if side.trapped:
+            features.add(TRAPPED_FEATURES[side_string])
+
+    if state.weather is not None:
+        features.add(('weather', state.weather))
+    if state.field is not None:
+        features.add(('field', state.field))
+    if state.trick_room:
+        features.add(TRICK_ROOM_FEATURE)
+    if state.force_switch:
+        features.add(FORCE_SWITCH_FEATURE)
+    if state.wait:
+        features.add(WAIT_FEATURE)
+    return frozenset(features)
+
+
+def check_collision(fingerprints, key, state_fingerprint):
+    """Raises a ValueError if `key` has been given to a state with a different fingerprint"""
+    if fingerprints.setdefault(key, state_fingerprint) != state_fingerprint:
+        raise ValueError("Hash collision: {} is the key of two different states".format(key))
@@ -0,0 +1,159 @@
+"""
+A long-lived pool of workers that find the nash equilibria of score lookups
+
+The score lookups of every battle from `prepare_battles` are sent to the workers together and solved at the same time.
+Only the solvers that run in Python are pooled. Gambit is a separate executable that solves one game each time it is
+run, so there is no worker to keep alive for it and its equilibria are found one after the other in this process.
+A score lookup that fails is sent again by the pool, after the workers have been restarted if one of them crashed,
+until the turn's deadline passes.
+"""
+import os
+import signal
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+
+import constants
+import config
+from config import logger
+
+from showdown import decide
+from showdown.engine.parallel import get_context
+from showdown.engine.parallel import get_worker_settings
+from showdown.engine.parallel import apply_worker_settings
+from showdown.engine.parallel import is_stale
+
+
+# the number of times a score lookup is sent to the workers before giving up on it
+SOLVER_ATTEMPTS = 3
+
+# seconds that every worker has to answer a health check
+HEALTH_CHECK_TIMEOUT = 5
+
+_equilibrium_solver_pool = None
+
+# waited on by every worker during a health check, set in each worker by `_initialize_worker`
+_health_check_barrier = None
+
+
+def _initialize_worker(settings, health_check_barrier):
+    global _health_check_barrier
+    apply_worker_settings(settings)
+    _health_check_barrier = health_check_barrier
+
+
+def _ping():
+    """Returns once every worker is answering a ping, so that one worker cannot answer for another"""
+    _health_check_barrier.wait(HEALTH_CHECK_TIMEOUT)
+    return os.getpid()
+
+
+class EquilibriumSolverPool:
+    """Worker processes that stay alive between turns and run `find_nash_equilibrium`"""
+
+    def __init__(self, processes):
+        self.processes = processes
+        self.restarts = 0
+        self.worker_pids = set()
+        # the futures that were last submitted, which are cancelled when the workers are stopped
+        self.futures = list()
+        self.executor = self._create_executor()
+
+    def _create_executor(self):
+        context = get_context()
+        self.settings = get_worker_settings()
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=context,
+            initializer=_initialize_worker,
+            initargs=(self.settings, context.Barrier(self.processes))
+        )
+
+    def is_healthy(self):
+        """Every worker answers a ping within HEALTH_CHECK_TIMEOUT seconds"""
+        try:
+            self.futures = [self.executor.submit(_ping) for _ in range(self.processes)]
+            done, not_done = concurrent.futures.wait(self.futures, timeout=HEALTH_CHECK_TIMEOUT * 2)
+        except BrokenProcessPool:
+            return False
+
+        if not_done or any(f.exception() is not None for f in done):
+            return False
+
+        self.worker_pids = {f.result() for f in done}
+        return True
+
+    def _stop_executor(self):
+        # a worker that is stuck would stop the executor from shutting down
+        for pid in self.worker_pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        self.worker_pids = set()
+        for future in self.futures:
+            future.cancel()
+        self.futures = list()
+        self.executor.shutdown(wait=False)
+
+    def restart(self):
+        logger.warning("Restarting the equilibrium solver workers")
+        self._stop_executor()
+        self.executor = self._create_executor()
+        self.restarts += 1
+
+    def find_nash_equilibria(self, score_lookups, deadline=None):
+        """
+        :param deadline: a Deadline for all of the score lookups, after which CouldNotFindEquilibriumError is raised
+        :return: the result of `find_nash_equilibrium` for each score lookup, in the same order
+        """
+        if not self.is_healthy():
+            self.restart()
+
+        results = [None] * len(score_lookups)
+        remaining = list(range(len(score_lookups)))
+        error = None
+        for _ in range(SOLVER_ATTEMPTS):
+            futures = {i: self.executor.submit(decide.find_nash_equilibrium, score_lookups[i], deadline) for i in remaining}
+            self.futures = list(futures.values())
+
+            remaining = list()
+            crashed = False
+            for i, future in futures.items():
+                try:
+                    results[i] = future.result(timeout=deadline.remaining() if deadline is not None else None)
+                except concurrent.futures.TimeoutError:
+                    # a worker that is still solving would hold up the next turn
+                    self.restart()
+                    raise decide.CouldNotFindEquilibriumError("The equilibria were not found in time")
+                except BrokenProcessPool as e:
+                    remaining.append(i)
+                    crashed = True
+                    error = e
+                except decide.CouldNotFindEquilibriumError as e:
+                    remaining.append(i)
+                    error = e
+
+            if not remaining:
+                return results
+            if crashed:
+                self.restart()
+
+        raise decide.CouldNotFindEquilibriumError(error)
+
+    def shutdown(self):
+        self._stop_executor()
+
+
+def get_equilibrium_solver_pool():
+    global _equilibrium_solver_pool
+    if _equilibrium_solver_pool is not None and is_stale(_equilibrium_solver_pool):
+        _equilibrium_solver_pool.shutdown()
+        _equilibrium_solver_pool = None
+
+    if config.equilibrium_solver_processes <= 1 or config.equilibrium_solver == constants.EQUILIBRIUM_SOLVER_GAMBIT:
+        return None
+
+    if _equilibrium_solver_pool is None:
+        _equilibrium_solver_pool = EquilibriumSolverPool(config.equilibrium_solver_processes)
+
+    return _equilibrium_solver_pool
@@ -110,38 +110,34 @@ def evaluate_matchup(user_pkmn, opponent_pkmn):
     elif user_pkmn.speed < opponent_pkmn.speed:
         score -= Scoring.FASTER_POKEMON_IN_MATCHUP
 
+    score += evaluate_type_matchup(user_pkmn.types, opponent_pkmn.types)
+
+    return score
+
+
+def evaluate_type_matchup(user_types, opponent_types):
+    score = 0
+
     # positive bonus for the bot's type being super effective against the opponent
-    for user_type in user_pkmn.types:
-        if is_super_effective(user_type, opponent_pkmn.types):
+    for user_type in user_types:
+        if is_super_effective(user_type, opponent_types):
             score += Scoring.WEAK_TO_OPPONENT_TYPE
 
     # negative bonus for the opponent's type being super effective against the bot's
-    for opponent_type in opponent_pkmn.types:
-        if is_super_effective(opponent_type, user_pkmn.types):
+    for opponent_type in opponent_types:
+        if is_super_effective(opponent_type, user_types):
             score -= Scoring.WEAK_TO_OPPONENT_TYPE
 
     return score
 
 
-def evaluate(state):
+def evaluate_side_conditions(state):
     score = 0
 
     number_of_opponent_reserve_revealed = len(state.opponent.reserve) + 1
     bot_alive_reserve_count = len([p.hp for p in state.self.reserve.values() if p.hp > 0])
     opponent_alive_reserves_count = len([p for p in state.opponent.reserve.values() if p.hp > 0]) + (6-number_of_opponent_reserve_revealed)
 
-    # evaluate the bot's pokemon
-    score += evaluate_pokemon(state.self.active)
-    for pkmn in state.self.reserve.values():
-        this_pkmn_score = evaluate_pokemon(pkmn)
-        score += this_pkmn_score
-
-    # evaluate the opponent's visible pokemon
-    score -= evaluate_pokemon(state.opponent.active)
-    for pkmn in state.opponent.reserve.values():
-        this_pkmn_score = evaluate_pokemon(pkmn)
-        score -= this_pkmn_score
-
     # evaluate the side-conditions for the bot
     for condition, count in state.self.side_conditions.items():
         if condition in Scoring.STATIC_SCORED_SIDE_CONDITIONS:
@@ -156,6 +152,25 @@ def evaluate(state):
         elif condition in Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS:
             score -= count * Scoring.POKEMON_COUNT_SCORED_SIDE_CONDITIONS[condition] * opponent_alive_reserves_count
 
+    return score
+
+
+def evaluate(state):
+    score = 0
+
+    # evaluate the bot's pokemon
+    score += evaluate_pokemon(state.self.active)
+    for pkmn in state.self.reserve.values():
+        this_pkmn_score = evaluate_pokemon(pkmn)
+        score += this_pkmn_score
+
+    # evaluate the opponent's visible pokemon
+    score -= evaluate_pokemon(state.opponent.active)
+    for pkmn in state.opponent.reserve.values():
+        this_pkmn_score = evaluate_pokemon(pkmn)
+        score -= this_pkmn_score
+
+    score += evaluate_side_conditions(state)
     score += evaluate_matchup(state.self.active, state.opponent.active)
 
     return int(score)
@@ -0,0 +1,189 @@
+"""
+Payoff matrices as NumPy arrays
+
+A PayoffMatrix holds the score of every move combination in a float64 array with a row for each of the bot's moves
+and a column for each of the opponent's, so that decisions can be made on the whole array at once.
+It can also be read like the `{(bot_move, opponent_move): score}` dictionaries that `get_payoff_matrix` returns.
+"""
+from collections.abc import Mapping
+
+import numpy as np
+
+
+class PayoffMatrix(Mapping):
+    """
+    :param scores: a 2d float64 array of the bot's score for each move combination
+    :param bot_moves: the label of each row
+    :param opponent_moves: the label of each column
+    :param present: a boolean array of the move combinations that have a score.
+                    A score lookup does not need to have every combination of its bot and opponent moves
+    """
+
+    def __init__(self, scores, bot_moves, opponent_moves, present=None):
+        self.scores = scores
+        self.bot_moves = list(bot_moves)
+        self.opponent_moves = list(opponent_moves)
+        self.present = present if present is not None else np.ones(scores.shape, dtype=bool)
+        self._rows = {m: i for i, m in enumerate(self.bot_moves)}
+        self._columns = {m: i for i, m in enumerate(self.opponent_moves)}
+
+    @classmethod
+    def from_score_lookup(cls, score_lookup):
+        """The rows and columns are in the order that their moves first appear in `score_lookup`"""
+        if isinstance(score_lookup, PayoffMatrix):
+            return score_lookup
+
+        rows = dict()
+        columns = dict()
+        for bot_move, opponent_move in score_lookup:
+            rows.setdefault(bot_move, len(rows))
+            columns.setdefault(opponent_move, len(columns))
+
+        scores = np.full((len(rows), len(columns)), np.nan)
+        present = np.zeros((len(rows), len(columns)), dtype=bool)
+        for (bot_move, opponent_move), score in score_lookup.items():
+            scores[rows[bot_move], columns[opponent_move]] = score
+            present[rows[bot_move], columns[opponent_move]] = True
+
+        return cls(scores, rows, columns, present)
+
+    @classmethod
+    def merge(cls, payoff_matrices):
+        """
+        Puts the columns of each matrix side by side. Rows with the same move are joined together.
+        No two matrices can have the same opponent move
+        """
+        rows = dict()
+        for payoff_matrix in payoff_matrices:
+            for bot_move in payoff_matrix.bot_moves:
+                rows.setdefault(bot_move, len(rows))
+
+        scores = list()
+        present = list()
+        opponent_moves = list()
+        for payoff_matrix in payoff_matrices:
+            row_indices = [rows[m] for m in payoff_matrix.bot_moves]
+            these_scores = np.full((len(rows), len(payoff_matrix.opponent_moves)), np.nan)
+            these_scores[row_indices] = payoff_matrix.scores
+            this_present = np.zeros((len(rows), len(payoff_matrix.opponent_moves)), dtype=bool)
+            this_present[row_indices] = payoff_matrix.present
+            scores.append(these_scores)
+            present.append(this_present)
+            opponent_moves += payoff_matrix.opponent_moves
+
+        if len(opponent_moves) != len(set(opponent_moves)):
+            raise ValueError("Payoff matrices that are merged cannot have the same opponent moves: {}".format(opponent_moves))
+
+        return cls(np.hstack(scores), rows, opponent_moves, np.hstack(present))
+
+    def __getitem__(self, move_combination):
+        bot_move, opponent_move = move_combination
+        row = self._rows[bot_move]
+        column = self._columns[opponent_move]
+        if not self.present[row, column]:
+            raise KeyError(move_combination)
+        return float(self.scores[row, column])
+
+    def __iter__(self):
+        for row, column in zip(*np.nonzero(self.present)):
+            yield self.bot_moves[row], self.opponent_moves[column]
+
+    def __len__(self):
+        return int(self.present.sum())
+
+    def __repr__(self):
+        return "PayoffMatrix({})".format(dict(self))
+
+    def prefix_opponent_moves(self, prefix):
+        """The same matrix with "{opponent_move}_{prefix}" as the opponent's moves"""
+        opponent_moves = ["{}_{}".format(m, prefix) for m in self.opponent_moves]
+        return PayoffMatrix(self.scores, self.bot_moves, opponent_moves, self.present)
+
+    def remove_guaranteed_opponent_moves(self):
+        """The columns where the bot's choice changes its score. See `decide.remove_guaranteed_opponent_moves`"""
+        if len(self.bot_moves) == 1 or len(self.opponent_moves) == 1:
+            return self
+
+        # the first score of each column that every other score is compared against
+        first_rows = self.present.argmax(axis=0)
+        first_scores = self.scores[first_rows, np.arange(len(self.opponent_moves))]
+        with np.errstate(invalid='ignore'):
+            different = self.present & (self.scores != first_scores) & ~np.isnan(self.scores)
+        different[first_rows, np.arange(len(self.opponent_moves))] = False
+        columns = np.nonzero(different.any(axis=0))[0]
+
+        return PayoffMatrix(
+            self.scores[:, columns],
+            self.bot_moves,
+            [self.opponent_moves[c] for c in columns],
+            self.present[:, columns]
+        )
+
+    def remove_dominated_moves(self, weakly=False):
+        """
+        Iterated elimination of the moves that are dominated by another of the same player's moves
+        A bot move is strictly dominated if another scores higher against every remaining opponent move,
+        and an opponent move is strictly dominated if another gives the bot a lower score against every remaining bot move.
+        Only strictly dominated moves are removed unless `weakly` is set, which also removes moves that another
+        move does at least as well as everywhere and better somewhere.
+        Missing or nan scores never count towards a move being dominated
+        """
+        scores = np.where(self.present, self.scores, np.nan)
+        rows = np.arange(len(self.bot_moves))
+        columns = np.arange(len(self.opponent_moves))
+
+        with np.errstate(invalid='ignore'):
+            while True:
+                remaining = scores[np.ix_(rows, columns)]
+
+                # better[i, k] is true when row k dominates row i
+                better = _dominates(remaining[np.newaxis, :, :], remaining[:, np.newaxis, :], weakly)
+                dominated_rows = better.any(axis=1)
+                if dominated_rows.any() and len(rows) > 1:
+                    rows = rows[~dominated_rows]
+                    continue
+
+                # better[j, l] is true when column l dominates column j for the opponent
+                better = _dominates(-remaining.T[np.newaxis, :, :], -remaining.T[:, np.newaxis, :], weakly)
+                dominated_columns = better.any(axis=1)
+                if dominated_columns.any() and len(columns) > 1:
+                    columns = columns[~dominated_columns]
+                    continue
+
+                break
+
+        return PayoffMatrix(
+            self.scores[np.ix_(rows, columns)],
+            [self.bot_moves[r] for r in rows],
+            [self.opponent_moves[c] for c in columns],
+            self.present[np.ix_(rows, columns)]
+        )
+
+    def safest(self):
+        """
+        The bot's move with the best worst-case score, after the opponent's guaranteed moves are removed
+        :return: the move combination of that worst case, and its score. The same as `decide.pick_safest`
+        """
+        payoff_matrix = self.remove_guaranteed_opponent_moves()
+        if not len(payoff_matrix):
+            payoff_matrix = self
+
+        # scores that are nan or missing can never be the worst case
+        scores = np.where(payoff_matrix.present & ~np.isnan(payoff_matrix.scores), payoff_matrix.scores, np.inf)
+        worst_columns = scores.argmin(axis=1)
+        worst_scores = scores[np.arange(len(payoff_matrix.bot_moves)), worst_columns]
+
+        # only rows with a score are considered, in the same way that `pick_safest` never sees rows without one
+        rows = np.nonzero(payoff_matrix.present.any(axis=1))[0]
+        row = rows[worst_scores[rows].argmax()]
+        if worst_scores[row] == np.inf:
+            return tuple(), float('inf')
+
+        move_combination = (payoff_matrix.bot_moves[row], payoff_matrix.opponent_moves[worst_columns[row]])
+        return move_combination, float(worst_scores[row])
+
+
+def _dominates(dominating, dominated, weakly):
+    if weakly:
+        return (dominating >= dominated).all(axis=2) & (dominating > dominated).any(axis=2)
+    return (dominating > dominated).all(axis=2)
@@ -0,0 +1,45 @@
+from collections import defaultdict
+
+import constants
+from showdown.engine.objects import State
+from showdown.engine.objects import Side
+from showdown.engine.objects import Pokemon
+from showdown.battle import Pokemon as StatePokemon
+
+
+def get_moves(*move_names):
+    return [{constants.ID: move_name, constants.DISABLED: False, constants.CURRENT_PP: 16} for move_name in move_names]
+
+
+def get_state(user_reserve=("xatu",), opponent="aromatisse", opponent_reserve=("yveltal",), user_moves=None, opponent_moves=None):
+    """
+    The state that the searches are tested from: a level 73 raichu with level 81 `user_reserve` against
+    a level 81 `opponent` with level 73 `opponent_reserve`
+    The active pokemon keep the moves of their random battle sets unless `user_moves` or `opponent_moves` are given
+    """
+    state = State(
+        Side(
+            Pokemon.from_state_pokemon_dict(StatePokemon("raichu", 73).to_dict()),
+            {name: Pokemon.from_state_pokemon_dict(StatePokemon(name, 81).to_dict()) for name in user_reserve},
+            defaultdict(lambda: 0),
+            False
+        ),
+        Side(
+            Pokemon.from_state_pokemon_dict(StatePokemon(opponent, 81).to_dict()),
+            {name: Pokemon.from_state_pokemon_dict(StatePokemon(name, 73).to_dict()) for name in opponent_reserve},
+            defaultdict(lambda: 0),
+            False
+        ),
+        None,
+        None,
+        False,
+        False,
+        False
+    )
+
+    if user_moves is not None:
+        state.self.active.moves = get_moves(*user_moves)
+    if opponent_moves is not None:
+        state.opponent.active.moves = get_moves(*opponent_moves)
+
+    return state
@@ -0,0 +1,93 @@
+import unittest
+from copy import deepcopy
+
+import constants
+import config
+from showdown.engine.objects import StateMutator
+from showdown.evaluate import evaluate
+from showdown.batch_evaluate import LeafBatch
+from showdown.engine.select_best_move import get_payoff_matrix
+from tests.fixtures import get_state
+
+
+class TestLeafBatch(unittest.TestCase):
+    def setUp(self):
+        self.state = get_state(user_reserve=("xatu", "starmie"), user_moves=('thunderbolt', 'nastyplot'), opponent_moves=('moonblast', 'calmmind'))
+
+    def assert_batch_matches_evaluate(self, states):
+        batch = LeafBatch()
+        for state in states:
+            batch.add(state)
+
+        self.assertEqual([evaluate(s) for s in states], batch.evaluate())
+
+    def test_starting_state_scores_the_same_as_evaluate(self):
+        self.assert_batch_matches_evaluate([self.state])
+
+    def test_damaged_and_fainted_pokemon_score_the_same_as_evaluate(self):
+        self.state.self.active.hp = 101
+        self.state.opponent.active.hp = 0
+        self.state.opponent.reserve["yveltal"].hp = 13
+
+        self.assert_batch_matches_evaluate([self.state])
+
+    def test_boosts_and_statuses_score_the_same_as_evaluate(self):
+        self.state.self.active.special_attack_boost = 6
+        self.state.self.active.speed_boost = -3
+        self.state.self.active.status = constants.PARALYZED
+        self.state.opponent.active.evasion_boost = -6
+        self.state.opponent.active.status = constants.TOXIC
+
+        self.assert_batch_matches_evaluate([self.state])
+
+    def test_volatile_statuses_score_the_same_as_evaluate(self):
+        self.state.self.active.volatile_status = {constants.SUBSTITUTE, constants.CONFUSION, 'roost'}
+        self.state.opponent.active.volatile_status = {constants.LEECH_SEED}
+
+        self.assert_batch_matches_evaluate([self.state])
+
+    def test_side_conditions_score_the_same_as_evaluate(self):
+        self.state.self.side_conditions[constants.STEALTH_ROCK] = 1
+        self.state.self.side_conditions[constants.REFLECT] = 1
+        self.state.opponent.side_conditions[constants.SPIKES] = 3
+
+        self.assert_batch_matches_evaluate([self.state])
+
+    def test_scoring_multiplier_scores_the_same_as_evaluate(self):
+        self.state.opponent.active.scoring_multiplier = 0.75
+
+        self.assert_batch_matches_evaluate([self.state])
+
+    def test_states_keep_their_scores_when_changed_after_being_added(self):
+        states = list()
+        for hp in [200, 150, 1, 0]:
+            self.state.self.active.hp = hp
+            states.append(deepcopy(self.state))
+
+        batch = LeafBatch()
+        for hp in [200, 150, 1, 0]:
+            self.state.self.active.hp = hp
+            batch.add(self.state)
+
+        self.assertEqual([evaluate(s) for s in states], batch.evaluate())
+
+    def test_empty_batch_has_no_scores(self):
+        self.assertEqual([], LeafBatch().evaluate())
+
+
+class TestBatchEvaluationSearch(unittest.TestCase):
+    def setUp(self):
+        TestLeafBatch.setUp(self)
+        self.batch_evaluation = config.batch_evaluation
+
+    def tearDown(self):
+        config.batch_evaluation = self.batch_evaluation
+
+    def test_search_with_batch_evaluation_gives_the_same_scores(self):
+        config.batch_evaluation = False
+        expected_scores = get_payoff_matrix(StateMutator(deepcopy(self.state)), depth=2, prune=False)
+
+        config.batch_evaluation = True
+        scores = get_payoff_matrix(StateMutator(self.state), depth=2, prune=False)
+
+        self.assertEqual(expected_scores, scores)
@@ -1,6 +1,12 @@
 import unittest
+import config
 import constants
 from showdown.damage_calculator import calculate_damage
+from showdown.damage_calculator import calculate_damage_in_conditions
+from showdown.damage_calculator import get_damage
+from showdown.damage_calculator import get_damage_calculation_cache
+from showdown.damage_calculator import DamageCalculationCache
+from showdown.damage_calculator import type_effectiveness_modifier
 from showdown.engine.objects import Pokemon
 from showdown.battle import Pokemon as StatePokemon
 
@@ -234,3 +240,142 @@ class TestCalculateDamage(unittest.TestCase):
 
         dmg = calculate_damage(self.charizard, self.venusaur, move, calc_type='max')
         self.assertEqual([597], dmg)
+
+    def test_thousandarrows_hits_a_flying_type(self):
+        garchomp = Pokemon.from_state_pokemon_dict(StatePokemon("garchomp", 100).to_dict())
+        skarmory = Pokemon.from_state_pokemon_dict(StatePokemon("skarmory", 100).to_dict())
+
+        dmg = calculate_damage(garchomp, skarmory, 'thousandarrows', calc_type='max')
+        self.assertEqual([219], dmg)
+
+    def test_ground_move_hits_a_roosting_flying_type_without_changing_its_types(self):
+        garchomp = Pokemon.from_state_pokemon_dict(StatePokemon("garchomp", 100).to_dict())
+        skarmory = Pokemon.from_state_pokemon_dict(StatePokemon("skarmory", 100).to_dict())
+        skarmory.volatile_status.add(constants.ROOST)
+
+        dmg = calculate_damage(garchomp, skarmory, 'earthquake', calc_type='max')
+        self.assertEqual([243], dmg)
+        self.assertEqual(['steel', 'flying'], skarmory.types)
+
+    def test_unaware_defender_ignores_attack_boosts(self):
+        self.charizard.attack_boost = 2
+        self.venusaur.ability = 'unaware'
+
+        dmg = calculate_damage(self.charizard, self.venusaur, 'flareblitz', calc_type='max')
+        self.assertEqual([309], dmg)
+
+    def test_unaware_attacker_ignores_defense_boosts(self):
+        self.charizard.attack_boost = 2
+        self.charizard.ability = 'unaware'
+        self.venusaur.defense_boost = 2
+
+        dmg = calculate_damage(self.charizard, self.venusaur, 'flareblitz', calc_type='max')
+        self.assertEqual([615], dmg)
+
+    def test_desolate_land_stops_water_moves(self):
+        blastoise = Pokemon.from_state_pokemon_dict(StatePokemon("blastoise", 100).to_dict())
+
+        dmg = calculate_damage(blastoise, self.charizard, 'surf', {constants.WEATHER: constants.DESOLATE_LAND}, calc_type='max')
+        self.assertEqual([0], dmg)
+
+    def test_conditions_given_on_their_own_give_the_same_damage_as_a_conditions_dict(self):
+        conditions = {
+            constants.WEATHER: constants.SUN,
+            constants.TERRAIN: constants.PSYCHIC_TERRAIN,
+            constants.LIGHT_SCREEN: 1,
+        }
+
+        dmg = calculate_damage_in_conditions(self.charizard, self.venusaur, 'fireblast', constants.SUN, constants.PSYCHIC_TERRAIN, 0, 1, 0, 'min_max')
+        self.assertEqual(sorted(calculate_damage(self.charizard, self.venusaur, 'fireblast', conditions, calc_type='min_max')), sorted(dmg))
+
+
+class TestTypeEffectivenessModifier(unittest.TestCase):
+    def test_super_effective_against_both_types(self):
+        self.assertEqual(4, type_effectiveness_modifier('ice', ['grass', 'dragon']))
+
+    def test_immune_type_gives_no_damage(self):
+        self.assertEqual(0, type_effectiveness_modifier('ground', ['flying', 'steel']))
+
+    def test_names_that_are_not_normalized_are_looked_up_by_their_normalized_name(self):
+        self.assertEqual(0.25, type_effectiveness_modifier('Fire', ['Water', 'Dragon']))
+
+    def test_unknown_type_raises_key_error(self):
+        with self.assertRaises(KeyError):
+            type_effectiveness_modifier('notatype', ['water'])
+
+
+class TestDamageCalculationCache(unittest.TestCase):
+    def setUp(self):
+        self.damage_calculation_cache_size = config.damage_calculation_cache_size
+        config.damage_calculation_cache_size = 100
+        TestCalculateDamage.setUp(self)
+        self.cache = get_damage_calculation_cache()
+        self.cache.clear()
+
+    def tearDown(self):
+        config.damage_calculation_cache_size = self.damage_calculation_cache_size
+
+    def test_repeated_calculation_is_a_hit(self):
+        calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max')
+        dmg = calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max')
+
+        self.assertEqual([300], dmg)
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(1, self.cache.misses)
+
+    def test_changed_boost_is_not_a_hit(self):
+        calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max')
+        self.charizard.special_attack_boost = 2
+        dmg = calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max')
+
+        self.assertEqual([597], dmg)
+        self.assertEqual(0, self.cache.hits)
+
+    def test_changed_conditions_are_not_a_hit(self):
+        calculate_damage(self.charizard, self.venusaur, 'psychic', calc_type='max')
+        dmg = calculate_damage(self.charizard, self.venusaur, 'psychic', {constants.LIGHT_SCREEN: 1}, calc_type='max')
+
+        self.assertEqual([82], dmg)
+        self.assertEqual(0, self.cache.hits)
+
+    def test_different_calc_type_is_not_a_hit(self):
+        calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max')
+        dmg = calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='min_max')
+
+        self.assertEqual(sorted(get_damage(self.charizard, self.venusaur, 'fireblast', calc_type='min_max')), sorted(dmg))
+        self.assertEqual(0, self.cache.hits)
+
+    def test_special_logic_moves_are_calculated_from_the_current_hit_points(self):
+        calculate_damage(self.charizard, self.venusaur, 'superfang')
+        self.venusaur.hp = 100
+        dmg = calculate_damage(self.charizard, self.venusaur, 'superfang')
+
+        self.assertEqual([50], dmg)
+        self.assertEqual(0, len(self.cache))
+
+    def test_changing_the_returned_list_does_not_change_the_cached_result(self):
+        calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max').append(1)
+        dmg = calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max')
+
+        self.assertEqual([300], dmg)
+
+    def test_invalid_calc_type_still_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='min')
+
+    def test_cache_is_off_when_its_size_is_zero(self):
+        config.damage_calculation_cache_size = 0
+        self.assertIsNone(get_damage_calculation_cache())
+
+        self.assertEqual([300], calculate_damage(self.charizard, self.venusaur, 'fireblast', calc_type='max'))
+
+    def test_least_recently_used_result_is_removed_when_full(self):
+        cache = DamageCalculationCache(2)
+        cache.store('a', [1])
+        cache.store('b', [2])
+        cache.get('a')
+        cache.store('c', [3])
+
+        self.assertEqual([1], cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(2, len(cache))
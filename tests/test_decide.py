@@ -1,8 +1,24 @@
+import os
+import stat
+import tempfile
 import unittest
 from unittest import mock
 
 from showdown.decide import pick_safest
 from showdown.decide import get_weighted_choices_from_multiple_score_lookups
+from showdown.decide import find_game_value
+from showdown.decide import find_equilibria
+from showdown.decide import find_all_equilibria
+from showdown.decide import CouldNotFindEquilibriumError
+from showdown.decide import find_equilibrium_with_linear_program
+from showdown.decide import find_nash_equilibrium
+from showdown.decide import find_equilibrium_with_regret_matching
+from showdown.decide import regret_matching
+from showdown.decide import get_exploitability
+import numpy as np
+
+import constants
+import config
 
 
 class TestPickSafest(unittest.TestCase):
@@ -165,3 +181,251 @@ class TestGetWeightedChoices(unittest.TestCase):
         expected_choices = [('a', 0.75), ('b', 0.25)]
 
         self.assertEqual(expected_choices, choices)
+
+
+class TestFindGameValue(unittest.TestCase):
+    def test_returns_pure_strategy_for_game_with_a_saddle_point(self):
+        matrix = [
+            [3, 1],
+            [4, 2]
+        ]
+
+        strategy, value = find_game_value(matrix)
+
+        self.assertEqual([0, 1], strategy)
+        self.assertEqual(2, value)
+
+    def test_returns_even_mixed_strategy_for_matching_pennies(self):
+        matrix = [
+            [1, -1],
+            [-1, 1]
+        ]
+
+        strategy, value = find_game_value(matrix)
+
+        self.assertAlmostEqual(0.5, strategy[0])
+        self.assertAlmostEqual(0.5, strategy[1])
+        self.assertAlmostEqual(0, value)
+
+    def test_returns_uneven_mixed_strategy_for_2x2_game_without_a_saddle_point(self):
+        matrix = [
+            [4, 1],
+            [2, 3]
+        ]
+
+        strategy, value = find_game_value(matrix)
+
+        self.assertAlmostEqual(0.25, strategy[0])
+        self.assertAlmostEqual(0.75, strategy[1])
+        self.assertAlmostEqual(2.5, value)
+
+    def test_returns_mixed_strategy_for_non_square_game(self):
+        matrix = [
+            [2, -1, 0],
+            [-1, 1, 3]
+        ]
+
+        strategy, value = find_game_value(matrix)
+
+        self.assertAlmostEqual(0.4, strategy[0])
+        self.assertAlmostEqual(0.6, strategy[1])
+        self.assertAlmostEqual(0.2, value)
+
+
+class TestFindEquilibriumWithLinearProgram(unittest.TestCase):
+    def setUp(self):
+        self.equilibrium_solver = config.equilibrium_solver
+        config.equilibrium_solver = constants.EQUILIBRIUM_SOLVER_LINEAR_PROGRAM
+
+    def tearDown(self):
+        config.equilibrium_solver = self.equilibrium_solver
+
+    def test_returns_pure_strategies_for_game_with_a_saddle_point(self):
+        matrix = [
+            [3, 1],
+            [4, 2]
+        ]
+
+        bot_percentages, opponent_percentages = find_equilibrium_with_linear_program(matrix)
+
+        self.assertEqual([0, 1], bot_percentages)
+        self.assertEqual([0, 1], opponent_percentages)
+
+    def test_returns_even_mixed_strategies_for_rock_paper_scissors(self):
+        matrix = [
+            [0, -1, 1],
+            [1, 0, -1],
+            [-1, 1, 0]
+        ]
+
+        bot_percentages, opponent_percentages = find_equilibrium_with_linear_program(matrix)
+
+        for percentage in bot_percentages + opponent_percentages:
+            self.assertAlmostEqual(1/3, percentage)
+
+    def test_returns_both_players_strategies_for_non_square_game(self):
+        matrix = [
+            [2, -1, 0],
+            [-1, 1, 3]
+        ]
+
+        bot_percentages, opponent_percentages = find_equilibrium_with_linear_program(matrix)
+
+        self.assertAlmostEqual(0.4, bot_percentages[0])
+        self.assertAlmostEqual(0.6, bot_percentages[1])
+        self.assertAlmostEqual(0.4, opponent_percentages[0])
+        self.assertAlmostEqual(0.6, opponent_percentages[1])
+        self.assertEqual(0, opponent_percentages[2])
+
+    def test_scores_are_rounded_like_they_are_for_gambit(self):
+        matrix = [
+            [0.4, -0.4],
+            [-0.4, 0.4]
+        ]
+
+        bot_percentages, _ = find_equilibrium_with_linear_program(matrix)
+
+        self.assertEqual(1, sum(bot_percentages))
+        self.assertIn(1, bot_percentages)
+
+    def test_find_nash_equilibrium_does_not_start_a_subprocess(self):
+        score_lookup = {
+            ('a', 'c'): 1,
+            ('a', 'd'): -1,
+            ('b', 'c'): -1,
+            ('b', 'd'): 1,
+        }
+
+        with mock.patch('showdown.decide.subprocess.Popen') as popen_mock:
+            bot_choices, opponent_choices, bot_percentages, opponent_percentages, score = find_nash_equilibrium(score_lookup)
+
+        popen_mock.assert_not_called()
+        self.assertEqual(['a', 'b'], list(bot_choices))
+        self.assertEqual(['c', 'd'], list(opponent_choices))
+        self.assertAlmostEqual(0.5, bot_percentages[0])
+        self.assertAlmostEqual(0.5, opponent_percentages[0])
+        self.assertAlmostEqual(0, score)
+
+    def test_removed_dominated_moves_are_given_no_percentage(self):
+        self.remove_dominated_moves = config.remove_dominated_moves
+        self.addCleanup(setattr, config, 'remove_dominated_moves', self.remove_dominated_moves)
+        config.remove_dominated_moves = True
+        score_lookup = {
+            ('a', 'c'): 1,
+            ('a', 'd'): -1,
+            ('b', 'c'): -1,
+            ('b', 'd'): 1,
+            ('e', 'c'): -2,
+            ('e', 'd'): -2,
+        }
+
+        bot_choices, _, bot_percentages, _, score = find_nash_equilibrium(score_lookup)
+
+        self.assertEqual(['a', 'b', 'e'], list(bot_choices))
+        self.assertAlmostEqual(0.5, bot_percentages[0])
+        self.assertAlmostEqual(0.5, bot_percentages[1])
+        self.assertEqual(0, bot_percentages[2])
+        self.assertAlmostEqual(0, score)
+
+    def test_invalid_solver_raises_value_error(self):
+        config.equilibrium_solver = 'not_a_solver'
+
+        with self.assertRaises(ValueError):
+            find_equilibria([[1]])
+
+
+@unittest.skipIf(os.name == 'nt', "the stand-in for gambit is a shell script")
+class TestFindAllEquilibria(unittest.TestCase):
+    def setUp(self):
+        from showdown.engine.select_best_move import Deadline
+        self.Deadline = Deadline
+        self.addCleanup(setattr, config, 'gambit_exe_path', config.gambit_exe_path)
+
+        # stands in for gambit that never answers
+        f = tempfile.NamedTemporaryFile('w', suffix='.sh', delete=False)
+        f.write("#!/bin/sh\nexec sleep 10\n")
+        f.close()
+        os.chmod(f.name, os.stat(f.name).st_mode | stat.S_IEXEC)
+        self.addCleanup(os.remove, f.name)
+        config.gambit_exe_path = f.name
+
+    def test_gambit_that_does_not_finish_before_the_deadline_raises_an_error(self):
+        with self.assertRaises(CouldNotFindEquilibriumError):
+            find_all_equilibria(np.array([[1, -1], [-1, 1]]), self.Deadline(0.1))
+
+
+class TestRegretMatching(unittest.TestCase):
+    def setUp(self):
+        self.regret_matching_iterations = config.regret_matching_iterations
+        self.regret_matching_exploitability = config.regret_matching_exploitability
+
+    def tearDown(self):
+        config.regret_matching_iterations = self.regret_matching_iterations
+        config.regret_matching_exploitability = self.regret_matching_exploitability
+
+    def test_approximates_even_mixed_strategies_for_rock_paper_scissors(self):
+        matrix = np.array([
+            [0, -1, 1],
+            [1, 0, -1],
+            [-1, 1, 0]
+        ], dtype=float)
+
+        bot_percentages, opponent_percentages, _, _ = regret_matching(matrix, 1000)
+
+        for percentage in list(bot_percentages) + list(opponent_percentages):
+            self.assertAlmostEqual(1/3, percentage, places=2)
+
+    def test_finds_pure_strategies_for_game_with_a_saddle_point(self):
+        matrix = np.array([
+            [3, 1],
+            [4, 2]
+        ], dtype=float)
+
+        bot_percentages, opponent_percentages, _, _ = regret_matching(matrix, 1000)
+
+        self.assertAlmostEqual(1, bot_percentages[1], places=2)
+        self.assertAlmostEqual(1, opponent_percentages[1], places=2)
+
+    def test_exploitability_goes_down_with_more_iterations(self):
+        matrix = np.array([
+            [2, -1, 0],
+            [-1, 1, 3]
+        ], dtype=float)
+
+        _, _, few_iterations_exploitability, _ = regret_matching(matrix, 10)
+        _, _, many_iterations_exploitability, _ = regret_matching(matrix, 1000)
+
+        self.assertLess(many_iterations_exploitability, few_iterations_exploitability)
+
+    def test_stops_early_once_the_exploitability_target_is_reached(self):
+        matrix = np.array([
+            [1, -1],
+            [-1, 1]
+        ], dtype=float)
+
+        _, _, exploitability, iterations = regret_matching(matrix, 100000, exploitability_target=0.1)
+
+        self.assertLess(iterations, 100000)
+        self.assertLessEqual(exploitability, 0.1)
+
+    def test_exploitability_of_an_equilibrium_is_zero(self):
+        matrix = np.array([
+            [1, -1],
+            [-1, 1]
+        ], dtype=float)
+
+        self.assertEqual(0, get_exploitability(matrix, np.array([0.5, 0.5]), np.array([0.5, 0.5])))
+
+    def test_equilibrium_is_in_the_same_format_as_the_linear_program(self):
+        config.regret_matching_iterations = 1000
+        config.regret_matching_exploitability = 0
+        matrix = [
+            [2, -1, 0],
+            [-1, 1, 3]
+        ]
+
+        bot_percentages, opponent_percentages = find_equilibrium_with_regret_matching(matrix)
+        expected_bot_percentages, expected_opponent_percentages = find_equilibrium_with_linear_program(matrix)
+
+        for expected_percentage, percentage in zip(expected_bot_percentages + expected_opponent_percentages, bot_percentages + opponent_percentages):
+            self.assertAlmostEqual(expected_percentage, percentage, places=1)
@@ -0,0 +1,124 @@
+import os
+import signal
+import unittest
+
+import constants
+import config
+from showdown.decide import CouldNotFindEquilibriumError
+from showdown.decide import find_nash_equilibrium
+from showdown.decide import get_weighted_choices_from_multiple_score_lookups
+from showdown.equilibrium_solver_pool import EquilibriumSolverPool
+from showdown.equilibrium_solver_pool import get_equilibrium_solver_pool
+from showdown.engine.select_best_move import Deadline
+
+
+class TestEquilibriumSolverPool(unittest.TestCase):
+    def setUp(self):
+        self.equilibrium_solver = config.equilibrium_solver
+        config.equilibrium_solver = constants.EQUILIBRIUM_SOLVER_LINEAR_PROGRAM
+
+        self.score_lookups = [
+            {
+                ('a', 'c'): 1,
+                ('a', 'd'): -1,
+                ('b', 'c'): -1,
+                ('b', 'd'): 1,
+            },
+            {
+                ('a', 'c'): 2,
+                ('a', 'd'): -1,
+                ('a', 'e'): 0,
+                ('b', 'c'): -1,
+                ('b', 'd'): 1,
+                ('b', 'e'): 3,
+            },
+            {
+                ('a', 'c'): 3,
+                ('a', 'd'): 1,
+                ('b', 'c'): 4,
+                ('b', 'd'): 2,
+            },
+        ]
+
+    def tearDown(self):
+        config.equilibrium_solver = self.equilibrium_solver
+
+    def assert_equilibria_equal(self, expected, equilibria):
+        self.assertEqual(len(expected), len(equilibria))
+        for expected_eq, eq in zip(expected, equilibria):
+            self.assertEqual(list(expected_eq[0]), list(eq[0]))
+            self.assertEqual(list(expected_eq[1]), list(eq[1]))
+            for expected_percentage, percentage in zip(list(expected_eq[2]) + list(expected_eq[3]), list(eq[2]) + list(eq[3])):
+                self.assertAlmostEqual(expected_percentage, percentage)
+            self.assertAlmostEqual(expected_eq[4], eq[4])
+
+    def test_finds_the_same_equilibria_as_solving_in_this_process(self):
+        expected = [find_nash_equilibrium(sl) for sl in self.score_lookups]
+        pool = EquilibriumSolverPool(2)
+        self.addCleanup(pool.shutdown)
+
+        self.assert_equilibria_equal(expected, pool.find_nash_equilibria(self.score_lookups))
+
+    def test_pool_is_not_healthy_after_a_worker_is_killed(self):
+        pool = EquilibriumSolverPool(2)
+        self.addCleanup(pool.shutdown)
+        self.assertTrue(pool.is_healthy())
+        os.kill(next(iter(pool.worker_pids)), signal.SIGKILL)
+
+        self.assertFalse(pool.is_healthy())
+
+    def test_pool_is_healthy_after_starting(self):
+        pool = EquilibriumSolverPool(2)
+        self.addCleanup(pool.shutdown)
+
+        self.assertTrue(pool.is_healthy())
+
+    def test_pool_restarts_after_a_worker_is_killed(self):
+        expected = [find_nash_equilibrium(sl) for sl in self.score_lookups]
+        pool = EquilibriumSolverPool(2)
+        self.addCleanup(pool.shutdown)
+        self.assertTrue(pool.is_healthy())
+        os.kill(next(iter(pool.worker_pids)), signal.SIGKILL)
+
+        equilibria = pool.find_nash_equilibria(self.score_lookups)
+
+        self.assertEqual(1, pool.restarts)
+        self.assert_equilibria_equal(expected, equilibria)
+
+    def test_pool_gives_up_once_the_deadline_has_passed(self):
+        pool = EquilibriumSolverPool(2)
+        self.addCleanup(pool.shutdown)
+
+        with self.assertRaises(CouldNotFindEquilibriumError):
+            pool.find_nash_equilibria(self.score_lookups, Deadline(0))
+
+    def test_there_is_no_pool_for_gambit(self):
+        self.addCleanup(setattr, config, 'equilibrium_solver_processes', config.equilibrium_solver_processes)
+        config.equilibrium_solver_processes = 2
+        config.equilibrium_solver = constants.EQUILIBRIUM_SOLVER_GAMBIT
+
+        self.assertIsNone(get_equilibrium_solver_pool())
+
+    def test_pool_can_be_restarted_while_a_score_lookup_is_waiting(self):
+        pool = EquilibriumSolverPool(2)
+        self.addCleanup(pool.shutdown)
+        self.assertTrue(pool.is_healthy())
+        pool.futures = [pool.executor.submit(find_nash_equilibrium, sl) for sl in self.score_lookups * 4]
+
+        pool.restart()
+
+        self.assertTrue(pool.is_healthy())
+
+    def test_weighted_choices_are_the_same_with_a_pool(self):
+        self.equilibrium_solver_processes = config.equilibrium_solver_processes
+        self.addCleanup(setattr, config, 'equilibrium_solver_processes', self.equilibrium_solver_processes)
+
+        config.equilibrium_solver_processes = 0
+        expected_choices = get_weighted_choices_from_multiple_score_lookups(self.score_lookups)
+
+        config.equilibrium_solver_processes = 2
+        choices = get_weighted_choices_from_multiple_score_lookups(self.score_lookups)
+
+        self.assertEqual([c[0] for c in expected_choices], [c[0] for c in choices])
+        for expected_choice, choice in zip(expected_choices, choices):
+            self.assertAlmostEqual(expected_choice[1], choice[1])
@@ -8,6 +8,10 @@ from showdown.engine.find_state_instructions import get_all_state_instructions
 from showdown.engine.find_state_instructions import remove_duplicate_instructions
 from showdown.engine.find_state_instructions import lookup_move
 from showdown.engine.find_state_instructions import user_moves_first
+from showdown.engine.find_state_instructions import StateInstructionsCache
+from showdown.engine.find_state_instructions import get_state_instructions_cache
+from showdown.engine.find_state_instructions import generate_all_state_instructions
+from data.mods.apply_mods import apply_mods
 from showdown.engine.objects import State
 from showdown.engine.objects import Pokemon
 from showdown.engine.objects import Side
@@ -9480,6 +9484,136 @@ class TestRemoveDuplicateInstructions(unittest.TestCase):
 
         self.assertEqual(expected_instructions, new_instructions)
 
+    def test_keeps_the_first_instruction_of_each_kind_in_order(self):
+        instructions = [
+            TransposeInstruction(0.25, [(constants.MUTATOR_DAMAGE, constants.SELF, 6)], False),
+            TransposeInstruction(0.25, [(constants.MUTATOR_DAMAGE, constants.SELF, 5)], False),
+            TransposeInstruction(0.25, [(constants.MUTATOR_DAMAGE, constants.SELF, 6)], True),
+            TransposeInstruction(0.25, [(constants.MUTATOR_DAMAGE, constants.SELF, 7)], False),
+        ]
+        first_instruction = instructions[0]
+
+        new_instructions = remove_duplicate_instructions(instructions)
+
+        self.assertEqual([6, 5, 7], [i.instructions[0][2] for i in new_instructions])
+        self.assertIs(first_instruction, new_instructions[0])
+        self.assertEqual(0.5, new_instructions[0].percentage)
+        self.assertFalse(new_instructions[0].frozen)
+
+    def test_different_instructions_that_lead_to_the_same_state_are_combined_when_a_mutator_is_given(self):
+        TestGetStateInstructions.setUp(self)
+        instructions = [
+            TransposeInstruction(0.5, [(constants.MUTATOR_DAMAGE, constants.SELF, 10)], False),
+            TransposeInstruction(0.25, [(constants.MUTATOR_DAMAGE, constants.SELF, 5), (constants.MUTATOR_DAMAGE, constants.SELF, 5)], False),
+            TransposeInstruction(0.25, [(constants.MUTATOR_DAMAGE, constants.SELF, 5)], False),
+        ]
+        original_state = deepcopy(self.state)
+
+        new_instructions = remove_duplicate_instructions(instructions, self.mutator)
+
+        expected_instructions = [
+            TransposeInstruction(0.75, [(constants.MUTATOR_DAMAGE, constants.SELF, 10)], False),
+            TransposeInstruction(0.25, [(constants.MUTATOR_DAMAGE, constants.SELF, 5)], False),
+        ]
+        self.assertEqual(expected_instructions, new_instructions)
+        self.assertEqual(original_state, self.state)
+
+    def test_different_instructions_that_lead_to_the_same_state_are_not_combined_without_a_mutator(self):
+        instructions = [
+            TransposeInstruction(0.5, [(constants.MUTATOR_DAMAGE, constants.SELF, 10)], False),
+            TransposeInstruction(0.5, [(constants.MUTATOR_DAMAGE, constants.SELF, 5), (constants.MUTATOR_DAMAGE, constants.SELF, 5)], False),
+        ]
+
+        self.assertEqual(2, len(remove_duplicate_instructions(instructions)))
+
+
+class TestStateInstructionsCache(unittest.TestCase):
+    def setUp(self):
+        self.state_instructions_cache_size = config.state_instructions_cache_size
+        config.state_instructions_cache_size = 100
+        TestGetStateInstructions.setUp(self)
+        self.cache = get_state_instructions_cache()
+        self.cache.clear()
+
+    def tearDown(self):
+        config.state_instructions_cache_size = self.state_instructions_cache_size
+        config.damage_calc_type = "average"
+
+    def test_cached_instructions_are_the_same_as_generated_instructions(self):
+        expected_instructions = generate_all_state_instructions(self.mutator, "tackle", "thunderbolt")
+
+        get_all_state_instructions(self.mutator, "tackle", "thunderbolt")
+        instructions = get_all_state_instructions(self.mutator, "tackle", "thunderbolt")
+
+        self.assertEqual(expected_instructions, instructions)
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(1, self.cache.misses)
+
+    def test_changing_returned_instructions_does_not_change_the_cache(self):
+        instructions = get_all_state_instructions(self.mutator, "tackle", "thunderbolt")
+        expected_instructions = deepcopy(instructions)
+        instructions[0].update_percentage(0.5)
+        instructions[0].add_instruction((constants.MUTATOR_DAMAGE, constants.SELF, 1))
+
+        self.assertEqual(expected_instructions, get_all_state_instructions(self.mutator, "tackle", "thunderbolt"))
+
+    def test_a_different_state_is_not_a_hit(self):
+        get_all_state_instructions(self.mutator, "tackle", "thunderbolt")
+        self.mutator.apply_one((constants.MUTATOR_DAMAGE, constants.SELF, 10))
+        get_all_state_instructions(self.mutator, "tackle", "thunderbolt")
+
+        self.assertEqual(0, self.cache.hits)
+
+    def test_a_different_damage_calculation_type_is_not_a_hit(self):
+        get_all_state_instructions(self.mutator, "tackle", "thunderbolt")
+        config.damage_calc_type = "max"
+        get_all_state_instructions(self.mutator, "tackle", "thunderbolt")
+
+        self.assertEqual(0, self.cache.hits)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = StateInstructionsCache(2)
+        cache.store('a', [])
+        cache.store('b', [])
+        cache.get('a')
+        cache.store('c', [])
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_applying_mods_clears_the_cache(self):
+        get_all_state_instructions(self.mutator, "tackle", "thunderbolt")
+        apply_mods("gen7ou")
+
+        self.assertEqual(0, len(self.cache))
+
+    def test_no_cache_when_its_size_is_zero(self):
+        config.state_instructions_cache_size = 0
+        self.assertIsNone(get_state_instructions_cache())
+
+    def test_a_different_state_with_the_same_hash_raises_when_collisions_are_checked(self):
+        self.addCleanup(setattr, config, 'check_hash_collisions', config.check_hash_collisions)
+        config.check_hash_collisions = True
+        original_hash = self.mutator.hash
+        get_all_state_instructions(self.mutator, "tackle", "thunderbolt")
+
+        self.mutator.apply_one((constants.MUTATOR_DAMAGE, constants.SELF, 10))
+        self.mutator._hash ^= self.mutator.hash ^ original_hash
+
+        with self.assertRaises(ValueError):
+            get_all_state_instructions(self.mutator, "tackle", "thunderbolt")
+
+    def test_the_same_state_does_not_raise_when_collisions_are_checked(self):
+        self.addCleanup(setattr, config, 'check_hash_collisions', config.check_hash_collisions)
+        config.check_hash_collisions = True
+        get_all_state_instructions(self.mutator, "tackle", "thunderbolt")
+        self.mutator.apply([(constants.MUTATOR_DAMAGE, constants.SELF, 10)])
+        self.mutator.reverse([(constants.MUTATOR_DAMAGE, constants.SELF, 10)])
+        get_all_state_instructions(self.mutator, "tackle", "thunderbolt")
+
+        self.assertEqual(1, self.cache.hits)
+
 
 class TestUserMovesFirst(unittest.TestCase):
     def setUp(self):
@@ -0,0 +1,56 @@
+import random
+import unittest
+from copy import deepcopy
+
+from showdown.engine.objects import StateMutator
+from showdown.evaluate import evaluate
+from showdown.engine.mcts import DecoupledMCTS
+from showdown.engine.mcts import WON_BATTLE
+from showdown.engine.select_best_move import Deadline
+from tests.fixtures import get_state
+
+
+class TestDecoupledMCTS(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.state = get_state(user_moves=('thunderbolt', 'splash'), opponent_moves=('moonblast', 'calmmind'))
+
+    def test_every_iteration_visits_one_root_option(self):
+        search = DecoupledMCTS(StateMutator(self.state), 3)
+        search.search(100)
+
+        self.assertEqual(100, search.iterations)
+        self.assertEqual(100, sum(search.get_user_visits().values()))
+
+    def test_damaging_move_is_visited_more_than_doing_nothing(self):
+        search = DecoupledMCTS(StateMutator(self.state), 2)
+        search.search(300)
+
+        visits = search.get_user_visits()
+        self.assertGreater(visits['thunderbolt'], visits['splash'])
+
+    def test_state_is_the_same_after_searching(self):
+        state_copy = deepcopy(self.state)
+
+        search = DecoupledMCTS(StateMutator(self.state), 3)
+        search.search(100)
+
+        self.assertEqual(state_copy.self.active.hp, self.state.self.active.hp)
+        self.assertEqual(state_copy.opponent.active.hp, self.state.opponent.active.hp)
+        self.assertEqual(state_copy.self.active.id, self.state.self.active.id)
+        self.assertEqual(state_copy.opponent.active.id, self.state.opponent.active.id)
+
+    def test_no_iterations_are_run_when_the_deadline_has_expired(self):
+        search = DecoupledMCTS(StateMutator(self.state), 3)
+        search.search(100, Deadline(0))
+
+        self.assertEqual(0, search.iterations)
+
+    def test_root_where_the_battle_is_lost_has_the_won_battle_penalty(self):
+        self.state.self.active.hp = 0
+        self.state.self.reserve["xatu"].hp = 0
+
+        search = DecoupledMCTS(StateMutator(self.state), 3)
+
+        self.assertEqual(evaluate(self.state) - WON_BATTLE*3, search.root.value)
+        self.assertEqual({}, search.get_user_visits())
@@ -0,0 +1,225 @@
+import unittest
+import concurrent.futures
+from copy import deepcopy
+
+import constants
+import config
+from showdown.engine.objects import StateMutator
+from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.select_best_move import search_state
+from showdown.engine.select_best_move import Deadline
+from showdown.engine.select_best_move import SearchTimeout
+from showdown.engine.select_best_move import get_all_options
+from showdown.engine import parallel
+from showdown.engine.parallel import SearchPool
+from showdown.engine.parallel import BattlePool
+from showdown.engine.parallel import get_battle_pool
+from showdown.decide import pick_safest
+from tests.fixtures import get_state
+
+
+def _get_worker_settings():
+    from data.mods import apply_mods
+    return config.search_depth, apply_mods.applied_game_mode
+
+
+class TestSearchPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = SearchPool(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+
+    def setUp(self):
+        self.state = get_state(user_reserve=("xatu", "starmie"), opponent_reserve=("yveltal", "slurpuff"), user_moves=('thunderbolt', 'nastyplot'), opponent_moves=('moonblast', 'calmmind'))
+        self.state.self.side_conditions[constants.STEALTH_ROCK] = 1
+
+    def test_parallel_search_without_pruning_gives_the_same_scores_as_a_serial_search(self):
+        expected_scores = get_payoff_matrix(StateMutator(deepcopy(self.state)), depth=2, prune=False)
+
+        scores = get_payoff_matrix(StateMutator(self.state), depth=2, prune=False, pool=self.pool)
+
+        self.assertEqual(expected_scores, scores)
+        self.assertEqual(list(expected_scores), list(scores))
+
+    def test_parallel_search_with_pruning_picks_the_same_safest_move_as_a_serial_search(self):
+        expected_scores = get_payoff_matrix(StateMutator(deepcopy(self.state)), depth=2, prune=True)
+
+        scores = get_payoff_matrix(StateMutator(self.state), depth=2, prune=True, pool=self.pool)
+
+        self.assertEqual(pick_safest(expected_scores), pick_safest(scores))
+
+    def test_search_at_depth_one_does_not_use_the_pool(self):
+        expected_scores = get_payoff_matrix(StateMutator(deepcopy(self.state)), depth=1, prune=False)
+
+        scores = get_payoff_matrix(StateMutator(self.state), depth=1, prune=False, pool=self.pool)
+
+        self.assertEqual(expected_scores, scores)
+
+    def test_state_is_not_modified_by_the_parallel_search(self):
+        get_payoff_matrix(StateMutator(self.state), depth=2, prune=True, pool=self.pool)
+
+        self.assertEqual(1, self.state.self.side_conditions[constants.STEALTH_ROCK])
+        self.assertEqual(0, self.state.opponent.side_conditions[constants.SPIKES])
+
+    def test_search_past_its_deadline_raises_search_timeout(self):
+        self.addCleanup(setattr, parallel, 'RESULT_GRACE_SECONDS', parallel.RESULT_GRACE_SECONDS)
+        parallel.RESULT_GRACE_SECONDS = 0
+        user_options, opponent_options = get_all_options(StateMutator(self.state))
+
+        with self.assertRaises(SearchTimeout):
+            self.pool.get_payoff_matrix(self.state, user_options, opponent_options, 1, False, Deadline(0))
+
+
+class TestBattlePool(unittest.TestCase):
+    def setUp(self):
+        self.search_depth = config.search_depth
+        self.search_time_ms = config.search_time_ms
+        self.battle_search_timeout_ms = config.battle_search_timeout_ms
+        config.search_depth = 2
+        config.search_time_ms = 0
+        config.battle_search_timeout_ms = 0
+
+        self.states = []
+        for opponent in ["aromatisse", "yveltal", "slurpuff"]:
+            state = get_state(opponent=opponent, opponent_reserve=(), user_moves=('thunderbolt', 'nastyplot'), opponent_moves=('tackle', 'calmmind'))
+            self.states.append(state)
+
+    def tearDown(self):
+        config.search_depth = self.search_depth
+        config.search_time_ms = self.search_time_ms
+        config.battle_search_timeout_ms = self.battle_search_timeout_ms
+
+    def test_battles_searched_in_parallel_give_the_same_scores_as_searching_them_one_at_a_time(self):
+        expected_scores = [get_payoff_matrix(StateMutator(deepcopy(s)), depth=2, prune=False) for s in self.states]
+
+        # workers are given the config when the pool is created
+        pool = BattlePool(2)
+        list_of_scores = pool.search_states(self.states, prune=False)
+        pool.shutdown()
+
+        self.assertEqual(expected_scores, list_of_scores)
+
+    def test_battle_that_times_out_falls_back_to_a_depth_of_one(self):
+        config.battle_search_timeout_ms = 0.001
+        expected_scores = [get_payoff_matrix(StateMutator(deepcopy(s)), depth=1, prune=False) for s in self.states]
+
+        pool = BattlePool(2)
+        list_of_scores = pool.search_states(self.states, prune=False)
+        pool.shutdown()
+
+        self.assertEqual(expected_scores, list_of_scores)
+
+    def test_battles_that_are_not_finished_at_the_turn_deadline_fall_back_to_a_depth_of_one(self):
+        self.addCleanup(setattr, parallel, 'RESULT_GRACE_SECONDS', parallel.RESULT_GRACE_SECONDS)
+        parallel.RESULT_GRACE_SECONDS = 0
+        expected_scores = [get_payoff_matrix(StateMutator(deepcopy(s)), depth=1, prune=False) for s in self.states]
+
+        pool = BattlePool(2)
+        list_of_scores = pool.search_states(self.states, prune=False, turn_deadline=Deadline(0))
+        pool.shutdown()
+
+        self.assertEqual(expected_scores, list_of_scores)
+
+
+class TestWorkerSettings(unittest.TestCase):
+    def setUp(self):
+        from data.mods import apply_mods
+        self.addCleanup(setattr, config, 'search_depth', config.search_depth)
+        self.addCleanup(setattr, apply_mods, 'applied_game_mode', apply_mods.applied_game_mode)
+        config.search_depth = 5
+        apply_mods.applied_game_mode = 'gen7ou'
+
+    def test_workers_are_given_the_config_and_the_game_mode_of_the_process_that_created_the_pool(self):
+        pool = BattlePool(1)
+        settings = pool.executor.submit(_get_worker_settings).result()
+        pool.shutdown()
+
+        self.assertEqual((5, 'gen7ou'), settings)
+
+
+class TestGetSearchPool(unittest.TestCase):
+    def setUp(self):
+        from data.mods import apply_mods
+        self.addCleanup(setattr, config, 'search_processes', config.search_processes)
+        self.addCleanup(setattr, apply_mods, 'applied_game_mode', apply_mods.applied_game_mode)
+        self.addCleanup(setattr, parallel, '_search_pool', None)
+        self.addCleanup(lambda: parallel._search_pool is not None and parallel._search_pool.shutdown())
+        config.search_processes = 2
+        apply_mods.applied_game_mode = 'gen7ou'
+
+    def test_same_pool_is_used_while_the_settings_are_the_same(self):
+        self.assertIs(parallel.get_search_pool(), parallel.get_search_pool())
+
+    def test_new_pool_is_started_when_the_mods_are_applied_for_another_game_mode(self):
+        from data.mods import apply_mods
+        pool = parallel.get_search_pool()
+        apply_mods.applied_game_mode = 'gen4ou'
+
+        new_pool = parallel.get_search_pool()
+
+        self.assertIsNot(pool, new_pool)
+        self.assertEqual('gen4ou', new_pool.executor.submit(_get_worker_settings).result()[1])
+
+
+class TestGetResult(unittest.TestCase):
+    def test_waits_for_a_result_without_a_deadline(self):
+        future = concurrent.futures.Future()
+        future.set_result(1)
+
+        self.assertEqual(1, parallel._get_result(future, None))
+
+    def test_stops_waiting_once_the_deadline_and_the_grace_period_have_passed(self):
+        self.addCleanup(setattr, parallel, 'RESULT_GRACE_SECONDS', parallel.RESULT_GRACE_SECONDS)
+        parallel.RESULT_GRACE_SECONDS = 0
+
+        with self.assertRaises(concurrent.futures.TimeoutError):
+            parallel._get_result(concurrent.futures.Future(), Deadline(0))
+
+
+class TestGetBattlePool(unittest.TestCase):
+    def setUp(self):
+        self.battle_search_processes = config.battle_search_processes
+        self.transposition_table_size = config.transposition_table_size
+
+    def tearDown(self):
+        config.battle_search_processes = self.battle_search_processes
+        config.transposition_table_size = self.transposition_table_size
+
+    def test_no_pool_when_transposition_tables_are_turned_on(self):
+        config.battle_search_processes = 2
+        config.transposition_table_size = 1000
+
+        self.assertIsNone(get_battle_pool())
+        self.assertEqual(2, config.battle_search_processes)
+
+
+class TestSearchState(unittest.TestCase):
+    def setUp(self):
+        self.search_depth = config.search_depth
+        self.battle_search_timeout_ms = config.battle_search_timeout_ms
+        config.search_depth = 2
+
+        self.state = get_state(opponent_reserve=())
+
+    def tearDown(self):
+        config.search_depth = self.search_depth
+        config.battle_search_timeout_ms = self.battle_search_timeout_ms
+
+    def test_search_that_times_out_falls_back_to_a_depth_of_one(self):
+        config.battle_search_timeout_ms = 0.001
+        expected_scores = get_payoff_matrix(StateMutator(deepcopy(self.state)), depth=1, prune=False)
+
+        scores = search_state(self.state, prune=False)
+
+        self.assertEqual(expected_scores, scores)
+
+    def test_search_that_does_not_time_out_uses_the_configured_depth(self):
+        config.battle_search_timeout_ms = 600000
+        expected_scores = get_payoff_matrix(StateMutator(deepcopy(self.state)), depth=2, prune=False)
+
+        scores = search_state(self.state, prune=False)
+
+        self.assertEqual(expected_scores, scores)
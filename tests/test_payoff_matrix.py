@@ -0,0 +1,187 @@
+import random
+import unittest
+
+import numpy as np
+
+from showdown.decide import pick_safest
+from showdown.decide import remove_guaranteed_opponent_moves
+from showdown.payoff_matrix import PayoffMatrix
+
+
+def random_score_lookup(bot_moves, opponent_moves):
+    score_lookup = dict()
+    guaranteed_score = random.randint(-100, 100)
+    for bot_move in bot_moves:
+        for i, opponent_move in enumerate(opponent_moves):
+            if i == 0:
+                # the bot's choice does not matter against this move
+                score_lookup[(bot_move, opponent_move)] = guaranteed_score
+            elif random.random() < 0.2:
+                score_lookup[(bot_move, opponent_move)] = float('nan')
+            else:
+                score_lookup[(bot_move, opponent_move)] = random.randint(-100, 100)
+    return score_lookup
+
+
+class TestPayoffMatrix(unittest.TestCase):
+    def setUp(self):
+        self.score_lookup = {
+            ('a', 'x'): 1,
+            ('a', 'y'): 2,
+            ('b', 'x'): 3,
+            ('b', 'y'): 4,
+        }
+
+    def test_reads_like_the_score_lookup_it_was_made_from(self):
+        payoff_matrix = PayoffMatrix.from_score_lookup(self.score_lookup)
+
+        self.assertEqual(self.score_lookup, dict(payoff_matrix))
+        self.assertEqual(self.score_lookup, payoff_matrix)
+        self.assertEqual(3, payoff_matrix[('b', 'x')])
+        self.assertEqual(4, len(payoff_matrix))
+
+    def test_rows_and_columns_are_in_the_order_they_appear_in(self):
+        payoff_matrix = PayoffMatrix.from_score_lookup(self.score_lookup)
+
+        self.assertEqual(['a', 'b'], payoff_matrix.bot_moves)
+        self.assertEqual(['x', 'y'], payoff_matrix.opponent_moves)
+        np.testing.assert_array_equal(np.array([[1, 2], [3, 4]]), payoff_matrix.scores)
+
+    def test_move_combination_that_is_not_in_the_score_lookup_raises_key_error(self):
+        del self.score_lookup[('b', 'y')]
+        payoff_matrix = PayoffMatrix.from_score_lookup(self.score_lookup)
+
+        with self.assertRaises(KeyError):
+            payoff_matrix[('b', 'y')]
+        self.assertEqual(self.score_lookup, dict(payoff_matrix))
+
+    def test_prefix_opponent_moves(self):
+        payoff_matrix = PayoffMatrix.from_score_lookup(self.score_lookup).prefix_opponent_moves('0')
+
+        self.assertEqual(['x_0', 'y_0'], payoff_matrix.opponent_moves)
+        self.assertEqual(4, payoff_matrix[('b', 'y_0')])
+
+    def test_merge_joins_rows_with_the_same_move(self):
+        other_score_lookup = {
+            ('b', 'z'): 5,
+            ('c', 'z'): 6,
+        }
+
+        payoff_matrix = PayoffMatrix.merge([
+            PayoffMatrix.from_score_lookup(self.score_lookup),
+            PayoffMatrix.from_score_lookup(other_score_lookup)
+        ])
+
+        self.assertEqual({**self.score_lookup, **other_score_lookup}, dict(payoff_matrix))
+        self.assertEqual(['a', 'b', 'c'], payoff_matrix.bot_moves)
+
+    def test_merge_raises_value_error_for_the_same_opponent_move(self):
+        payoff_matrix = PayoffMatrix.from_score_lookup(self.score_lookup)
+
+        with self.assertRaises(ValueError):
+            PayoffMatrix.merge([payoff_matrix, payoff_matrix])
+
+    def test_safest_is_the_same_as_pick_safest_for_random_score_lookups(self):
+        random.seed(0)
+        for _ in range(200):
+            bot_moves = ['a', 'b', 'c', 'd'][:random.randint(1, 4)]
+            opponent_moves = ['w', 'x', 'y', 'z'][:random.randint(1, 4)]
+            score_lookup = random_score_lookup(bot_moves, opponent_moves)
+
+            self.assertEqual(pick_safest(score_lookup), PayoffMatrix.from_score_lookup(score_lookup).safest(), score_lookup)
+
+    def test_remove_guaranteed_opponent_moves_is_the_same_as_for_random_score_lookups(self):
+        random.seed(0)
+        for _ in range(200):
+            bot_moves = ['a', 'b', 'c', 'd'][:random.randint(1, 4)]
+            opponent_moves = ['w', 'x', 'y', 'z'][:random.randint(1, 4)]
+            score_lookup = random_score_lookup(bot_moves, opponent_moves)
+
+            expected = remove_guaranteed_opponent_moves(score_lookup)
+            payoff_matrix = PayoffMatrix.from_score_lookup(score_lookup).remove_guaranteed_opponent_moves()
+
+            self.assertEqual(set(expected), set(payoff_matrix), score_lookup)
+
+    def test_safest_of_merged_matrices_is_the_same_as_pick_safest_of_merged_score_lookups(self):
+        random.seed(1)
+        for _ in range(100):
+            score_lookups = [random_score_lookup(['a', 'b', 'c'], ['x', 'y', 'z']) for _ in range(3)]
+            all_scores = dict()
+            for i, score_lookup in enumerate(score_lookups):
+                all_scores.update({(k[0], "{}_{}".format(k[1], i)): v for k, v in score_lookup.items()})
+
+            payoff_matrix = PayoffMatrix.merge([
+                PayoffMatrix.from_score_lookup(sl).prefix_opponent_moves(str(i)) for i, sl in enumerate(score_lookups)
+            ])
+
+            self.assertEqual(pick_safest(all_scores), payoff_matrix.safest())
+
+    def test_pick_safest_accepts_a_payoff_matrix(self):
+        self.assertEqual(pick_safest(self.score_lookup), pick_safest(PayoffMatrix.from_score_lookup(self.score_lookup)))
+
+
+class TestRemoveDominatedMoves(unittest.TestCase):
+    def test_removes_strictly_dominated_moves_iteratively(self):
+        # 'b' is dominated by 'a', after which 'y' is dominated for the opponent by 'x'
+        payoff_matrix = PayoffMatrix.from_score_lookup({
+            ('a', 'x'): 1, ('a', 'y'): 4,
+            ('b', 'x'): 0, ('b', 'y'): 3,
+            ('c', 'x'): 2, ('c', 'y'): -5,
+        })
+
+        reduced_payoff_matrix = payoff_matrix.remove_dominated_moves()
+
+        self.assertEqual(['a', 'c'], reduced_payoff_matrix.bot_moves)
+        self.assertEqual(['x', 'y'], reduced_payoff_matrix.opponent_moves)
+
+    def test_removes_moves_until_nothing_is_dominated(self):
+        payoff_matrix = PayoffMatrix.from_score_lookup({
+            ('a', 'x'): 3, ('a', 'y'): 0, ('a', 'z'): 5,
+            ('b', 'x'): 1, ('b', 'y'): 1, ('b', 'z'): 4,
+            ('c', 'x'): 0, ('c', 'y'): 2, ('c', 'z'): 6,
+        })
+
+        reduced_payoff_matrix = payoff_matrix.remove_dominated_moves()
+
+        # 'z' is dominated by 'x', then 'b' is dominated by a mix of 'a' and 'c' but not by either one alone
+        self.assertEqual(['a', 'b', 'c'], reduced_payoff_matrix.bot_moves)
+        self.assertEqual(['x', 'y'], reduced_payoff_matrix.opponent_moves)
+
+    def test_weakly_dominated_move_is_only_removed_when_asked_to(self):
+        payoff_matrix = PayoffMatrix.from_score_lookup({
+            ('a', 'x'): 1, ('a', 'y'): 2,
+            ('b', 'x'): 1, ('b', 'y'): 1,
+        })
+
+        self.assertEqual(['a', 'b'], payoff_matrix.remove_dominated_moves().bot_moves)
+        self.assertEqual(['a'], payoff_matrix.remove_dominated_moves(weakly=True).bot_moves)
+
+    def test_identical_moves_are_not_removed(self):
+        payoff_matrix = PayoffMatrix.from_score_lookup({
+            ('a', 'x'): 1, ('a', 'y'): -1,
+            ('b', 'x'): 1, ('b', 'y'): -1,
+            ('c', 'x'): -1, ('c', 'y'): 1,
+        })
+
+        self.assertEqual(['a', 'b', 'c'], payoff_matrix.remove_dominated_moves(weakly=True).bot_moves)
+
+    def test_nan_scores_do_not_make_a_move_dominated(self):
+        payoff_matrix = PayoffMatrix.from_score_lookup({
+            ('a', 'x'): 1, ('a', 'y'): 4,
+            ('b', 'x'): 0, ('b', 'y'): float('nan'),
+        })
+
+        self.assertEqual(['a', 'b'], payoff_matrix.remove_dominated_moves().bot_moves)
+
+    def test_value_of_the_game_is_the_same_after_removing_dominated_moves(self):
+        from showdown.decide import find_game_value
+        random.seed(2)
+        for _ in range(100):
+            scores = np.array([[random.randint(-5, 5) for _ in range(4)] for _ in range(4)], dtype=float)
+            payoff_matrix = PayoffMatrix(scores, ['a', 'b', 'c', 'd'], ['w', 'x', 'y', 'z'])
+            _, expected_value = find_game_value(scores.tolist())
+
+            for weakly in [False, True]:
+                reduced_payoff_matrix = payoff_matrix.remove_dominated_moves(weakly=weakly)
+                _, value = find_game_value(reduced_payoff_matrix.scores.tolist())
+                self.assertAlmostEqual(expected_value, value)
@@ -0,0 +1,110 @@
+import unittest
+from copy import deepcopy
+
+import constants
+import config
+from showdown.battle import Battle
+from showdown.battle import Pokemon as StatePokemon
+from showdown.engine.objects import StateMutator
+from showdown.engine.ponder import Ponderer
+from showdown.engine.ponder import ponder
+from showdown.engine.ponder import get_likely_next_states
+from showdown.engine.select_best_move import Deadline
+from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.select_best_move import get_battle_transposition_table
+from showdown.engine.select_best_move import get_battles_to_search
+
+
+class TestPonder(unittest.TestCase):
+    def setUp(self):
+        self.ponder = config.ponder
+        self.search_depth = config.search_depth
+        self.transposition_table_size = config.transposition_table_size
+        self.addCleanup(setattr, config, 'reuse_search_between_turns', config.reuse_search_between_turns)
+        self.addCleanup(setattr, config, 'decision_method', config.decision_method)
+        config.ponder = True
+        config.reuse_search_between_turns = True
+        config.decision_method = constants.PICK_SAFEST
+        config.transposition_table_size = 10000
+        config.search_depth = 2
+
+        self.battle = Battle('battle-tag')
+        self.battle.user.active = StatePokemon('raichu', 73)
+        self.battle.user.active.add_move('thunderbolt')
+        self.battle.user.active.add_move('nastyplot')
+        self.battle.user.reserve = [StatePokemon('xatu', 81)]
+        self.battle.user.reserve[0].add_move('psychic')
+        self.battle.opponent.active = StatePokemon('aromatisse', 81)
+        self.battle.opponent.active.add_move('moonblast')
+
+    def tearDown(self):
+        config.ponder = self.ponder
+        config.search_depth = self.search_depth
+        config.transposition_table_size = self.transposition_table_size
+
+    def test_likely_next_states_are_the_states_after_the_turn(self):
+        next_states = get_likely_next_states(self.battle.prepare_battles(join_moves_together=True), 'nastyplot')
+
+        self.assertTrue(next_states)
+        for state in next_states:
+            self.assertLess(state.self.active.hp, state.self.active.maxhp)
+
+    def test_likely_next_states_start_with_the_most_likely_outcome(self):
+        next_states = get_likely_next_states(self.battle.prepare_battles(join_moves_together=True), 'nastyplot')
+
+        # moonblast has a 30% chance to lower special-attack
+        self.assertEqual([2, 1], [s.self.active.special_attack_boost for s in next_states])
+
+    def test_ponder_stores_the_likely_next_states_in_the_battles_table(self):
+        ponder(self.battle, 'nastyplot', Deadline(60))
+        transposition_table = get_battle_transposition_table(self.battle)
+        hits = transposition_table.hits
+
+        next_state = get_likely_next_states(self.battle.prepare_battles(join_moves_together=True), 'nastyplot')[0]
+        get_payoff_matrix(StateMutator(next_state), depth=config.search_depth, transposition_table=transposition_table)
+
+        self.assertEqual(hits + 1, transposition_table.hits)
+
+    def test_ponder_stores_the_states_that_the_nash_decision_method_looks_up(self):
+        config.decision_method = constants.PICK_NASH_EQUILIBRIUM
+        # the nash decision method searches a battle for each of the opponent's likely sets
+        nash_battle = deepcopy(self.battle)
+        nash_battle.opponent.active.add_move('calmmind')
+        prepare_battles = self.battle.prepare_battles
+        self.battle.prepare_battles = lambda join_moves_together=False: prepare_battles(join_moves_together) if join_moves_together else [deepcopy(nash_battle)]
+        ponder(self.battle, 'nastyplot', Deadline(60))
+
+        battles, prune = get_battles_to_search(self.battle)
+        transposition_table = get_battle_transposition_table(self.battle)
+        next_state = get_likely_next_states(battles, 'nastyplot')[0]
+
+        self.assertFalse(prune)
+        self.assertIsNotNone(transposition_table.peek(transposition_table.key(StateMutator(next_state), prune)))
+
+    def test_ponder_does_not_search_after_the_deadline(self):
+        deadline = Deadline(60)
+        deadline.cancel()
+
+        self.assertEqual(0, ponder(self.battle, 'nastyplot', deadline))
+
+    def test_ponder_does_nothing_without_a_battle_transposition_table(self):
+        config.reuse_search_between_turns = False
+
+        self.assertEqual(0, ponder(self.battle, 'nastyplot', Deadline(60)))
+
+    def test_ponderer_does_not_start_when_pondering_is_off(self):
+        config.ponder = False
+        ponderer = Ponderer()
+        ponderer.start(self.battle, 'nastyplot')
+
+        self.assertIsNone(ponderer.future)
+
+    def test_ponderer_stop_waits_for_the_search_to_finish(self):
+        ponderer = Ponderer()
+        ponderer.start(self.battle, 'nastyplot')
+        future = ponderer.future
+        ponderer.stop()
+
+        self.assertTrue(future.done())
+        self.assertIsNone(ponderer.future)
+        ponderer.shutdown()
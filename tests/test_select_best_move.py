@@ -1,13 +1,30 @@
 import unittest
+from unittest import mock
 from collections import defaultdict
+from copy import deepcopy
 
 import constants
+import config
 from showdown.engine.objects import StateMutator
+from showdown.engine.objects import TransposeInstruction
 from showdown.engine.objects import State
 from showdown.engine.objects import Side
 from showdown.engine.objects import Pokemon
 from showdown.battle import Pokemon as StatePokemon
 from showdown.engine.select_best_move import get_all_options
+from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.select_best_move import get_payoff_matrix_with_iterative_deepening
+from showdown.engine.select_best_move import search_state
+from showdown.engine.select_best_move import order_options
+from showdown.engine.select_best_move import Deadline
+from showdown.engine.select_best_move import SearchTimeout
+from showdown.engine.select_best_move import split_unlikely_instructions
+from showdown.engine.select_best_move import chance_cutoff_statistics
+from showdown.engine.select_best_move import evaluate_state
+from showdown.engine.find_state_instructions import get_all_state_instructions
+from showdown.evaluate import evaluate
+from showdown.decide import pick_safest
+from tests.fixtures import get_state
 
 
 class TestGetAllOptions(unittest.TestCase):
@@ -166,3 +183,242 @@ class TestGetAllOptions(unittest.TestCase):
         options = get_all_options(self.mutator)
 
         self.assertEqual(expected_options, options)
+
+
+class TestIterativeDeepening(unittest.TestCase):
+    def setUp(self):
+        self.state = get_state(user_moves=('thunderbolt', 'nastyplot'), opponent_moves=('moonblast', 'calmmind'))
+
+    def test_expired_deadline_raises_search_timeout(self):
+        mutator = StateMutator(self.state)
+        with self.assertRaises(SearchTimeout):
+            get_payoff_matrix(mutator, depth=2, deadline=Deadline(0))
+
+    def test_first_search_finishes_even_when_the_deadline_has_expired(self):
+        expected_scores = get_payoff_matrix(StateMutator(deepcopy(self.state)), depth=1, prune=True)
+
+        scores, depth = get_payoff_matrix_with_iterative_deepening(self.state, Deadline(0), 5, prune=True)
+
+        self.assertEqual(1, depth)
+        self.assertEqual(pick_safest(expected_scores), pick_safest(scores))
+
+    def test_searches_until_the_max_depth_when_there_is_enough_time(self):
+        expected_scores = get_payoff_matrix(StateMutator(deepcopy(self.state)), depth=2, prune=True)
+
+        scores, depth = get_payoff_matrix_with_iterative_deepening(self.state, Deadline(600), 2, prune=True)
+
+        self.assertEqual(2, depth)
+        self.assertEqual(pick_safest(expected_scores), pick_safest(scores))
+
+    def test_does_not_modify_the_state_that_is_searched(self):
+        self.state.force_switch = True
+        state_copy = deepcopy(self.state)
+
+        get_payoff_matrix_with_iterative_deepening(self.state, Deadline(600), 2, prune=True)
+
+        self.assertEqual(state_copy.force_switch, self.state.force_switch)
+        self.assertEqual(state_copy.self.active.hp, self.state.self.active.hp)
+
+    def test_search_state_without_a_deadline_uses_the_time_budget(self):
+        self.addCleanup(setattr, config, 'search_time_ms', config.search_time_ms)
+        config.search_time_ms = 60000
+        self.addCleanup(setattr, config, 'iterative_deepening_max_depth', config.iterative_deepening_max_depth)
+        config.iterative_deepening_max_depth = 2
+        expected_scores = get_payoff_matrix(StateMutator(deepcopy(self.state)), depth=2, prune=True)
+
+        scores = search_state(self.state, prune=True)
+
+        self.assertEqual(pick_safest(expected_scores), pick_safest(scores))
+
+
+class TestOrderOptions(unittest.TestCase):
+    def test_user_option_with_the_best_worst_case_is_first(self):
+        score_lookup = {
+            ('a', 'x'): 10,
+            ('a', 'y'): -5,
+            ('b', 'x'): 3,
+            ('b', 'y'): 2,
+        }
+
+        user_options, _ = order_options(['a', 'b'], ['x', 'y'], score_lookup)
+
+        self.assertEqual(['b', 'a'], user_options)
+
+    def test_opponent_option_that_is_worst_for_the_best_user_option_is_first(self):
+        score_lookup = {
+            ('a', 'x'): 10,
+            ('a', 'y'): -5,
+            ('b', 'x'): 3,
+            ('b', 'y'): 2,
+        }
+
+        _, opponent_options = order_options(['a', 'b'], ['x', 'y'], score_lookup)
+
+        self.assertEqual(['y', 'x'], opponent_options)
+
+    def test_pruned_scores_are_ignored(self):
+        score_lookup = {
+            ('a', 'x'): 4,
+            ('a', 'y'): float('nan'),
+            ('b', 'x'): 3,
+            ('b', 'y'): 5,
+        }
+
+        user_options, opponent_options = order_options(['a', 'b'], ['y', 'x'], score_lookup)
+
+        self.assertEqual(['a', 'b'], user_options)
+        self.assertEqual(['x', 'y'], opponent_options)
+
+    def test_options_missing_from_the_score_lookup_are_searched_last(self):
+        score_lookup = {
+            ('a', 'x'): 4,
+        }
+
+        user_options, opponent_options = order_options(['b', 'a'], ['y', 'x'], score_lookup)
+
+        self.assertEqual(['a', 'b'], user_options)
+        self.assertEqual(['x', 'y'], opponent_options)
+
+
+class TestSplitUnlikelyInstructions(unittest.TestCase):
+    def setUp(self):
+        self.likely = TransposeInstruction(0.7, [('likely',)], False)
+        self.unlikely = TransposeInstruction(0.2, [('unlikely',)], False)
+        self.very_unlikely = TransposeInstruction(0.1, [('very_unlikely',)], False)
+        self.state_instructions = [self.very_unlikely, self.likely, self.unlikely]
+
+    def test_nothing_is_approximated_when_the_least_likely_instruction_is_above_the_cutoff(self):
+        searched, approximated = split_unlikely_instructions(self.state_instructions, 0.05)
+
+        self.assertEqual(self.state_instructions, searched)
+        self.assertEqual([], approximated)
+
+    def test_least_likely_instruction_is_approximated(self):
+        searched, approximated = split_unlikely_instructions(self.state_instructions, 0.15)
+
+        self.assertEqual([self.likely, self.unlikely], searched)
+        self.assertEqual([self.very_unlikely], approximated)
+
+    def test_instructions_are_approximated_until_their_percentages_add_up_to_more_than_the_cutoff(self):
+        searched, approximated = split_unlikely_instructions(self.state_instructions, 0.35)
+
+        self.assertEqual([self.likely], searched)
+        self.assertEqual([self.very_unlikely, self.unlikely], approximated)
+
+    def test_most_likely_instruction_is_always_searched(self):
+        searched, approximated = split_unlikely_instructions(self.state_instructions, 1)
+
+        self.assertEqual([self.likely], searched)
+
+    def test_single_instruction_is_searched(self):
+        searched, approximated = split_unlikely_instructions([self.likely], 1)
+
+        self.assertEqual([self.likely], searched)
+        self.assertEqual([], approximated)
+
+
+class TestChanceBranchCutoff(unittest.TestCase):
+    def setUp(self):
+        self.chance_branch_cutoff = config.chance_branch_cutoff
+        # focusblast has 70% accuracy and moonblast has a 30% chance to lower special attack
+        self.state = get_state(user_moves=('focusblast', 'nastyplot'), opponent_moves=('moonblast', 'calmmind'))
+
+    def tearDown(self):
+        config.chance_branch_cutoff = self.chance_branch_cutoff
+
+    def test_cutoff_of_zero_does_not_change_the_search(self):
+        # the baseline goes through the cutoff but never approximates anything
+        config.chance_branch_cutoff = 0.5
+        with mock.patch('showdown.engine.select_best_move.split_unlikely_instructions', side_effect=lambda state_instructions, cutoff: (state_instructions, [])):
+            expected_scores = get_payoff_matrix(StateMutator(deepcopy(self.state)), depth=2, prune=False)
+
+        config.chance_branch_cutoff = 0
+        chance_cutoff_statistics.reset()
+        scores = get_payoff_matrix(StateMutator(self.state), depth=2, prune=False)
+
+        self.assertEqual(expected_scores, scores)
+        self.assertEqual(0, chance_cutoff_statistics.approximated_outcomes)
+
+    def test_approximated_outcomes_are_recorded(self):
+        config.chance_branch_cutoff = 0.5
+        chance_cutoff_statistics.reset()
+
+        get_payoff_matrix(StateMutator(self.state), depth=2, prune=False)
+
+        self.assertGreater(chance_cutoff_statistics.approximated_outcomes, 0)
+        self.assertGreater(chance_cutoff_statistics.approximated_percentage, 0)
+        self.assertLessEqual(chance_cutoff_statistics.approximated_percentage, 0.5 * chance_cutoff_statistics.approximated_cells)
+
+    def test_approximated_outcomes_are_valued_with_evaluate(self):
+        config.chance_branch_cutoff = 0.5
+        state_copy = deepcopy(self.state)
+        cutoff_scores = get_payoff_matrix(StateMutator(self.state), depth=2, prune=False)
+
+        config.chance_branch_cutoff = 0
+        scores = get_payoff_matrix(StateMutator(state_copy), depth=2, prune=False)
+
+        self.assertNotEqual(scores[('focusblast', 'calmmind')], cutoff_scores[('focusblast', 'calmmind')])
+        self.assertEqual(scores[('nastyplot', 'calmmind')], cutoff_scores[('nastyplot', 'calmmind')])
+
+    def test_unlikely_outcome_is_not_searched_and_the_percentages_still_add_up_to_one(self):
+        config.chance_branch_cutoff = 0.5
+        cutoff_scores = get_payoff_matrix(StateMutator(deepcopy(self.state)), depth=2, prune=False)
+
+        mutator = StateMutator(self.state)
+        get_all_options(mutator)
+        state_instructions = get_all_state_instructions(mutator, 'focusblast', 'calmmind')
+        searched, approximated = split_unlikely_instructions(state_instructions, config.chance_branch_cutoff)
+        self.assertEqual(2, len(approximated))
+        self.assertAlmostEqual(1, sum(i.percentage for i in searched + approximated))
+
+        # focusblast missing and lowering special defense are evaluated where they are instead of being searched deeper
+        expected_score = 0
+        for instructions in approximated:
+            mutator.apply(instructions.instructions)
+            expected_score += evaluate_state(mutator) * instructions.percentage
+            mutator.reverse(instructions.instructions)
+        for instructions in searched:
+            mutator.apply(instructions.instructions)
+            expected_score += pick_safest(get_payoff_matrix(mutator, depth=1, prune=False))[1] * instructions.percentage
+            mutator.reverse(instructions.instructions)
+
+        self.assertAlmostEqual(expected_score, cutoff_scores[('focusblast', 'calmmind')])
+
+
+class TestIncrementalEvaluation(unittest.TestCase):
+    def setUp(self):
+        TestChanceBranchCutoff.setUp(self)
+        self.incremental_evaluation = config.incremental_evaluation
+        self.check_incremental_evaluation = config.check_incremental_evaluation
+
+    def tearDown(self):
+        config.incremental_evaluation = self.incremental_evaluation
+        config.check_incremental_evaluation = self.check_incremental_evaluation
+
+    def test_search_with_incremental_evaluation_gives_the_same_scores(self):
+        config.incremental_evaluation = False
+        expected_scores = get_payoff_matrix(StateMutator(deepcopy(self.state)), depth=2, prune=False)
+
+        config.incremental_evaluation = True
+        config.check_incremental_evaluation = True
+        scores = get_payoff_matrix(StateMutator(self.state), depth=2, prune=False)
+
+        self.assertEqual(expected_scores, scores)
+
+    def test_check_raises_value_error_when_the_incremental_score_is_wrong(self):
+        config.incremental_evaluation = True
+        config.check_incremental_evaluation = True
+        mutator = StateMutator(self.state)
+        mutator.score
+        self.state.self.active.hp = 1
+
+        with self.assertRaises(ValueError):
+            evaluate_state(mutator)
+
+    def test_state_is_evaluated_in_full_when_incremental_evaluation_is_off(self):
+        config.incremental_evaluation = False
+        mutator = StateMutator(self.state)
+        mutator.score
+        self.state.self.active.hp = 1
+
+        self.assertEqual(evaluate(self.state), evaluate_state(mutator))
@@ -0,0 +1,200 @@
+import unittest
+from copy import deepcopy
+
+import constants
+from showdown.engine.objects import StateMutator
+from showdown.evaluate import evaluate
+from showdown.decide import find_game_value
+from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.smab import SimultaneousAlphaBeta
+from showdown.engine.smab import get_score_bounds
+from showdown.engine.smab import WON_BATTLE
+from tests.fixtures import get_state
+
+
+def get_game_value(scores):
+    rows = sorted(set(k[0] for k in scores))
+    columns = sorted(set(k[1] for k in scores))
+    return find_game_value([[scores[(r, c)] for c in columns] for r in rows])[1]
+
+
+class RecordingAlphaBeta(SimultaneousAlphaBeta):
+    """Keeps a copy of every state that is searched along with the scores that were kept for it"""
+
+    def __init__(self, mutator, depth):
+        super().__init__(mutator, depth)
+        self.searched = list()
+
+    def _search_state(self, depth, alpha, beta, root=False):
+        state = deepcopy(self.mutator.state)
+        scores, value = super()._search_state(depth, alpha, beta, root)
+        self.searched.append((state, depth, scores))
+        return scores, value
+
+
+class MatrixAlphaBeta(SimultaneousAlphaBeta):
+    """Searches a matrix of fixed scores, so that the pruning can be checked without a battle"""
+
+    def __init__(self, matrix, lowest_score, highest_score):
+        self.matrix = matrix
+        self.lowest_score = lowest_score
+        self.highest_score = highest_score
+        self.nodes = 0
+
+    def _search_cell(self, user_move, opponent_move, depth, alpha, beta):
+        return max(alpha, min(beta, self.matrix[(user_move, opponent_move)]))
+
+    def search(self, alpha, beta, root=False):
+        user_options = sorted(set(k[0] for k in self.matrix))
+        opponent_options = sorted(set(k[1] for k in self.matrix))
+        return self._search_matrix(user_options, opponent_options, 0, alpha, beta, root)
+
+
+class TestSimultaneousAlphaBeta(unittest.TestCase):
+    def setUp(self):
+        self.state = get_state(user_reserve=("xatu", "starmie"), user_moves=('thunderbolt', 'nastyplot', 'focusblast'), opponent_moves=('moonblast', 'calmmind'))
+
+    def test_scores_that_are_kept_are_the_same_as_the_nash_search(self):
+        expected_scores = get_payoff_matrix(StateMutator(deepcopy(self.state)), 2, prune=False)
+
+        scores = SimultaneousAlphaBeta(StateMutator(self.state), 2).get_payoff_matrix()
+
+        for move_combination, score in scores.items():
+            self.assertAlmostEqual(expected_scores[move_combination], score)
+
+    def test_scores_that_are_kept_in_every_searched_state_are_the_same_as_the_nash_search(self):
+        smab = RecordingAlphaBeta(StateMutator(self.state), 2)
+        smab.get_payoff_matrix()
+
+        self.assertGreater(len(smab.searched), 1)
+        for state, depth, scores in smab.searched:
+            expected_scores = get_payoff_matrix(StateMutator(state), depth, prune=False)
+            for move_combination, score in scores.items():
+                self.assertAlmostEqual(expected_scores[move_combination], score)
+
+    def test_value_of_the_game_is_the_same_as_the_nash_search(self):
+        expected_scores = get_payoff_matrix(StateMutator(deepcopy(self.state)), 2, prune=False)
+
+        scores = SimultaneousAlphaBeta(StateMutator(self.state), 2).get_payoff_matrix()
+
+        self.assertAlmostEqual(get_game_value(expected_scores), get_game_value(scores))
+
+    def test_dominated_move_combinations_are_removed(self):
+        scores = SimultaneousAlphaBeta(StateMutator(deepcopy(self.state)), 1).get_payoff_matrix()
+        expected_scores = get_payoff_matrix(StateMutator(self.state), 1, prune=False)
+
+        self.assertLess(len(scores), len(expected_scores))
+
+    def test_game_that_is_lost_returns_the_evaluation_with_the_won_battle_penalty(self):
+        self.state.self.active.hp = 0
+        for pkmn in self.state.self.reserve.values():
+            pkmn.hp = 0
+
+        scores = SimultaneousAlphaBeta(StateMutator(self.state), 2).get_payoff_matrix()
+
+        expected_scores = {(constants.DO_NOTHING_MOVE, constants.DO_NOTHING_MOVE): evaluate(self.state) - WON_BATTLE*2}
+        self.assertEqual(expected_scores, scores)
+
+
+class TestSearchMatrix(unittest.TestCase):
+    def test_row_that_is_below_alpha_in_only_one_column_is_kept(self):
+        matrix = {
+            ('a', 'x'): 0, ('a', 'y'): 100,
+            ('b', 'x'): 100, ('b', 'y'): 0,
+        }
+
+        scores, _ = MatrixAlphaBeta(matrix, -1000, 1000).search(10, 1000, root=True)
+
+        self.assertEqual(matrix, scores)
+
+    def test_row_that_is_below_alpha_in_every_column_is_removed(self):
+        matrix = {
+            ('a', 'x'): 0, ('a', 'y'): 100,
+            ('b', 'x'): 5, ('b', 'y'): 5,
+        }
+
+        scores, value = MatrixAlphaBeta(matrix, -1000, 1000).search(10, 1000)
+
+        self.assertEqual({('a', 'x'): 0, ('a', 'y'): 100}, scores)
+        self.assertLessEqual(value, 10)
+
+    def test_cell_that_can_only_drop_its_row_or_its_column_drops_the_column_when_it_scores_above_the_row(self):
+        matrix = {
+            ('a', 'x'): 3, ('a', 'y'): 5,
+            ('b', 'x'): 2, ('b', 'y'): 10,
+        }
+
+        scores, _ = MatrixAlphaBeta(matrix, -1000, 1000).search(-1000, 1000, root=True)
+
+        self.assertEqual({('a', 'x'): 3, ('b', 'x'): 2}, scores)
+
+    def test_cell_that_can_only_drop_its_row_or_its_column_drops_the_row_when_it_scores_below_the_row(self):
+        matrix = {
+            ('a', 'x'): 3, ('a', 'y'): 5,
+            ('b', 'x'): 2, ('b', 'y'): 4,
+        }
+
+        scores, _ = MatrixAlphaBeta(matrix, -1000, 1000).search(-1000, 1000, root=True)
+
+        self.assertEqual({('a', 'x'): 3, ('a', 'y'): 5}, scores)
+
+    def test_value_below_the_root_is_the_value_of_the_best_pure_strategy(self):
+        matrix = {
+            ('a', 'x'): 0, ('a', 'y'): 100,
+            ('b', 'x'): 100, ('b', 'y'): 0,
+        }
+
+        _, value = MatrixAlphaBeta(matrix, -1000, 1000).search(-1000, 1000)
+
+        self.assertEqual(0, value)
+
+    def test_row_below_the_root_with_a_cell_below_the_worst_score_of_another_row_is_removed(self):
+        matrix = {
+            ('a', 'x'): 3, ('a', 'y'): 5,
+            ('b', 'x'): 2, ('b', 'y'): 10,
+        }
+
+        scores, value = MatrixAlphaBeta(matrix, -1000, 1000).search(-1000, 1000)
+
+        self.assertEqual({('a', 'x'): 3, ('a', 'y'): 5}, scores)
+        self.assertEqual(3, value)
+
+    def test_state_below_the_root_fails_high_when_a_row_is_at_least_beta_in_every_column(self):
+        matrix = {
+            ('a', 'x'): 20, ('a', 'y'): 30,
+            ('b', 'x'): 0, ('b', 'y'): 100,
+        }
+
+        _, value = MatrixAlphaBeta(matrix, -1000, 1000).search(-1000, 10)
+
+        self.assertGreaterEqual(value, 10)
+
+
+class TestGetScoreBounds(unittest.TestCase):
+    def setUp(self):
+        self.state = get_state()
+
+    def test_evaluation_of_the_state_is_within_the_bounds(self):
+        lowest, highest = get_score_bounds(self.state, 2)
+        self.assertLess(lowest, evaluate(self.state))
+        self.assertGreater(highest, evaluate(self.state))
+
+    def test_evaluation_with_the_best_possible_boosts_is_within_the_bounds(self):
+        lowest, highest = get_score_bounds(self.state, 0)
+        for boost in ['attack_boost', 'defense_boost', 'special_attack_boost', 'special_defense_boost', 'speed_boost', 'accuracy_boost', 'evasion_boost']:
+            setattr(self.state.self.active, boost, constants.MAX_BOOSTS)
+            setattr(self.state.opponent.active, boost, -constants.MAX_BOOSTS)
+        self.state.opponent.side_conditions[constants.STEALTH_ROCK] = 1
+        self.state.opponent.side_conditions[constants.SPIKES] = 3
+
+        self.assertLess(lowest, evaluate(self.state))
+        self.assertGreater(highest, evaluate(self.state))
+
+    def test_fainted_pokemon_do_not_widen_the_bounds(self):
+        lowest, highest = get_score_bounds(self.state, 0)
+        self.state.self.reserve["xatu"].hp = 0
+
+        fainted_lowest, fainted_highest = get_score_bounds(self.state, 0)
+
+        self.assertGreaterEqual(fainted_lowest, lowest)
+        self.assertLess(fainted_highest, highest)
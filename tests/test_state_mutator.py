@@ -1,6 +1,10 @@
+import os
+import subprocess
+import sys
 import unittest
 
 from collections import defaultdict
+from copy import deepcopy
 import constants
 
 from showdown.battle import Pokemon as StatePokemon
@@ -8,6 +12,11 @@ from showdown.engine.objects import State
 from showdown.engine.objects import Side
 from showdown.engine.objects import Pokemon
 from showdown.engine.objects import StateMutator
+from showdown.engine import zobrist
+from showdown.engine.instruction_encoding import encode_instruction
+from showdown.engine.instruction_encoding import encode_instructions
+from showdown.engine.instruction_encoding import decode_instructions
+from showdown.evaluate import evaluate
 
 
 class TestStatemutator(unittest.TestCase):
@@ -615,3 +624,333 @@ class TestStatemutator(unittest.TestCase):
         self.mutator.reverse(list_of_instructions)
 
         self.assertFalse(self.state.trick_room)
+
+
+class TestStateMutatorHash(unittest.TestCase):
+    def setUp(self):
+        self.state = State(
+            Side(
+                Pokemon.from_state_pokemon_dict(StatePokemon("pikachu", 100).to_dict()),
+                {
+                    "rattata": Pokemon.from_state_pokemon_dict(StatePokemon("rattata", 100).to_dict()),
+                    "charmander": Pokemon.from_state_pokemon_dict(StatePokemon("charmander", 100).to_dict()),
+                    "squirtle": Pokemon.from_state_pokemon_dict(StatePokemon("squirtle", 100).to_dict()),
+                    "bulbasaur": Pokemon.from_state_pokemon_dict(StatePokemon("bulbasaur", 100).to_dict()),
+                    "pidgey": Pokemon.from_state_pokemon_dict(StatePokemon("pidgey", 100).to_dict())
+                },
+                defaultdict(lambda: 0),
+                False
+            ),
+            Side(
+                Pokemon.from_state_pokemon_dict(StatePokemon("pikachu", 100).to_dict()),
+                {
+                    "rattata": Pokemon.from_state_pokemon_dict(StatePokemon("rattata", 100).to_dict()),
+                    "charmander": Pokemon.from_state_pokemon_dict(StatePokemon("charmander", 100).to_dict()),
+                    "squirtle": Pokemon.from_state_pokemon_dict(StatePokemon("squirtle", 100).to_dict()),
+                    "bulbasaur": Pokemon.from_state_pokemon_dict(StatePokemon("bulbasaur", 100).to_dict()),
+                    "pidgey": Pokemon.from_state_pokemon_dict(StatePokemon("pidgey", 100).to_dict())
+                },
+                defaultdict(lambda: 0),
+                False
+            ),
+            None,
+            None,
+            False,
+            False,
+            False
+        )
+        self.state.self.active.moves = [
+            {constants.ID: 'tackle', constants.DISABLED: False, constants.CURRENT_PP: 32},
+            {constants.ID: 'thunderbolt', constants.DISABLED: False, constants.CURRENT_PP: 24},
+        ]
+        self.mutator = StateMutator(self.state)
+
+        self.instructions = [
+            (constants.MUTATOR_DAMAGE, constants.SELF, 25),
+            (constants.MUTATOR_HEAL, constants.OPPONENT, -10),
+            (constants.MUTATOR_BOOST, constants.SELF, constants.ATTACK, 2),
+            (constants.MUTATOR_UNBOOST, constants.OPPONENT, constants.SPEED, 1),
+            (constants.MUTATOR_APPLY_VOLATILE_STATUS, constants.SELF, constants.LEECH_SEED),
+            (constants.MUTATOR_APPLY_STATUS, constants.OPPONENT, constants.BURN),
+            (constants.MUTATOR_SIDE_START, constants.OPPONENT, constants.SPIKES, 1),
+            (constants.MUTATOR_DISABLE_MOVE, constants.SELF, 'tackle'),
+            (constants.MUTATOR_WEATHER_START, constants.SUN, None),
+            (constants.MUTATOR_FIELD_START, constants.ELECTRIC_TERRAIN, None),
+            (constants.MUTATOR_TOGGLE_TRICKROOM,),
+            (constants.MUTATOR_REMOVE_VOLATILE_STATUS, constants.SELF, constants.LEECH_SEED),
+            (constants.MUTATOR_SWITCH, constants.SELF, "pikachu", "rattata"),
+            (constants.MUTATOR_REMOVE_STATUS, constants.OPPONENT, constants.BURN),
+            (constants.MUTATOR_SIDE_END, constants.OPPONENT, constants.SPIKES, 1),
+            (constants.MUTATOR_SWITCH, constants.SELF, "rattata", "pikachu"),
+            (constants.MUTATOR_ENABLE_MOVE, constants.SELF, 'tackle'),
+        ]
+
+    def test_hash_matches_a_full_recalculation_after_every_instruction(self):
+        for instruction in self.instructions:
+            self.mutator.apply_one(instruction)
+            self.assertEqual(zobrist.full_hash(self.state), self.mutator.hash, "Hash is wrong after {}".format(instruction))
+
+    def test_hash_matches_a_full_recalculation_after_reversing_every_instruction(self):
+        self.mutator.hash
+        self.mutator.apply(self.instructions)
+        for i in reversed(range(len(self.instructions))):
+            self.mutator.reverse([self.instructions[i]])
+            self.assertEqual(zobrist.full_hash(self.state), self.mutator.hash, "Hash is wrong after reversing {}".format(self.instructions[i]))
+
+    def test_apply_and_reverse_returns_to_the_original_hash(self):
+        original_hash = self.mutator.hash
+        self.mutator.apply(self.instructions)
+        self.mutator.reverse(self.instructions)
+
+        self.assertEqual(original_hash, self.mutator.hash)
+
+    def test_hash_is_different_after_an_instruction_is_applied(self):
+        original_hash = self.mutator.hash
+        self.mutator.apply([(constants.MUTATOR_DAMAGE, constants.SELF, 25)])
+
+        self.assertNotEqual(original_hash, self.mutator.hash)
+
+    def test_negative_one_and_negative_two_boosts_hash_differently(self):
+        self.mutator.apply([(constants.MUTATOR_UNBOOST, constants.SELF, constants.DEFENSE, 1)])
+        negative_one_hash = self.mutator.hash
+        self.mutator.apply([(constants.MUTATOR_UNBOOST, constants.SELF, constants.DEFENSE, 1)])
+
+        self.assertNotEqual(negative_one_hash, self.mutator.hash)
+
+    def test_the_same_state_reached_in_a_different_order_has_the_same_hash(self):
+        instructions = [
+            (constants.MUTATOR_DAMAGE, constants.SELF, 25),
+            (constants.MUTATOR_BOOST, constants.OPPONENT, constants.ATTACK, 2),
+        ]
+        self.mutator.apply(instructions)
+        first_hash = self.mutator.hash
+        self.mutator.reverse(instructions)
+
+        self.mutator.apply(list(reversed(instructions)))
+
+        self.assertEqual(first_hash, self.mutator.hash)
+
+    def test_the_same_pokemon_on_different_sides_hash_differently(self):
+        self.mutator.apply([(constants.MUTATOR_DAMAGE, constants.SELF, 25)])
+        self_damaged_hash = self.mutator.hash
+        self.mutator.reverse([(constants.MUTATOR_DAMAGE, constants.SELF, 25)])
+        self.mutator.apply([(constants.MUTATOR_DAMAGE, constants.OPPONENT, 25)])
+
+        self.assertNotEqual(self_damaged_hash, self.mutator.hash)
+
+    def test_flags_that_are_not_set_by_instructions_change_the_hash(self):
+        original_hash = self.mutator.hash
+        self.state.force_switch = True
+
+        self.assertNotEqual(original_hash, self.mutator.hash)
+        self.assertEqual(zobrist.full_hash(self.state), self.mutator.hash)
+
+    def test_keys_are_the_same_in_a_process_with_a_different_hash_seed(self):
+        features = [
+            zobrist.FORCE_SWITCH_FEATURE,
+            ('hp', constants.SELF, 'pikachu', 100),
+            ('boost', constants.OPPONENT, 'rattata', constants.ATTACK, -2),
+            zobrist.static_feature(constants.SELF, self.state.self.active),
+        ]
+        code = "import sys; from showdown.engine import zobrist; print([zobrist.feature_key(f) for f in eval(sys.stdin.read())])"
+        env = dict(os.environ, PYTHONHASHSEED='12345')
+        output = subprocess.run([sys.executable, '-c', code], input=repr(features), env=env, capture_output=True, text=True, check=True).stdout
+
+        self.assertEqual([zobrist.feature_key(f) for f in features], eval(output))
+
+    def test_a_whole_float_has_the_same_key_as_an_int(self):
+        self.assertEqual(zobrist.hp_key(constants.SELF, 'pikachu', 100), zobrist.hp_key(constants.SELF, 'pikachu', 100.0))
+
+    def test_disabling_an_already_disabled_move_does_not_change_the_hash(self):
+        self.mutator.apply([(constants.MUTATOR_DISABLE_MOVE, constants.SELF, 'tackle')])
+        disabled_hash = self.mutator.hash
+        self.mutator.apply([(constants.MUTATOR_DISABLE_MOVE, constants.SELF, 'tackle')])
+
+        self.assertEqual(disabled_hash, self.mutator.hash)
+
+    def test_using_pp_only_changes_the_hash_when_a_move_runs_out(self):
+        original_hash = zobrist.full_hash(self.state)
+        self.state.self.active.moves[0][constants.CURRENT_PP] -= 1
+        one_pp_used_hash = zobrist.full_hash(self.state)
+        self.state.self.active.moves[0][constants.CURRENT_PP] = 0
+
+        self.assertEqual(original_hash, one_pp_used_hash)
+        self.assertNotEqual(original_hash, zobrist.full_hash(self.state))
+
+    def test_reassigning_the_state_gives_the_hash_of_the_new_state(self):
+        self.mutator.hash
+        new_state = deepcopy(self.state)
+        new_state.self.active.hp -= 25
+        self.mutator.state = new_state
+        self.mutator.apply([(constants.MUTATOR_BOOST, constants.SELF, constants.ATTACK, 2)])
+
+        self.assertEqual(2, new_state.self.active.attack_boost)
+        self.assertEqual(0, self.state.self.active.attack_boost)
+        self.assertEqual(zobrist.full_hash(new_state), self.mutator.hash)
+
+    def test_instructions_applied_before_the_hash_is_read_do_not_change_it(self):
+        self.mutator.apply(self.instructions)
+
+        self.assertEqual(0, self.mutator._hash)
+        self.assertEqual(zobrist.full_hash(self.state), self.mutator.hash)
+
+        self.mutator.reverse(self.instructions)
+        self.assertEqual(zobrist.full_hash(self.state), self.mutator.hash)
+
+
+class TestStateMutatorScore(unittest.TestCase):
+    def setUp(self):
+        TestStateMutatorHash.setUp(self)
+        self.instructions += [
+            (constants.MUTATOR_SIDE_START, constants.SELF, constants.STEALTH_ROCK, 1),
+            (constants.MUTATOR_SIDE_START, constants.SELF, constants.REFLECT, 1),
+            (constants.MUTATOR_APPLY_VOLATILE_STATUS, constants.OPPONENT, constants.SUBSTITUTE),
+            (constants.MUTATOR_SWITCH, constants.OPPONENT, "pikachu", "squirtle"),
+            (constants.MUTATOR_DAMAGE, constants.SELF, 1000),
+            (constants.MUTATOR_SWITCH, constants.SELF, "pikachu", "pidgey"),
+            (constants.MUTATOR_DAMAGE, constants.SELF, 1000),
+        ]
+
+    def test_score_matches_evaluate_after_every_instruction(self):
+        for instruction in self.instructions:
+            self.mutator.apply_one(instruction)
+            self.assertEqual(evaluate(self.state), self.mutator.score, "Score is wrong after {}".format(instruction))
+
+    def test_score_matches_evaluate_after_reversing_every_instruction(self):
+        self.mutator.score
+        self.mutator.apply(self.instructions)
+        for i in reversed(range(len(self.instructions))):
+            self.mutator.reverse([self.instructions[i]])
+            self.assertEqual(evaluate(self.state), self.mutator.score, "Score is wrong after reversing {}".format(self.instructions[i]))
+
+    def test_score_matches_evaluate_when_it_is_only_read_after_all_of_the_instructions(self):
+        self.mutator.score
+        self.mutator.apply(self.instructions)
+
+        self.assertEqual(evaluate(self.state), self.mutator.score)
+
+    def test_apply_and_reverse_returns_to_the_original_score(self):
+        original_score = self.mutator.score
+        self.mutator.apply(self.instructions)
+        self.mutator.score
+        self.mutator.reverse(self.instructions)
+
+        self.assertEqual(original_score, self.mutator.score)
+
+    def test_fainted_reserve_pokemon_change_the_score_of_side_conditions(self):
+        self.mutator.apply([(constants.MUTATOR_SIDE_START, constants.SELF, constants.STEALTH_ROCK, 1)])
+        self.mutator.score
+        self.mutator.apply([
+            (constants.MUTATOR_SWITCH, constants.SELF, "pikachu", "rattata"),
+            (constants.MUTATOR_DAMAGE, constants.SELF, 1000),
+        ])
+
+        self.assertEqual(evaluate(self.state), self.mutator.score)
+
+    def test_recalculate_score_picks_up_changes_made_without_the_mutator(self):
+        self.mutator.score
+        self.state.opponent.active.hp = 1
+        self.mutator.recalculate_score()
+
+        self.assertEqual(evaluate(self.state), self.mutator.score)
+
+
+class TestStateMutatorMoveTo(unittest.TestCase):
+    def setUp(self):
+        TestStateMutatorHash.setUp(self)
+        self.original_state = deepcopy(self.state)
+
+    def assertSameState(self, expected_state, state):
+        # reversing a side-condition leaves a count of 0 behind, so states are compared by their hash
+        self.assertEqual(zobrist.full_hash(expected_state), zobrist.full_hash(state))
+
+    def test_moving_to_a_branch_applies_its_instructions(self):
+        expected_state = deepcopy(self.state)
+        StateMutator(expected_state).apply(self.instructions)
+
+        self.mutator.move_to(self.instructions)
+
+        self.assertSameState(expected_state, self.state)
+
+    def test_moving_to_a_sibling_branch_gives_the_same_state_as_applying_it(self):
+        sibling = self.instructions[:5] + [(constants.MUTATOR_DAMAGE, constants.OPPONENT, 30)]
+        expected_state = deepcopy(self.state)
+        StateMutator(expected_state).apply(sibling)
+
+        self.mutator.move_to(self.instructions)
+        self.mutator.move_to(sibling)
+
+        self.assertSameState(expected_state, self.state)
+        self.assertEqual(zobrist.full_hash(self.state), self.mutator.hash)
+
+    def test_moving_to_a_longer_branch_only_applies_the_new_instructions(self):
+        self.mutator.move_to(self.instructions[:3])
+        self.mutator.move_to(self.instructions)
+
+        expected_state = deepcopy(self.original_state)
+        StateMutator(expected_state).apply(self.instructions)
+        self.assertSameState(expected_state, self.state)
+
+    def test_moving_to_no_instructions_returns_to_the_original_state(self):
+        self.mutator.move_to(self.instructions)
+        self.mutator.move_to([])
+
+        self.assertSameState(self.original_state, self.state)
+
+    def test_branch_is_not_changed_when_the_moved_to_list_is_changed(self):
+        instructions = self.instructions[:3]
+        self.mutator.move_to(instructions)
+        instructions.append((constants.MUTATOR_DAMAGE, constants.OPPONENT, 30))
+        self.mutator.move_to([])
+
+        self.assertSameState(self.original_state, self.state)
+
+    def test_extending_the_branch_applies_the_instruction_and_it_is_reversed_with_the_branch(self):
+        self.mutator.move_to(self.instructions[:3])
+        self.mutator.extend_branch(self.instructions[3])
+
+        self.assertEqual(self.instructions[:4], self.mutator.branch)
+
+        self.mutator.move_to([])
+        self.assertSameState(self.original_state, self.state)
+
+
+class TestStateMutatorEncodedInstructions(unittest.TestCase):
+    def setUp(self):
+        TestStateMutatorHash.setUp(self)
+        self.original_state = deepcopy(self.state)
+
+    def test_decoding_encoded_instructions_gives_the_original_instructions(self):
+        self.assertEqual(self.instructions, decode_instructions(encode_instructions(self.instructions)))
+
+    def test_opcode_and_side_are_encoded_as_integers(self):
+        encoded = encode_instruction((constants.MUTATOR_DAMAGE, constants.OPPONENT, 25))
+
+        self.assertIsInstance(encoded[0], int)
+        self.assertEqual(1, encoded[1])
+        self.assertEqual(25, encoded[2])
+
+    def test_instructions_without_a_side_only_have_their_opcode_encoded(self):
+        encoded = encode_instruction((constants.MUTATOR_WEATHER_START, constants.SUN, None))
+
+        self.assertEqual((constants.SUN, None), encoded[1:])
+
+    def test_applying_encoded_instructions_gives_the_same_state_and_hash_as_applying_them(self):
+        expected_state = deepcopy(self.state)
+        expected_mutator = StateMutator(expected_state)
+        expected_mutator.hash
+        expected_mutator.apply(self.instructions)
+
+        self.mutator.hash
+        self.mutator.apply_encoded(encode_instructions(self.instructions))
+
+        self.assertEqual(zobrist.full_hash(expected_state), zobrist.full_hash(self.state))
+        self.assertEqual(expected_mutator.hash, self.mutator.hash)
+
+    def test_reversing_encoded_instructions_returns_to_the_original_state(self):
+        encoded = encode_instructions(self.instructions)
+        self.mutator.apply_encoded(encoded)
+        self.mutator.reverse_encoded(encoded)
+
+        self.assertEqual(zobrist.full_hash(self.original_state), zobrist.full_hash(self.state))
+        self.assertEqual(zobrist.full_hash(self.original_state), self.mutator.hash)
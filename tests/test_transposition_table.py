@@ -0,0 +1,381 @@
+import json
+import asyncio
+import unittest
+from copy import deepcopy
+
+import constants
+from showdown.engine.objects import StateMutator
+from showdown.battle import Battle
+from showdown.battle import Pokemon as StatePokemon
+from showdown.battle_modifier import update_battle
+import config
+from showdown.engine.select_best_move import get_payoff_matrix
+from showdown.engine.select_best_move import get_all_options
+from showdown.engine.select_best_move import get_battle_transposition_table
+from showdown.engine.select_best_move import search_state
+from showdown.engine.find_state_instructions import get_all_state_instructions
+from showdown.engine.transposition_table import TranspositionTable
+from tests.fixtures import get_state
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_get_returns_stored_score_lookup(self):
+        table = TranspositionTable(10)
+        table.store('key', 2, {('a', 'b'): 1})
+
+        self.assertEqual({('a', 'b'): 1}, table.get('key', 2))
+
+    def test_peek_returns_score_lookup_stored_at_any_depth(self):
+        table = TranspositionTable(10)
+        table.store('key', 2, {('a', 'b'): 1})
+
+        self.assertEqual({('a', 'b'): 1}, table.peek('key'))
+        self.assertIsNone(table.peek('other_key'))
+
+    def test_peek_does_not_count_as_a_hit_or_a_miss(self):
+        table = TranspositionTable(10)
+        table.store('key', 2, {('a', 'b'): 1})
+
+        table.peek('key')
+        table.peek('other_key')
+
+        self.assertEqual(0, table.hits)
+        self.assertEqual(0, table.misses)
+
+    def test_get_returns_none_when_the_entry_is_shallower(self):
+        table = TranspositionTable(10)
+        table.store('key', 1, {('a', 'b'): 1})
+
+        self.assertIsNone(table.get('key', 2))
+
+    def test_get_returns_none_when_the_entry_was_searched_deeper(self):
+        table = TranspositionTable(10)
+        table.store('key', 2, {('a', 'b'): 1})
+
+        self.assertIsNone(table.get('key', 1))
+
+    def test_get_returns_an_entry_that_was_searched_deeper_when_deeper_entries_are_used(self):
+        table = TranspositionTable(10, use_deeper_entries=True)
+        table.store('key', 2, {('a', 'b'): 1})
+
+        self.assertEqual({('a', 'b'): 1}, table.get('key', 1))
+
+    def test_hits_and_misses_are_counted(self):
+        table = TranspositionTable(10)
+        table.store('key', 2, {('a', 'b'): 1})
+        table.get('key', 2)
+        table.get('key', 3)
+        table.get('other_key', 2)
+
+        self.assertEqual(1, table.hits)
+        self.assertEqual(2, table.misses)
+
+    def test_lru_table_evicts_least_recently_used_entry(self):
+        table = TranspositionTable(2, constants.TRANSPOSITION_TABLE_LRU)
+        table.store('a', 1, {})
+        table.store('b', 1, {})
+        table.get('a', 1)
+        table.store('c', 1, {})
+
+        self.assertIsNotNone(table.get('a', 1))
+        self.assertIsNone(table.get('b', 1))
+        self.assertIsNotNone(table.get('c', 1))
+
+    def test_depth_preferred_table_does_not_evict_a_deeper_entry(self):
+        table = TranspositionTable(1, constants.TRANSPOSITION_TABLE_DEPTH_PREFERRED)
+        table.store('a', 2, {})
+        table.store('b', 1, {})
+
+        self.assertIsNotNone(table.get('a', 2))
+        self.assertIsNone(table.get('b', 1))
+
+    def test_depth_preferred_table_does_not_overwrite_a_deeper_entry(self):
+        table = TranspositionTable(10, constants.TRANSPOSITION_TABLE_DEPTH_PREFERRED)
+        table.store('a', 2, {('a', 'b'): 2})
+        table.store('a', 1, {('a', 'b'): 1})
+
+        self.assertEqual({('a', 'b'): 2}, table.get('a', 2))
+
+    def test_depth_preferred_table_evicts_a_shallower_entry(self):
+        table = TranspositionTable(1, constants.TRANSPOSITION_TABLE_DEPTH_PREFERRED)
+        table.store('a', 1, {})
+        table.store('b', 2, {})
+
+        self.assertIsNone(table.get('a', 1))
+        self.assertIsNotNone(table.get('b', 2))
+
+    def test_invalid_replacement_scheme_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            TranspositionTable(10, 'not_a_scheme')
+
+
+class TestTranspositionTableSearch(unittest.TestCase):
+    def setUp(self):
+        self.state = get_state(user_reserve=("xatu", "starmie"), opponent_reserve=("yveltal", "slurpuff"), user_moves=('thunderbolt', 'nastyplot'), opponent_moves=('moonblast', 'calmmind'))
+
+    def test_search_with_transposition_table_gives_the_same_result_as_without(self):
+        state_copy = deepcopy(self.state)
+
+        expected_scores = get_payoff_matrix(StateMutator(self.state), depth=2, prune=False)
+
+        table = TranspositionTable(1000)
+        scores = get_payoff_matrix(StateMutator(state_copy), depth=2, prune=False, transposition_table=table)
+
+        self.assertEqual(expected_scores, scores)
+        self.assertGreater(len(table), 0)
+
+    def test_stored_result_is_reused_for_the_same_state(self):
+        state_copy = deepcopy(self.state)
+        table = TranspositionTable(1000)
+
+        first_scores = get_payoff_matrix(StateMutator(self.state), depth=2, prune=False, transposition_table=table)
+        hits = table.hits
+        second_scores = get_payoff_matrix(StateMutator(state_copy), depth=2, prune=False, transposition_table=table)
+
+        self.assertEqual(first_scores, second_scores)
+        self.assertEqual(hits + 1, table.hits)
+
+
+class TestTranspositionTableCollisions(unittest.TestCase):
+    def setUp(self):
+        TestTranspositionTableSearch.setUp(self)
+        self.check_hash_collisions = config.check_hash_collisions
+        config.check_hash_collisions = True
+
+    def tearDown(self):
+        config.check_hash_collisions = self.check_hash_collisions
+
+    def test_a_different_state_with_the_same_hash_raises(self):
+        table = TranspositionTable(1000)
+        mutator = StateMutator(self.state)
+        table.key(mutator, True)
+
+        state_copy = deepcopy(self.state)
+        state_copy.self.active.hp -= 1
+        other_mutator = StateMutator(state_copy)
+        other_hash = other_mutator.hash
+        other_mutator._hash ^= other_hash ^ mutator.hash
+
+        with self.assertRaises(ValueError):
+            table.key(other_mutator, True)
+
+    def test_search_does_not_raise(self):
+        table = TranspositionTable(1000)
+        get_payoff_matrix(StateMutator(self.state), depth=2, prune=False, transposition_table=table)
+        get_payoff_matrix(StateMutator(deepcopy(self.state)), depth=2, prune=False, transposition_table=table)
+
+        self.assertGreater(table.hits, 0)
+
+    def test_clear_forgets_the_fingerprints(self):
+        table = TranspositionTable(1000)
+        table.key(StateMutator(self.state), True)
+        table.clear()
+
+        self.assertEqual(0, len(table.fingerprints))
+
+
+class TestBattleTranspositionTable(unittest.TestCase):
+    def setUp(self):
+        self.reuse_search_between_turns = config.reuse_search_between_turns
+        self.transposition_table_size = config.transposition_table_size
+        config.reuse_search_between_turns = True
+        config.transposition_table_size = 10000
+
+        self.battle = Battle('battle-tag')
+        self.battle.opponent.active = StatePokemon('aromatisse', 81)
+        self.battle.opponent.active.add_move('moonblast')
+        self.battle.opponent.reserve = [StatePokemon('yveltal', 73)]
+
+    def tearDown(self):
+        config.reuse_search_between_turns = self.reuse_search_between_turns
+        config.transposition_table_size = self.transposition_table_size
+
+    def test_returns_none_when_searches_are_not_reused(self):
+        config.reuse_search_between_turns = False
+        self.assertIsNone(get_battle_transposition_table(self.battle))
+
+    def test_returns_the_same_table_on_the_next_turn(self):
+        table = get_battle_transposition_table(self.battle)
+        self.battle.opponent.active.hp -= 10
+
+        self.assertIs(table, get_battle_transposition_table(self.battle))
+
+    def test_returns_a_new_table_when_the_opponent_reveals_a_move(self):
+        table = get_battle_transposition_table(self.battle)
+        self.battle.opponent.active.add_move('calmmind')
+
+        self.assertIsNot(table, get_battle_transposition_table(self.battle))
+
+    def test_returns_a_new_table_when_the_opponent_reveals_a_pokemon(self):
+        table = get_battle_transposition_table(self.battle)
+        self.battle.opponent.reserve.append(StatePokemon('slurpuff', 73))
+
+        self.assertIsNot(table, get_battle_transposition_table(self.battle))
+
+    def test_switching_does_not_count_as_new_information(self):
+        table = get_battle_transposition_table(self.battle)
+        self.battle.opponent.active, self.battle.opponent.reserve[0] = self.battle.opponent.reserve[0], self.battle.opponent.active
+
+        self.assertIs(table, get_battle_transposition_table(self.battle))
+
+    def test_different_battles_have_different_tables(self):
+        other_battle = deepcopy(self.battle)
+        other_battle.battle_tag = 'other-battle-tag'
+
+        self.assertIsNot(get_battle_transposition_table(self.battle), get_battle_transposition_table(other_battle))
+
+
+class TestSearchReuseBetweenTurns(unittest.TestCase):
+    def setUp(self):
+        TestTranspositionTableSearch.setUp(self)
+        self.search_depth = config.search_depth
+        self.search_time_ms = config.search_time_ms
+        config.search_depth = 2
+        config.search_time_ms = 0
+
+    def tearDown(self):
+        config.search_depth = self.search_depth
+        config.search_time_ms = self.search_time_ms
+
+    def get_next_turn_state(self):
+        state = deepcopy(self.state)
+        mutator = StateMutator(state)
+        get_all_options(mutator)
+        instructions = get_all_state_instructions(mutator, 'nastyplot', 'calmmind')[0]
+        mutator.apply(instructions.instructions)
+        return state
+
+    def test_next_turn_with_the_previous_table_gives_the_same_result(self):
+        next_turn_state = self.get_next_turn_state()
+        expected_scores = search_state(deepcopy(next_turn_state), prune=False)
+
+        table = TranspositionTable(1000)
+        search_state(self.state, prune=False, transposition_table=table)
+        scores = search_state(next_turn_state, prune=False, transposition_table=table)
+
+        self.assertEqual(expected_scores, scores)
+
+    def test_next_turn_with_the_previous_table_reuses_states_searched_last_turn(self):
+        table = TranspositionTable(1000)
+        search_state(self.state, prune=False, transposition_table=table)
+        hits = table.hits
+
+        # the state after this turn was searched to a depth of 1 as one of the outcomes of this turn
+        get_payoff_matrix(StateMutator(self.get_next_turn_state()), depth=1, prune=False, transposition_table=table)
+
+        self.assertEqual(hits + 1, table.hits)
+
+    def test_next_turn_search_re_uses_the_deeper_states_searched_last_turn_when_deeper_entries_are_used(self):
+        config.search_depth = 3
+        table = TranspositionTable(100000, use_deeper_entries=True)
+        search_state(self.state, prune=False, transposition_table=table)
+        entries = len(table)
+        hits = table.hits
+
+        # the state after this turn was searched to a depth of 2 as one of the outcomes of this turn
+        config.search_depth = 1
+        scores = search_state(self.get_next_turn_state(), prune=False, transposition_table=table)
+
+        self.assertEqual(hits + 1, table.hits)
+        self.assertEqual(entries, len(table))
+        self.assertEqual(
+            get_payoff_matrix(StateMutator(self.get_next_turn_state()), depth=2, prune=False),
+            scores
+        )
+
+
+class TestSearchReuseAfterABattleUpdate(unittest.TestCase):
+    def setUp(self):
+        self.search_depth = config.search_depth
+        self.search_time_ms = config.search_time_ms
+        config.search_depth = 2
+        config.search_time_ms = 0
+
+        self.battle = Battle('battle-tag')
+        self.battle.user.from_json(self.get_request_json(nastyplot_pp=32), first_turn=True)
+        self.battle.opponent.name = 'p2'
+        self.battle.opponent.active = StatePokemon('aromatisse', 81)
+        self.battle.opponent.active.add_move('calmmind')
+        self.battle.opponent.active.add_move('moonblast')
+
+    def tearDown(self):
+        config.search_depth = self.search_depth
+        config.search_time_ms = self.search_time_ms
+
+    @staticmethod
+    def get_request_json(nastyplot_pp):
+        return {
+            "active": [
+                {
+                    "moves": [
+                        {"move": "Nasty Plot", "id": "nastyplot", "pp": nastyplot_pp, "maxpp": 32, "target": "self", "disabled": False},
+                        {"move": "Thunderbolt", "id": "thunderbolt", "pp": 24, "maxpp": 24, "target": "normal", "disabled": False}
+                    ]
+                }
+            ],
+            "side": {
+                "name": "bot",
+                "id": "p1",
+                "pokemon": [
+                    {
+                        "ident": "p1: Raichu",
+                        "details": "Raichu, L73, M",
+                        "condition": "203/203",
+                        "active": True,
+                        "stats": {"atk": 165, "def": 118, "spa": 172, "spd": 150, "spe": 209},
+                        "moves": ["nastyplot", "thunderbolt"],
+                        "baseAbility": "lightningrod",
+                        "item": "",
+                        "pokeball": "pokeball",
+                        "ability": "lightningrod"
+                    },
+                    {
+                        "ident": "p1: Xatu",
+                        "details": "Xatu, L81, M",
+                        "condition": "241/241",
+                        "active": False,
+                        "stats": {"atk": 167, "def": 167, "spa": 216, "spd": 167, "spe": 208},
+                        "moves": ["psychic"],
+                        "baseAbility": "magicbounce",
+                        "item": "",
+                        "pokeball": "pokeball",
+                        "ability": "magicbounce"
+                    }
+                ]
+            },
+            "rqid": 2
+        }
+
+    def update_battle(self, msg):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(update_battle(self.battle, msg))
+        finally:
+            loop.close()
+
+    def test_the_state_after_a_turn_is_found_in_the_table_from_the_turn_before(self):
+        table = TranspositionTable(100000)
+        search_state(self.battle.to_object(), prune=False, transposition_table=table)
+
+        # the server sends the request for the next turn before the messages of the turn that was just played
+        self.update_battle("|request|{}".format(json.dumps(self.get_request_json(nastyplot_pp=31))))
+        self.update_battle(
+            "|\n"
+            "|move|p1a: Raichu|Nasty Plot|p1a: Raichu\n"
+            "|-boost|p1a: Raichu|spa|2\n"
+            "|move|p2a: Aromatisse|Calm Mind|p2a: Aromatisse\n"
+            "|-boost|p2a: Aromatisse|spa|1\n"
+            "|-boost|p2a: Aromatisse|spd|1\n"
+            "|\n"
+            "|upkeep\n"
+            "|turn|2"
+        )
+        hits = table.hits
+
+        # the state after this turn was searched to a depth of 1 as one of the outcomes of the turn before
+        get_payoff_matrix(StateMutator(self.battle.to_object()), depth=1, prune=False, transposition_table=table)
+
+        self.assertEqual(31, self.battle.user.active.get_move('nastyplot').current_pp)
+        calmmind = self.battle.opponent.active.get_move('calmmind')
+        self.assertEqual(calmmind.max_pp - 1, calmmind.current_pp)
+        self.assertEqual(hits + 1, table.hits)